@@ -0,0 +1,312 @@
+# core/analyzer.py
+import argparse
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+import json
+import logging
+import os
+import time
+from typing import Iterator
+
+from core import settings
+from core.board import Board
+from core.displays import NullDisplay
+from core.game import Game
+from core.records import TOKEN_TYPES_BY_NAME, GameRecord, read_records
+from core.rng import GameRandom
+from core.rules import ThunderTruthRules
+from core.search import SearchEngine, Searcher
+from core.snapshots import PLAYER_AI, TOKEN_TYPES, Position, position_key
+
+logger = logging.getLogger(__name__)
+
+# Кэш оценок ходов процесса-воркера: {(ключ позиции, глубина): {ход: оценка}}
+_cache: OrderedDict = OrderedDict()
+
+
+@dataclass
+class MoveAnalysis:
+    ply: int
+    player: int
+    move: tuple[str, int, int]
+    best_move: tuple[str, int, int]
+    value: int
+    best_value: int
+    loss: int
+    blunder: bool
+
+
+@dataclass
+class GameAnalysis:
+    game: int
+    kinds: list[int]
+    moves: list[MoveAnalysis] = field(default_factory=list)
+    cache_hits: int = 0
+
+
+def _evaluate_cached(searcher: Searcher, engine, position, cache_size: int) -> tuple[dict, bool]:
+    key = (position_key(position), searcher.depth)
+    values = _cache.get(key)
+    if values is not None:
+        _cache.move_to_end(key)
+        return values, True
+
+    values = searcher.evaluate_moves(position, engine)
+    _cache[key] = values
+    if len(_cache) > cache_size:
+        _cache.popitem(last=False)
+    return values, False
+
+
+def replay_positions(record: GameRecord) -> list[Position]:
+    """
+    Переигрывает партию через Game.move/impute: позиции перед каждым ходом и итоговая
+    """
+    game = Game(Board(), ThunderTruthRules(), None, NullDisplay(), rng=GameRandom(0))
+    game.restore(record.start)
+    positions = [game.to_position()]
+    for name, row, col in record.moves:
+        player = game.get_current_player()
+        token = player.get_token(TOKEN_TYPES_BY_NAME[name])
+        game.move(player, token, row, col)
+        game.impute(player, row, col)
+        game.end_turn(player, token)
+        positions.append(game.to_position())
+    return positions
+
+
+def _analyze_move(
+        ply: int,
+        position: Position,
+        move: tuple[str, int, int],
+        values: dict,
+        blunder_threshold: int,
+        ) -> MoveAnalysis:
+    name, row, col = move
+    best_move = max(values, key=values.get)
+    value = values[(TOKEN_TYPES_BY_NAME[name], row, col)]
+    loss = values[best_move] - value
+    return MoveAnalysis(
+        ply=ply,
+        player=position.current,
+        move=(name, row, col),
+        best_move=(best_move[0].__name__, best_move[1], best_move[2]),
+        value=value,
+        best_value=values[best_move],
+        loss=loss,
+        blunder=loss >= blunder_threshold,
+    )
+
+
+def analyze_record(
+        record: GameRecord,
+        game_idx: int = 0,
+        depth: int = settings.ANALYSIS_DEPTH,
+        blunder_threshold: int = settings.BLUNDER_THRESHOLD,
+        cache_size: int = settings.ANALYSIS_CACHE_SIZE,
+        ) -> GameAnalysis:
+    """
+    Переигрывает партию через Game.move/impute и для каждого хода
+    сравнивает сделанный ход с лучшим по оценке перебора
+    """
+    positions = replay_positions(record)
+    searcher = Searcher(depth)
+    analysis = GameAnalysis(game_idx, [state.kind for state in positions[0].players])
+    # Операнды за партию не меняются - правила компилируются один раз
+    engine = searcher.engine_for(positions[0])
+
+    for ply, (position, move) in enumerate(zip(positions, record.moves)):
+        values, hit = _evaluate_cached(searcher, engine, position, cache_size)
+        analysis.cache_hits += hit
+        analysis.moves.append(_analyze_move(ply, position, move, values, blunder_threshold))
+    return analysis
+
+
+def _analyze_arena(
+        records: list[GameRecord],
+        depth: int,
+        blunder_threshold: int,
+        workers: int,
+        cache_size: int = settings.ANALYSIS_CACHE_SIZE,
+        capacity: int = settings.ARENA_CAPACITY,
+        ) -> Iterator[GameAnalysis]:
+    """
+    Анализ через ArenaPool: партии переигрываются здесь, каждая новая позиция
+    раскладывается на позиции после каждого хода, и они оцениваются процессами
+    пула на глубину depth - 1 через общую память. Оценка хода - минус оценка
+    позиции после него, как в Searcher.evaluate_moves. Партии обрабатываются
+    группами примерно по capacity позиций после хода
+    """
+    # Пул нужен только при анализе в несколько процессов
+    from core.arena import ArenaPool
+
+    searcher = Searcher(depth)
+    pools: dict[int, ArenaPool] = {}
+    cache: OrderedDict = OrderedDict()
+    games: list[tuple[int, GameRecord, list[Position], list[bytes], list[bool]]] = []
+    # {ключ позиции: (размер доски, первый слот, движок, ходы)} - позиции группы без оценок
+    jobs: dict[bytes, tuple[int, int, SearchEngine, list[tuple[int, int]]]] = {}
+    children: dict[int, list[Position]] = {}
+    group_values: dict[bytes, dict] = {}
+
+    def flush() -> Iterator[GameAnalysis]:
+        results = {}
+        for size, batch in children.items():
+            if size not in pools:
+                pools[size] = ArenaPool(size, capacity=capacity, workers=workers)
+            results[size] = pools[size].evaluate(batch, depth - 1)
+        for key, (size, offset, engine, moves) in jobs.items():
+            group_values[key] = {
+                (TOKEN_TYPES[type_idx], *engine.cell_coords(idx)): -results[size][offset + move_idx]
+                for move_idx, (type_idx, idx) in enumerate(moves)
+            }
+
+        for game_idx, record, positions, keys, hits in games:
+            analysis = GameAnalysis(game_idx, [state.kind for state in positions[0].players], cache_hits=sum(hits))
+            for ply, (position, key, move) in enumerate(zip(positions, keys, record.moves)):
+                values = group_values.get(key) or cache[key]
+                analysis.moves.append(_analyze_move(ply, position, move, values, blunder_threshold))
+            yield analysis
+
+        # Кэш пополняется после разбора группы - вытеснение не задевает ее позиции
+        for key, values in group_values.items():
+            cache[key] = values
+            if len(cache) > cache_size:
+                cache.popitem(last=False)
+        games.clear()
+        jobs.clear()
+        children.clear()
+        group_values.clear()
+
+    try:
+        for game_idx, record in enumerate(records):
+            positions = replay_positions(record)
+            engine = searcher.engine_for(positions[0])
+            kinds = [state.kind for state in positions[0].players]
+            keys, hits = [], []
+            for position in positions[:len(record.moves)]:
+                key = position_key(position)
+                keys.append(key)
+                hit = key in jobs or key in group_values or key in cache
+                hits.append(hit)
+                if hit:
+                    continue
+
+                state = engine.state_from_position(position)
+                moves = engine.moves(state)
+                if depth == 1:
+                    # Глубина 0 после хода - просто разница очков, пул не нужен
+                    group_values[key] = {}
+                    for type_idx, idx in moves:
+                        child = engine.apply(state, (type_idx, idx))
+                        value = -engine.evaluate(child, child.current)
+                        group_values[key][(TOKEN_TYPES[type_idx], *engine.cell_coords(idx))] = value
+                    continue
+                batch = children.setdefault(position.size, [])
+                jobs[key] = (position.size, len(batch), engine, moves)
+                batch.extend(engine.position_from_state(engine.apply(state, move), kinds) for move in moves)
+
+            games.append((game_idx, record, positions, keys, hits))
+            if sum(len(batch) for batch in children.values()) >= capacity:
+                yield from flush()
+        yield from flush()
+    finally:
+        for pool in pools.values():
+            pool.close()
+
+
+class AnalysisReport:
+    """
+    ОПИСАНИЕ:
+    - Сводка анализа по местам игроков: число ходов, средняя потеря,
+    зевки и точность (доля ходов, совпавших по оценке с лучшим)
+    """
+    def __init__(self) -> None:
+        self.games: list[GameAnalysis] = []
+        self.seats: dict[int, dict] = {}
+
+    def add(self, analysis: GameAnalysis) -> None:
+        self.games.append(analysis)
+        for move in analysis.moves:
+            seat = self.seats.setdefault(move.player, {
+                'kind': 'ИИ' if analysis.kinds[move.player] == PLAYER_AI else 'человек',
+                'moves': 0, 'best': 0, 'loss': 0, 'blunders': 0,
+            })
+            seat['moves'] += 1
+            seat['best'] += move.loss == 0
+            seat['loss'] += move.loss
+            seat['blunders'] += move.blunder
+
+    def summary(self) -> str:
+        lines = [f'Проанализировано партий: {len(self.games)}']
+        for seat_idx, seat in sorted(self.seats.items()):
+            moves = seat['moves'] or 1
+            lines.append(
+                f'Игрок {seat_idx + 1} ({seat["kind"]}): ходов {seat["moves"]}, '
+                f'точность {100 * seat["best"] / moves:.1f}%, '
+                f'средняя потеря {seat["loss"] / moves:.2f}, '
+                f'зевков {seat["blunders"]}'
+            )
+        return '\n'.join(lines)
+
+    def blunders(self) -> list[tuple[int, MoveAnalysis]]:
+        return [(game.game, move) for game in self.games for move in game.moves if move.blunder]
+
+
+def analyze_records(
+        records: list[GameRecord],
+        depth: int = settings.ANALYSIS_DEPTH,
+        blunder_threshold: int = settings.BLUNDER_THRESHOLD,
+        workers: int | None = None,
+        ) -> AnalysisReport:
+    """
+    Анализ партий. В несколько процессов позиции передаются пулу через общую память
+    (ArenaPool), повторные позиции оцениваются один раз
+    """
+    report = AnalysisReport()
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        for idx, record in enumerate(records):
+            report.add(analyze_record(record, idx, depth, blunder_threshold))
+        return report
+
+    for analysis in _analyze_arena(records, depth, blunder_threshold, workers):
+        report.add(analysis)
+    return report
+
+
+def main() -> None:
+    """
+    Точка входа анализатора: python -m core.analyzer games.jsonl
+    """
+    parser = argparse.ArgumentParser(description='Анализ сыгранных партий ThunderTruth')
+    parser.add_argument('path', help='файл записей партий (RECORDS_PATH) или лог игры старых версий')
+    parser.add_argument('--depth', type=int, default=settings.ANALYSIS_DEPTH, help='глубина перебора')
+    parser.add_argument('--blunder', type=int, default=settings.BLUNDER_THRESHOLD, help='порог зевка в очках')
+    parser.add_argument('--workers', type=int, default=None, help='число процессов')
+    parser.add_argument('--top', type=int, default=20, help='сколько худших зевков вывести')
+    parser.add_argument('--json', dest='json_path', default=None, help='сохранить походовый отчет в JSON')
+    args = parser.parse_args()
+
+    records = read_records(args.path)
+    started = time.perf_counter()
+    report = analyze_records(records, args.depth, args.blunder, args.workers)
+    elapsed = time.perf_counter() - started
+
+    print(report.summary())
+    blunders = sorted(report.blunders(), key=lambda item: -item[1].loss)
+    for game_idx, move in blunders[:args.top]:
+        print(
+            f'Зевок: партия {game_idx}, ход {move.ply + 1}, игрок {move.player + 1}: '
+            f'{move.move} (оценка {move.value}), лучше {move.best_move} (оценка {move.best_value})'
+        )
+    print(f'Время анализа: {elapsed:.2f} с')
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump([asdict(game) for game in report.games], f, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
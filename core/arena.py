@@ -0,0 +1,325 @@
+# core/arena.py
+import argparse
+import logging
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+
+from core import settings
+from core.exceptions import SnapshotError
+from core.search import SearchEngine, Searcher
+from core.snapshots import CELL_EMPTY, CELL_FALSE, CELL_TRUE, MAX_PLAYERS, TOKEN_TYPES, PlayerState, Position
+
+logger = logging.getLogger(__name__)
+
+# Запись позиции фиксированной длины, little-endian:
+#   размер доски (B), индекс текущего игрока (B), число игроков (B),
+#   типы игроков (B на каждого из MAX_PLAYERS), очки (H на каждого),
+#   число токенов каждого типа у каждого игрока (B), коды клеток (B на клетку)
+# Порядок токенов в наборе не хранится: перебор и так считает наборы мультимножествами
+_RECORD_HEADER = struct.Struct(
+    '<BBB' + 'B' * MAX_PLAYERS + 'H' * MAX_PLAYERS + 'B' * (MAX_PLAYERS * len(TOKEN_TYPES))
+)
+_RESULT = struct.Struct('<i')
+# Коды клеток без токенов: движок перебора зависит только от расстановки операндов
+_OPERANDS_ONLY = bytes([CELL_EMPTY, CELL_FALSE, CELL_TRUE] + [CELL_EMPTY] * 253)
+
+
+def record_size(board_size: int) -> int:
+    """
+    Длина записи позиции, выровненная до 8 байт
+    """
+    size = _RECORD_HEADER.size + board_size * board_size
+    return (size + 7) & ~7
+
+
+class PositionArena:
+    """
+    ОПИСАНИЕ:
+    - Общая память для передачи позиций процессам пула без pickle: записи
+    фиксированной длины по слотам и массив int32-результатов по тем же слотам.
+    Процессы передают друг другу только номера слотов. Сегмент создает и удаляет
+    владелец, процессы пула только подключаются к нему по имени
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - attach: подключиться к существующему сегменту (в процессе пула)
+    - write / write_batch: записать позиции в слоты
+    - read: позиция из слота
+    - cells: коды клеток слота без копирования (memoryview)
+    - close: отключиться от сегмента; владелец при этом удаляет его
+    :::Свойства:::
+    - results: результаты по слотам без копирования (memoryview int32)
+    - name: имя сегмента для attach
+    """
+    def __init__(self, capacity: int, board_size: int, name: str | None = None, create: bool = True) -> None:
+        self.capacity = capacity
+        self.board_size = board_size
+        self.record_size = record_size(board_size)
+        self._results_offset = self.record_size * capacity
+        total = self._results_offset + _RESULT.size * capacity
+        self._owner = create
+        if create:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=total)
+        else:
+            # Процессы пула - дочерние и делят resource_tracker владельца: повторная
+            # регистрация сегмента при подключении ничего не меняет, удаляет его только владелец
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._buffer = self._shm.buf
+        self._results = self._buffer[self._results_offset:total].cast('i')
+
+    @classmethod
+    def attach(cls, name: str, capacity: int, board_size: int) -> 'PositionArena':
+        return cls(capacity, board_size, name=name, create=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def results(self) -> memoryview:
+        return self._results
+
+    def __enter__(self) -> 'PositionArena':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Освобождает представления буфера (иначе SharedMemory.close падает с BufferError)
+        и отключается от сегмента. Владелец удаляет сегмент
+        """
+        if self._buffer is None:
+            return
+        self._results.release()
+        self._results = None
+        self._buffer = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def _check_slot(self, slot: int) -> int:
+        if not 0 <= slot < self.capacity:
+            raise IndexError(f'Слот {slot} вне арены на {self.capacity} позиций')
+        return slot * self.record_size
+
+    def write(self, slot: int, position: Position) -> None:
+        offset = self._check_slot(slot)
+        if position.size != self.board_size:
+            raise SnapshotError(f'Доска {position.size}x{position.size} не подходит арене {self.board_size}')
+        players = position.players
+        if len(players) > MAX_PLAYERS:
+            raise SnapshotError(f'Арена поддерживает не более {MAX_PLAYERS} игроков')
+
+        padding = MAX_PLAYERS - len(players)
+        kinds = [player.kind for player in players] + [0] * padding
+        points = [player.points for player in players] + [0] * padding
+        counts = []
+        for player in players:
+            counts.extend(player.hand.count(type_idx) for type_idx in range(len(TOKEN_TYPES)))
+        counts.extend([0] * (len(TOKEN_TYPES) * padding))
+
+        _RECORD_HEADER.pack_into(
+            self._buffer, offset, position.size, position.current, len(players), *kinds, *points, *counts
+        )
+        start = offset + _RECORD_HEADER.size
+        self._buffer[start:start + len(position.cells)] = bytes(position.cells)
+
+    def write_batch(self, start: int, positions: list[Position]) -> None:
+        for slot, position in enumerate(positions, start):
+            self.write(slot, position)
+
+    def read(self, slot: int) -> Position:
+        offset = self._check_slot(slot)
+        fields = _RECORD_HEADER.unpack_from(self._buffer, offset)
+        size, current, players_amount = fields[:3]
+        kinds = fields[3:3 + MAX_PLAYERS]
+        points = fields[3 + MAX_PLAYERS:3 + 2 * MAX_PLAYERS]
+        counts = fields[3 + 2 * MAX_PLAYERS:]
+
+        types = len(TOKEN_TYPES)
+        players = [
+            PlayerState(
+                kinds[idx],
+                points[idx],
+                [type_idx for type_idx in range(types) for _ in range(counts[idx * types + type_idx])],
+            )
+            for idx in range(players_amount)
+        ]
+        return Position(size, current, list(self.cells(slot)), players)
+
+    def cells(self, slot: int) -> memoryview:
+        start = self._check_slot(slot) + _RECORD_HEADER.size
+        return self._buffer[start:start + self.board_size * self.board_size]
+
+
+# Арена процесса пула: подключается один раз инициализатором пула
+_worker_arena: PositionArena | None = None
+
+
+def _attach_worker(name: str, capacity: int, board_size: int) -> None:
+    global _worker_arena
+    _worker_arena = PositionArena.attach(name, capacity, board_size)
+
+
+def _evaluate_slots(args: tuple[int, int, int]) -> int:
+    """
+    Оценка позиций слотов [start, stop) перебором на глубину depth,
+    оценки пишутся в results арены. Возвращает число оцененных позиций.
+    Позиции с одинаковыми операндами (например, после разных ходов из одной
+    позиции) делят движок и таблицу перестановок
+    """
+    start, stop, depth = args
+    arena = _worker_arena
+    searcher = Searcher(depth)
+    results = arena.results
+    engines: dict[bytes, tuple[SearchEngine, dict]] = {}
+    for slot in range(start, stop):
+        position = arena.read(slot)
+        layout = arena.cells(slot).tobytes().translate(_OPERANDS_ONLY)
+        if layout not in engines:
+            engines[layout] = (searcher.engine_for(position), {})
+        engine, table = engines[layout]
+        results[slot] = searcher.evaluate_position(position, engine, table)
+    return stop - start
+
+
+def _count_empty_slots(args: tuple[int, int, int]) -> int:
+    """
+    Минимальная работа над слотами - для замера стоимости передачи позиций
+    """
+    start, stop, _ = args
+    arena = _worker_arena
+    results = arena.results
+    for slot in range(start, stop):
+        results[slot] = arena.cells(slot).tobytes().count(CELL_EMPTY)
+    return stop - start
+
+
+class ArenaPool:
+    """
+    ОПИСАНИЕ:
+    - Пул процессов, получающий позиции через PositionArena. Позиции пишутся
+    в арену пачками по capacity, процессам уходят только диапазоны слотов,
+    результаты читаются из общего массива. Арена и пул закрываются в close
+    (или при выходе из with), в том числе после ошибки
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - evaluate: оценки позиций для игрока, который ходит (Searcher.evaluate_position)
+    - map_slots: применить функцию уровня модуля к позициям по диапазонам слотов
+    - close: остановить пул и удалить арену
+    """
+    def __init__(
+            self,
+            board_size: int,
+            capacity: int = settings.ARENA_CAPACITY,
+            workers: int | None = None,
+            chunk: int = settings.ARENA_CHUNK,
+            ) -> None:
+        # Пул создается вместе с ареной - multiprocessing не грузим при запуске игры
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk = chunk
+        self.arena = PositionArena(capacity, board_size)
+        try:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_attach_worker,
+                initargs=(self.arena.name, capacity, board_size),
+            )
+        except Exception:
+            self.arena.close()
+            raise
+
+    def __enter__(self) -> 'ArenaPool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        self.arena.close()
+
+    def map_slots(self, func, positions: list[Position], arg: int = 0) -> list[int]:
+        """
+        func(start, stop, arg) оценивает слоты и пишет результаты в арену.
+        Позиции больше capacity обрабатываются несколькими пачками
+        """
+        arena = self.arena
+        results: list[int] = []
+        for batch_start in range(0, len(positions), arena.capacity):
+            batch = positions[batch_start:batch_start + arena.capacity]
+            arena.write_batch(0, batch)
+            ranges = [
+                (start, min(start + self.chunk, len(batch)), arg)
+                for start in range(0, len(batch), self.chunk)
+            ]
+            for _ in self._executor.map(func, ranges):
+                pass
+            results.extend(arena.results[:len(batch)].tolist())
+        return results
+
+    def evaluate(self, positions: list[Position], depth: int = settings.AI_SEARCH_DEPTH) -> list[int]:
+        return self.map_slots(_evaluate_slots, positions, depth)
+
+
+def _count_empty_pickled(positions: list[Position]) -> list[int]:
+    return [position.cells.count(CELL_EMPTY) for position in positions]
+
+
+def main() -> None:
+    """
+    Замер передачи позиций процессам пула: python -m core.arena --positions 100000
+    Сравнивает передачу через арену с передачей объектов Position через pickle
+    """
+    parser = argparse.ArgumentParser(description='Скорость передачи позиций процессам пула')
+    parser.add_argument('--positions', type=int, default=100000)
+    parser.add_argument('--size', type=int, default=5, help='размер доски')
+    parser.add_argument('--workers', type=int, default=None, help='число процессов')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    from core.rng import GameRandom
+    from core.simulate import random_position
+
+    rng = GameRandom(args.seed)
+    positions = [random_position(args.size, 2, settings.INITIAL_TOKENS, rng) for _ in range(args.positions)]
+    workers = args.workers or os.cpu_count() or 1
+
+    with ArenaPool(args.size, workers=workers) as pool:
+        pool.map_slots(_count_empty_slots, positions[:pool.chunk])  # прогрев процессов
+        started = time.perf_counter()
+        shared = pool.map_slots(_count_empty_slots, positions)
+        arena_elapsed = time.perf_counter() - started
+
+    chunk = settings.ARENA_CHUNK
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(_count_empty_pickled, [positions[:chunk]]))
+        started = time.perf_counter()
+        pickled = [
+            value
+            for values in executor.map(
+                _count_empty_pickled, [positions[i:i + chunk] for i in range(0, len(positions), chunk)]
+            )
+            for value in values
+        ]
+        pickle_elapsed = time.perf_counter() - started
+
+    if shared != pickled:
+        raise SystemExit('Результаты арены и pickle расходятся')
+    print(f'Арена:  {args.positions / arena_elapsed:,.0f} позиций/с ({arena_elapsed:.2f} с)')
+    print(f'Pickle: {args.positions / pickle_elapsed:,.0f} позиций/с ({pickle_elapsed:.2f} с)')
+
+
+if __name__ == '__main__':
+    main()
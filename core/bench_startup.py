@@ -0,0 +1,94 @@
+# core/bench_startup.py
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from core import settings
+
+FIRST_PROMPT = 'начинаем игру'
+
+
+def measure_once(command: list[str]) -> float:
+    """
+    Время от запуска процесса до первого запроса ввода, мс.
+    input() сбрасывает stdout перед чтением, поэтому появление
+    текста запроса в канале и есть момент готовности к вводу
+    """
+    env = dict(os.environ, PYTHONUNBUFFERED='0')
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        command,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        env=env,
+    )
+    output = b''
+    try:
+        while FIRST_PROMPT.encode('utf-8') not in output:
+            chunk = process.stdout.read1(4096)
+            if not chunk:
+                raise RuntimeError('Процесс завершился до первого запроса ввода')
+            output += chunk
+        elapsed = (time.perf_counter() - started) * 1000
+    finally:
+        process.kill()
+        process.wait()
+    return elapsed
+
+
+def show_importtime(command: list[str], top: int) -> None:
+    """
+    Самые долгие импорты по данным python -X importtime
+    """
+    result = subprocess.run(
+        [command[0], '-X', 'importtime', *command[1:]],
+        input=b'N\n',
+        capture_output=True,
+    )
+    rows = []
+    for line in result.stderr.decode('utf-8', 'replace').splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+
+    print('Самые долгие импорты (собственное время, мкс):')
+    for self_us, cumulative_us, name in sorted(rows, reverse=True)[:top]:
+        print(f'{self_us:>8} {cumulative_us:>8}  {name}')
+
+
+def main() -> None:
+    """
+    Бенчмарк запуска: python -m core.bench_startup [--runs N] [--importtime]
+    Код возврата 1, если медиана времени до первого запроса превышает бюджет
+    """
+    parser = argparse.ArgumentParser(description='Время запуска консольной версии до первого запроса ввода')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget', type=float, default=settings.STARTUP_BUDGET_MS, help='бюджет, мс')
+    parser.add_argument('--importtime', action='store_true', help='показать самые долгие импорты')
+    args = parser.parse_args()
+
+    command = [sys.executable, '-m', 'core.main']
+    # Первый запуск прогревает кэш байткода и файловой системы
+    measure_once(command)
+    timings = [measure_once(command) for _ in range(args.runs)]
+    median = statistics.median(timings)
+
+    print(
+        f'Время до первого запроса: медиана {median:.1f} мс, '
+        f'мин {min(timings):.1f} мс, макс {max(timings):.1f} мс (запусков: {args.runs})'
+    )
+    if args.importtime:
+        show_importtime(command, top=15)
+
+    if median > args.budget:
+        print(f'Бюджет {args.budget:.0f} мс превышен')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
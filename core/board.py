@@ -3,8 +3,9 @@
 import logging
 import random
 from typing import Any
-from core import settings
+from core import profiling, settings
 from core.cells import Cell
+from core.elements import Element
 from core.exceptions import (
     CellOutOfBorderError, InvalidOperandError, 
     TokenInvalidError, CellOccupiedError,
@@ -30,16 +31,39 @@ class Board:
     - get_size_buffered: размер игрового поля, включая буфер
     - place_token: размещение токена в клетке
     - get_neighbors: соседние клетки по вертикали-горизонтали
+    - get_last_move: координаты последнего размещенного токена
+    - region_stats: счетчики заполненности и владельцев по областям поля
+    :::Внутренний слой (правила, ИИ, симуляции):::
+    Без проверок и логов. Координаты и содержимое проверены на границе Game/InputHandler.
+    При settings.ENGINE_ASSERTS проверки включаются и здесь
+    - peek: клетка по координатам, включая буфер
+    - peek_value: элемент клетки
+    - neighbor_values: элементы соседних клеток
+    - put_token: размещение токена в пустую клетку
+    - empty_cells: координаты пустых клеток поля
     """
+    # Смещения соседей в порядке: вверх, влево, вправо, вниз
+    NEIGHBOR_OFFSETS = [
+                (-1, 0),
+        (0, -1),         (0, 1),
+                 (1, 0),
+    ]
+
     def __init__(self, size: int = settings.BOARD_SIZE) -> None:
         """
         attr:_size - реальный размер игрового поля
         attr:_buffered_size - размер игрового поля с буфером (нужен для упрощения проверок и 1-индексации)
         attr:_grid - двумерный массив, хранящий клетки поля
+        attr:_last_move - координаты последнего размещенного токена
+        attr:_regions - счетчики по квадратным областям поля (для мини-карты):
+        число клеток, операндов, токенов и токенов каждого владельца
         """
         self._size: int = size
         self._buffered_size: int = size + 2
         self._grid: list[list[Cell]] = self._initialize()
+        self._last_move: tuple[int, int] | None = None
+        self._region_size: int = settings.MINIMAP_REGION
+        self._regions: dict[tuple[int, int], dict] = self._initialize_regions()
 
     def get_size(self):
         """
@@ -53,6 +77,44 @@ class Board:
         """
         return self._buffered_size
 
+    def get_last_move(self) -> tuple[int, int] | None:
+        """
+        Координаты последнего размещенного токена
+        """
+        return self._last_move
+
+    def get_region_size(self) -> int:
+        return self._region_size
+
+    def region_stats(self) -> dict[tuple[int, int], dict]:
+        """
+        Счетчики по областям поля {(индекс строки области, индекс столбца области): счетчики}.
+        Обновляются при размещении элементов, обход клеток не нужен
+        """
+        return self._regions
+
+    def _initialize_regions(self) -> dict[tuple[int, int], dict]:
+        regions = {}
+        side = self._region_size
+        for region_row in range((self._size + side - 1) // side):
+            for region_col in range((self._size + side - 1) // side):
+                height = min(side, self._size - region_row * side)
+                width = min(side, self._size - region_col * side)
+                regions[(region_row, region_col)] = {
+                    'cells': height * width, 'operands': 0, 'tokens': 0, 'owners': {},
+                }
+        return regions
+
+    def _track(self, element: Element, row: int, col: int) -> None:
+        region = self._regions[((row - 1) // self._region_size, (col - 1) // self._region_size)]
+        if isinstance(element, Token):
+            region['tokens'] += 1
+            owner = element.get_last_owner()
+            region['owners'][owner] = region['owners'].get(owner, 0) + 1
+            self._last_move = (row, col)
+        else:
+            region['operands'] += 1
+
     def _initialize(self) -> list[list[Cell]]:
         """
         Инициализация доски с пустыми клетками и буфером из заглушек
@@ -70,22 +132,38 @@ class Board:
 
         return grid
     
-    def setup(self) -> bool:
-        """Расстановка случайных операндов на поле"""
-        for row in range(1, self._size + 1):
-            for col in range(1, self._size + 1):
+    def setup(
+            self,
+            rng: random.Random | None = None,
+            layout: dict[tuple[int, int], bool] | None = None,
+            ) -> bool:
+        """
+        Расстановка случайных операндов на поле.
+        rng - генератор партии; без него используется модуль random
+        layout - готовая расстановка {(row, col): значение операнда} вместо случайной
+        """
+        with profiling.memory('Board.setup'):
+            if layout is not None:
+                for (row, col), value in layout.items():
+                    self._place_operand(TrueOperand() if value else FalseOperand(), row, col)
+                logger.info('Игровое поле восстановлено по расстановке.')
+                return True
 
-                # расстановка в шахматном порядке
-                if (row + col) % 2 == 0:
-                    operand = TrueOperand() if random.choice([0, 1]) else FalseOperand()
-                    self._place_operand(operand, row, col)
+            rng = rng or random
+            for row in range(1, self._size + 1):
+                for col in range(1, self._size + 1):
 
-        logger.info('Игровое поле успешно создано.')
-        return True
+                    # расстановка в шахматном порядке
+                    if (row + col) % 2 == 0:
+                        operand = TrueOperand() if rng.choice([0, 1]) else FalseOperand()
+                        self._place_operand(operand, row, col)
+
+            logger.info('Игровое поле успешно создано.')
+            return True
 
     
     def _validate_coordinate_type(self, row: int, col: int) -> None:
-        if not type(row) == int or not type(col) == int:
+        if type(row) is not int or type(col) is not int:
             logger.warning(f'Попытка получить координату не типа int: ({row}, {col})')
             raise BoardCoordinateTypeError(f'Координаты должны быть целыми числами')
 
@@ -134,6 +212,7 @@ class Board:
         """
         self._validate_operand_placement(operand, row, col)
         self.get_cell(row, col)._assign_value(operand)
+        self._track(operand, row, col)
         logger.debug(f"Операнд {operand.get_value()} размещен в клетке ({row}, {col})")
         return True
     
@@ -154,6 +233,7 @@ class Board:
         """
         self._validate_token_placement(token, row, col)
         self.get_cell(row, col).set_value(token)
+        self._track(token, row, col)
         logger.debug(
             f'Размещение к клетке ({row}, {col}) -> '
             f'успешно размещен токен {token.to_string()} c id:{token.get_id()}'
@@ -163,10 +243,62 @@ class Board:
         """
         Возвращает соседние клетки по горизонтали и вертикали
         """
-        neighbor_coords = [
-                    (-1, 0),  
-            (0, -1),         (0, 1),
-                     (1, 0),
+        return [self.get_cell_buffered(row + dx, col + dy) for dx, dy in self.NEIGHBOR_OFFSETS]
+
+    def _check_internal(self, row: int, col: int) -> None:
+        # Проверки внутреннего слоя - только в режиме отладки движка
+        self._validate_coordinate_type(row, col)
+        self._validate_coordinate_buffered(row, col)
+
+    def peek(self, row: int, col: int) -> Cell:
+        """
+        Клетка без проверок и логов (включая буфер)
+        """
+        if settings.ENGINE_ASSERTS:
+            self._check_internal(row, col)
+        return self._grid[row][col]
+
+    def peek_value(self, row: int, col: int) -> Element:
+        """
+        Элемент клетки без проверок и логов (включая буфер)
+        """
+        if settings.ENGINE_ASSERTS:
+            self._check_internal(row, col)
+        return self._grid[row][col].value
+
+    def neighbor_values(
+            self,
+            row: int,
+            col: int,
+            offsets: tuple[tuple[int, int], ...] | None = None,
+            ) -> list[Element]:
+        """
+        Элементы соседних клеток в порядке offsets (по умолчанию NEIGHBOR_OFFSETS),
+        без проверок и логов. Смещения - не дальше одной клетки (ширина буфера)
+        """
+        if settings.ENGINE_ASSERTS:
+            self._validate_coordinate(row, col)
+        grid = self._grid
+        return [grid[row + dx][col + dy].value for dx, dy in offsets or self.NEIGHBOR_OFFSETS]
+
+    def put_token(self, token: Token, row: int, col: int) -> None:
+        """
+        Размещение токена без проверок и логов. Клетка должна быть пустой
+        """
+        if settings.ENGINE_ASSERTS:
+            self._validate_coordinate_type(row, col)
+            self._validate_token_placement(token, row, col)
+        self._grid[row][col]._put(token)
+        self._track(token, row, col)
+
+    def empty_cells(self) -> list[tuple[int, int]]:
+        """
+        Координаты пустых клеток игрового поля
+        """
+        return [
+            (row, col)
+            for row in range(1, self._size + 1)
+            for col in range(1, self._size + 1)
+            if self._grid[row][col].is_empty
         ]
-        return [self.get_cell_buffered(row + dx, col + dy) for dx, dy in neighbor_coords]
 
@@ -0,0 +1,362 @@
+# core/book.py
+import argparse
+from bisect import bisect_left
+import heapq
+import logging
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+from typing import Iterable, Iterator
+
+from core import settings
+from core.exceptions import PositionIndexError
+from core.records import TOKEN_TYPES_BY_NAME, GameRecord, iter_records
+from core.search import SearchEngine
+from core.snapshots import TOKEN_TYPES, Position, decode_position, encode_position, position_key
+
+logger = logging.getLogger(__name__)
+
+# Формат файла индекса, little-endian:
+#   заголовок (32 байта): метка, число различных ключей, число вхождений
+#   ключи: отсортированные 64-битные хэши (Q на ключ) - по ним идет бинарный поиск
+#   сводки по ключам: вхождений, побед, ничьих (I), сумма перевеса (q), номер первого вхождения (Q)
+#   вхождения в порядке ключей: номер партии (I), полуход (H), перевес (h), итог (b)
+# Итог и перевес - для игрока, который ходит в позиции: 1 - победа, 0 - ничья, -1 - поражение
+INDEX_MAGIC = b'TTBOOK01'
+_HEADER = struct.Struct('<8sQQ8x')
+_SUMMARY = struct.Struct('<IIIqQ')
+_OCCURRENCE = struct.Struct('<IHhb')
+# Запись промежуточных прогонов внешней сортировки: ключ и вхождение
+_RUN_ENTRY = struct.Struct('<QIHhb')
+
+KEY_POSITION = 'position'
+KEY_LAYOUT = 'layout'
+
+
+def hash_key(data: bytes) -> int:
+    """
+    Стабильный 64-битный хэш ключа (hash() в Python меняется между запусками)
+    """
+    # hashlib нужен только индексу - не грузим его при запуске игры
+    from hashlib import blake2b
+
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), 'little')
+
+
+def position_hash(position: Position) -> int:
+    return hash_key(position_key(position))
+
+
+def layout_hash(position: Position) -> int:
+    """
+    Хэш расстановки операндов: только размер доски и коды клеток
+    """
+    return hash_key(bytes([position.size]) + bytes(position.cells))
+
+
+class PositionStats:
+    """
+    Сводка по ключу индекса: сколько раз встретилась позиция и чем кончились
+    партии для игрока, который в ней ходит
+    """
+    __slots__ = ('count', 'wins', 'draws', 'margin_sum')
+
+    def __init__(self, count: int, wins: int, draws: int, margin_sum: int) -> None:
+        self.count = count
+        self.wins = wins
+        self.draws = draws
+        self.margin_sum = margin_sum
+
+    @property
+    def losses(self) -> int:
+        return self.count - self.wins - self.draws
+
+    @property
+    def score(self) -> float:
+        """
+        Доля очков: победа - 1, ничья - 0.5
+        """
+        return (self.wins + 0.5 * self.draws) / self.count if self.count else 0.5
+
+    @property
+    def mean_margin(self) -> float:
+        return self.margin_sum / self.count if self.count else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f'PositionStats(count={self.count}, wins={self.wins}, draws={self.draws}, '
+            f'losses={self.losses}, mean_margin={self.mean_margin:.2f})'
+        )
+
+
+def _outcome(points: tuple[int, ...], player: int) -> tuple[int, int]:
+    """
+    (итог, перевес) партии для игрока: перевес - его очки минус лучший из соперников
+    """
+    margin = points[player] - max(value for idx, value in enumerate(points) if idx != player)
+    return (margin > 0) - (margin < 0), max(-32768, min(32767, margin))
+
+
+def record_entries(record: GameRecord, game_id: int, key: str = KEY_POSITION) -> list[tuple]:
+    """
+    Вхождения партии в индекс: (хэш, номер партии, полуход, перевес, итог).
+    Партия переигрывается на скомпилированных правилах, итог известен только в конце,
+    поэтому вхождения возвращаются списком после переигровки
+    """
+    start = decode_position(record.start)
+    engine = SearchEngine(start)
+    # Для расстановок операндов ключ один на партию - начальная позиция
+    plies = [(layout_hash(start), start.current)] if key == KEY_LAYOUT else []
+    kinds = [player.kind for player in start.players]
+    state = engine.state_from_position(start)
+
+    for name, row, col in record.moves:
+        if key == KEY_POSITION:
+            plies.append((position_hash(engine.position_from_state(state, kinds)), state.current))
+        type_idx = TOKEN_TYPES.index(TOKEN_TYPES_BY_NAME[name])
+        state = engine.apply(state, (type_idx, engine.cell_index(row, col)))
+
+    entries = []
+    for ply, (hashed, player) in enumerate(plies):
+        result, margin = _outcome(state.points, player)
+        entries.append((hashed, game_id, ply, margin, result))
+    return entries
+
+
+def _write_run(entries: list[tuple], directory: str, number: int) -> str:
+    entries.sort()
+    path = os.path.join(directory, f'run_{number:05d}.bin')
+    with open(path, 'wb') as f:
+        f.write(b''.join(_RUN_ENTRY.pack(*entry) for entry in entries))
+    return path
+
+
+def _read_run(path: str, block: int = 65536) -> Iterator[tuple]:
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(block * _RUN_ENTRY.size)
+            if not data:
+                return
+            yield from _RUN_ENTRY.iter_unpack(data)
+
+
+def build_index(
+        records: Iterable[GameRecord],
+        path: str,
+        key: str = KEY_POSITION,
+        run_size: int = settings.BOOK_RUN_SIZE,
+        ) -> tuple[int, int]:
+    """
+    Строит индекс внешней сортировкой: вхождения копятся прогонами по run_size,
+    каждый прогон сортируется и пишется на диск, затем прогоны сливаются
+    в один проход. В памяти - не больше одного прогона, так что архив
+    может быть больше памяти. Возвращает (число ключей, число вхождений)
+    """
+    directory = tempfile.mkdtemp(prefix='thundertruth-book-', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        runs = []
+        buffer: list[tuple] = []
+        for game_id, record in enumerate(records):
+            buffer.extend(record_entries(record, game_id, key))
+            if len(buffer) >= run_size:
+                runs.append(_write_run(buffer, directory, len(runs)))
+                buffer = []
+        if buffer or not runs:
+            runs.append(_write_run(buffer, directory, len(runs)))
+        logger.info(f'Прогонов внешней сортировки: {len(runs)}')
+
+        keys_path = os.path.join(directory, 'keys.bin')
+        summaries_path = os.path.join(directory, 'summaries.bin')
+        occurrences_path = os.path.join(directory, 'occurrences.bin')
+        keys_count = occurrences = 0
+        with open(keys_path, 'wb') as keys, open(summaries_path, 'wb') as summaries, \
+                open(occurrences_path, 'wb') as occurrences_file:
+            current = None
+            count = wins = draws = margin_sum = first = 0
+            for hashed, game_id, ply, margin, result in heapq.merge(*(_read_run(run) for run in runs)):
+                if hashed != current:
+                    if current is not None:
+                        keys.write(struct.pack('<Q', current))
+                        summaries.write(_SUMMARY.pack(count, wins, draws, margin_sum, first))
+                        keys_count += 1
+                    current, count, wins, draws, margin_sum, first = hashed, 0, 0, 0, 0, occurrences
+                count += 1
+                wins += result > 0
+                draws += result == 0
+                margin_sum += margin
+                occurrences_file.write(_OCCURRENCE.pack(game_id, ply, margin, result))
+                occurrences += 1
+            if current is not None:
+                keys.write(struct.pack('<Q', current))
+                summaries.write(_SUMMARY.pack(count, wins, draws, margin_sum, first))
+                keys_count += 1
+
+        # Готовый файл появляется целиком: пишем рядом и переименовываем
+        partial = path + '.partial'
+        with open(partial, 'wb') as f:
+            f.write(_HEADER.pack(INDEX_MAGIC, keys_count, occurrences))
+            for part in (keys_path, summaries_path, occurrences_path):
+                with open(part, 'rb') as source:
+                    shutil.copyfileobj(source, f)
+        os.replace(partial, path)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    logger.info(f'Индекс {path}: ключей {keys_count}, вхождений {occurrences}')
+    return keys_count, occurrences
+
+
+class PositionIndex:
+    """
+    ОПИСАНИЕ:
+    - Индекс позиций по сыгранным партиям: файл отображается в память (mmap),
+    ключ ищется бинарным поиском по массиву хэшей, сводка читается по смещению.
+    Файл не загружается в память целиком, запрос - десятки микросекунд
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - lookup / lookup_hash: сводка по позиции или None, если позиция не встречалась
+    - layout_stats: сводка по расстановке операндов (индекс с ключом layout)
+    - occurrences: вхождения позиции (номер партии, полуход, перевес, итог)
+    - close: закрыть файл
+    """
+    def __init__(self, path: str) -> None:
+        if sys.byteorder != 'little':
+            # Массив хэшей читается как массив Q в порядке байтов машины
+            raise PositionIndexError('Индекс позиций поддерживается только на little-endian машинах')
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as error:
+            self._file.close()
+            raise PositionIndexError(f'Пустой или поврежденный индекс {path}: {error}')
+
+        magic, self.keys_count, self.occurrences_count = _HEADER.unpack_from(self._map, 0)
+        expected = (
+            _HEADER.size + self.keys_count * (8 + _SUMMARY.size) + self.occurrences_count * _OCCURRENCE.size
+        )
+        if magic != INDEX_MAGIC or len(self._map) != expected:
+            self.close()
+            raise PositionIndexError(f'Файл {path} не является индексом позиций или поврежден')
+
+        self._view = memoryview(self._map)
+        self._hashes = self._view[_HEADER.size:_HEADER.size + 8 * self.keys_count].cast('Q')
+        self._summaries_offset = _HEADER.size + 8 * self.keys_count
+        self._occurrences_offset = self._summaries_offset + _SUMMARY.size * self.keys_count
+
+    def __enter__(self) -> 'PositionIndex':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.keys_count
+
+    def close(self) -> None:
+        if getattr(self, '_view', None) is not None:
+            self._hashes.release()
+            self._view.release()
+            self._view = None
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def _find(self, hashed: int) -> int | None:
+        idx = bisect_left(self._hashes, hashed)
+        if idx < self.keys_count and self._hashes[idx] == hashed:
+            return idx
+        return None
+
+    def lookup_hash(self, hashed: int) -> PositionStats | None:
+        idx = self._find(hashed)
+        if idx is None:
+            return None
+        count, wins, draws, margin_sum, _ = _SUMMARY.unpack_from(
+            self._map, self._summaries_offset + idx * _SUMMARY.size
+        )
+        return PositionStats(count, wins, draws, margin_sum)
+
+    def lookup(self, position: Position) -> PositionStats | None:
+        return self.lookup_hash(position_hash(position))
+
+    def layout_stats(self, position: Position) -> PositionStats | None:
+        return self.lookup_hash(layout_hash(position))
+
+    def occurrences(self, position: Position, limit: int | None = None) -> list[tuple[int, int, int, int]]:
+        idx = self._find(position_hash(position))
+        if idx is None:
+            return []
+        count, _, _, _, first = _SUMMARY.unpack_from(self._map, self._summaries_offset + idx * _SUMMARY.size)
+        count = count if limit is None else min(count, limit)
+        offset = self._occurrences_offset + first * _OCCURRENCE.size
+        return [
+            _OCCURRENCE.unpack_from(self._map, offset + i * _OCCURRENCE.size)
+            for i in range(count)
+        ]
+
+
+def rank_moves(
+        index: PositionIndex,
+        position: Position,
+        moves: list[tuple[type, int, int]],
+        min_count: int = settings.AI_BOOK_MIN_GAMES,
+        ) -> dict[tuple[type, int, int], float]:
+    """
+    Книга опыта: доля очков ходящего после каждого хода по сыгранным партиям.
+    В позиции после хода ходит соперник, поэтому его доля очков переворачивается.
+    Ходы, позиции после которых встречались реже min_count раз, не оцениваются
+    """
+    engine = SearchEngine(position)
+    state = engine.state_from_position(position)
+    kinds = [player.kind for player in position.players]
+    scores = {}
+    for move in moves:
+        token_type, row, col = move
+        child = engine.apply(state, (TOKEN_TYPES.index(token_type), engine.cell_index(row, col)))
+        stats = index.lookup(engine.position_from_state(child, kinds))
+        if stats is not None and stats.count >= min_count:
+            scores[move] = 1.0 - stats.score
+    return scores
+
+
+def main() -> None:
+    """
+    Построение индекса:  python -m core.book build games.jsonl book.idx [--key layout]
+    Запрос по позиции:   python -m core.book query book.idx <снимок позиции в hex>
+    """
+    parser = argparse.ArgumentParser(description='Индекс позиций по сыгранным партиям ThunderTruth')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='построить индекс по логу или JSONL-файлу партий')
+    build.add_argument('archive')
+    build.add_argument('path')
+    build.add_argument('--key', choices=[KEY_POSITION, KEY_LAYOUT], default=KEY_POSITION)
+    build.add_argument('--run-size', type=int, default=settings.BOOK_RUN_SIZE, help='вхождений в прогоне сортировки')
+    query = commands.add_parser('query', help='сводка по позиции')
+    query.add_argument('path')
+    query.add_argument('snapshot', help='снимок позиции (Game.snapshot) в hex')
+    query.add_argument('--layout', action='store_true', help='искать расстановку операндов')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        started = time.perf_counter()
+        keys, occurrences = build_index(iter_records(args.archive), args.path, args.key, args.run_size)
+        print(f'Ключей: {keys}, вхождений: {occurrences}, время: {time.perf_counter() - started:.1f} с')
+        return
+
+    position = decode_position(bytes.fromhex(args.snapshot))
+    with PositionIndex(args.path) as index:
+        started = time.perf_counter()
+        stats = index.layout_stats(position) if args.layout else index.lookup(position)
+        elapsed = time.perf_counter() - started
+    print(stats if stats is not None else 'Позиция не встречалась')
+    print(f'Запрос: {elapsed * 1e6:.0f} мкс, снимок: {encode_position(position).hex()}')
+
+
+if __name__ == '__main__':
+    main()
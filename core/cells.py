@@ -53,6 +53,13 @@ class Cell:
         self._value = value
         return True
     
+    def _put(self, value: Element) -> None:
+        """
+        Назначение без проверок и логов.
+        Для внутреннего слоя движка: проверки сделаны на границе Game/Board
+        """
+        self._value = value
+
     def _validate_mutable(self, value: Element):
         # Переданное значение - неизменяемый элемент
         if isinstance(value, Element) and value.is_immutable():
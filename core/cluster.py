@@ -0,0 +1,474 @@
+# core/cluster.py
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+from core import settings
+from core.exceptions import ClusterProtocolError, ClusterTimeoutError
+from core.simulate import POLICY_GREEDY, POLICY_RANDOM, simulate_chunk
+from core.stats import GameStats
+from core.variants import DEFAULT_SPEC, VARIANTS
+
+logger = logging.getLogger(__name__)
+
+# Заголовок сообщения - длина тела в байтах, тело - JSON в UTF-8
+_HEADER = struct.Struct('!I')
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+
+
+def send_message(sock: socket.socket, message: dict) -> None:
+    body = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(body)) + body)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            raise ConnectionError('Соединение закрыто')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_message(sock: socket.socket) -> dict:
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if size > MAX_MESSAGE_SIZE:
+        raise ClusterProtocolError(f'Слишком длинное сообщение: {size} байт')
+    try:
+        message = json.loads(_recv_exact(sock, size))
+    except ValueError as error:
+        raise ClusterProtocolError(f'Сообщение не JSON: {error}')
+    if not isinstance(message, dict) or 'type' not in message:
+        raise ClusterProtocolError(f'Сообщение без типа: {message!r}')
+    return message
+
+
+class Batch:
+    """
+    Пачка партий: аргументы simulate_chunk. Генераторы партий выводятся
+    из сквозного номера первой партии пачки, поэтому итог не зависит
+    от того, какой узел ее сыграл
+    """
+    __slots__ = ('batch_id', 'first', 'games', 'size', 'players', 'tokens', 'policy', 'seed', 'variant')
+
+    def __init__(
+            self,
+            batch_id: int,
+            first: int,
+            games: int,
+            size: int,
+            players: int,
+            tokens: int,
+            policy: str,
+            seed: int,
+            variant: str,
+            ) -> None:
+        self.batch_id = batch_id
+        self.first = first
+        self.games = games
+        self.size = size
+        self.players = players
+        self.tokens = tokens
+        self.policy = policy
+        self.seed = seed
+        self.variant = variant
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Batch':
+        return cls(**{name: data[name] for name in cls.__slots__})
+
+    def task(self) -> tuple:
+        return (
+            self.games, self.size, self.players, self.tokens, self.policy, self.seed, self.first, self.variant
+        )
+
+
+class _WorkerConnection(socketserver.BaseRequestHandler):
+    """
+    Соединение с рабочим узлом: узел сам запрашивает пачки (request), присылает
+    итоги (result) и heartbeat во время счета. Ответ координатора - batch, wait или stop
+    """
+    server: '_CoordinatorServer'
+
+    def handle(self) -> None:
+        coordinator = self.server.coordinator
+        sock = self.request
+        worker_id = f'{self.client_address[0]}:{self.client_address[1]}'
+        coordinator._register(worker_id, sock)
+        try:
+            while True:
+                message = recv_message(sock)
+                coordinator._touch(worker_id)
+                kind = message['type']
+                if kind == 'hello':
+                    logger.info(f'Узел {worker_id} подключился: {message.get("name")}')
+                elif kind == 'heartbeat':
+                    continue
+                elif kind == 'result':
+                    coordinator._complete(worker_id, message['batch_id'], message['stats'], message.get('elapsed'))
+                elif kind == 'request':
+                    send_message(sock, coordinator._next_message(worker_id))
+                else:
+                    raise ClusterProtocolError(f'Неизвестный тип сообщения: {kind}')
+        except (ConnectionError, OSError, ClusterProtocolError, KeyError) as error:
+            logger.info(f'Узел {worker_id} отключился: {error!r}')
+        finally:
+            coordinator._unregister(worker_id)
+
+
+class _CoordinatorServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: tuple[str, int], coordinator: 'Coordinator') -> None:
+        self.coordinator = coordinator
+        super().__init__(address, _WorkerConnection)
+
+
+class Coordinator:
+    """
+    ОПИСАНИЕ:
+    - Координатор симуляции на нескольких машинах. Делит партии на пачки и раздает
+    их рабочим узлам по TCP по запросу узла, так что быстрые узлы берут больше.
+    Узел без сообщений дольше heartbeat_timeout или с разорванным соединением
+    считается мертвым - его пачки возвращаются в очередь. Итог пачки учитывается
+    ровно один раз по ее номеру: повторный итог перевыданной пачки отбрасывается
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - start: открыть порт для узлов
+    - run: сыграть партии на подключенных узлах и вернуть общую статистику
+    - stop: закрыть порт и соединения
+    :::Свойства:::
+    - address: (host, port) координатора
+    """
+    def __init__(
+            self,
+            host: str = settings.CLUSTER_HOST,
+            port: int = settings.CLUSTER_PORT,
+            heartbeat_timeout: float = settings.CLUSTER_HEARTBEAT_TIMEOUT,
+            ) -> None:
+        """
+        attr:_pending - номера пачек в очереди на выдачу
+        attr:_in_flight - {номер пачки: узел}, выданные и не завершенные пачки
+        attr:_done - номера учтенных пачек
+        """
+        self.host = host
+        self.port = port
+        self.heartbeat_timeout = heartbeat_timeout
+        self._lock = threading.Condition()
+        self._batches: dict[int, Batch] = {}
+        self._pending: list[int] = []
+        self._in_flight: dict[int, str] = {}
+        self._done: set[int] = set()
+        self._total = GameStats()
+        self._workers: dict[str, tuple[socket.socket, float]] = {}
+        self._finished = False
+        self._server: _CoordinatorServer | None = None
+        self.duplicates = 0
+        self.reissued = 0
+
+    @property
+    def address(self) -> tuple[str, int]:
+        if self._server is None:
+            return self.host, self.port
+        return self._server.server_address[:2]
+
+    def start(self) -> 'Coordinator':
+        self._server = _CoordinatorServer((self.host, self.port), self)
+        threading.Thread(target=self._server.serve_forever, name='cluster-server', daemon=True).start()
+        threading.Thread(target=self._watch, name='cluster-watchdog', daemon=True).start()
+        logger.info(f'Координатор слушает {self.address[0]}:{self.address[1]}')
+        return self
+
+    def stop(self) -> None:
+        """
+        Узлы на следующем запросе получают stop и отключаются сами;
+        не успевшие за heartbeat_timeout отключаются принудительно
+        """
+        with self._lock:
+            self._finished = True
+            self._lock.wait_for(lambda: not self._workers, timeout=self.heartbeat_timeout)
+            sockets = [sock for sock, _ in self._workers.values()]
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def run(self, batches: list[Batch], timeout: float = settings.CLUSTER_TIMEOUT) -> GameStats:
+        """
+        Раздает пачки и ждет, пока итог каждой не будет учтен.
+        Если timeout секунд нет ни одного узла и ни одна пачка не учтена -
+        ClusterTimeoutError с номерами неучтенных пачек (0 - ждать без ограничения)
+        """
+        with self._lock:
+            self._batches = {batch.batch_id: batch for batch in batches}
+            self._pending = [batch.batch_id for batch in reversed(batches)]
+            self._in_flight.clear()
+            self._done.clear()
+            self._total = GameStats()
+            self._finished = False
+            idle_since = time.monotonic()
+            done = 0
+            while len(self._done) < len(self._batches):
+                if self._workers or len(self._done) != done:
+                    idle_since = time.monotonic()
+                    done = len(self._done)
+                elif timeout > 0 and time.monotonic() - idle_since >= timeout:
+                    self._finished = True
+                    pending = sorted(set(self._batches) - self._done)
+                    raise ClusterTimeoutError(
+                        f'Нет узлов {timeout} с, не учтено пачек: {len(pending)} из {len(self._batches)}: {pending}'
+                    )
+                self._lock.wait(min(1.0, timeout) if timeout > 0 else None)
+            self._finished = True
+            return self._total
+
+    # Вызывается из потоков соединений
+
+    def _register(self, worker_id: str, sock: socket.socket) -> None:
+        with self._lock:
+            self._workers[worker_id] = (sock, time.monotonic())
+
+    def _touch(self, worker_id: str) -> None:
+        with self._lock:
+            if worker_id in self._workers:
+                self._workers[worker_id] = (self._workers[worker_id][0], time.monotonic())
+
+    def _unregister(self, worker_id: str) -> None:
+        with self._lock:
+            self._workers.pop(worker_id, None)
+            self._requeue(worker_id)
+            self._lock.notify_all()
+
+    def _requeue(self, worker_id: str) -> None:
+        lost = [batch_id for batch_id, owner in self._in_flight.items() if owner == worker_id]
+        for batch_id in lost:
+            del self._in_flight[batch_id]
+            self._pending.append(batch_id)
+            self.reissued += 1
+        if lost:
+            logger.warning(f'Пачки узла {worker_id} возвращены в очередь: {lost}')
+
+    def _next_message(self, worker_id: str) -> dict:
+        with self._lock:
+            if self._finished or (self._batches and len(self._done) == len(self._batches)):
+                return {'type': 'stop'}
+            if self._pending:
+                batch_id = self._pending.pop()
+                self._in_flight[batch_id] = worker_id
+                return {'type': 'batch', 'batch': self._batches[batch_id].to_dict()}
+            # Очередь пуста, но пачки еще считаются - узел подождет возможной перевыдачи
+            return {'type': 'wait', 'delay': min(1.0, self.heartbeat_timeout / 4)}
+
+    def _complete(self, worker_id: str, batch_id: int, stats: dict, elapsed: float | None) -> None:
+        with self._lock:
+            if batch_id in self._done or batch_id not in self._batches:
+                self.duplicates += 1
+                logger.info(f'Повторный итог пачки {batch_id} от {worker_id} отброшен')
+                return
+            self._total.merge(GameStats.from_dict(stats))
+            self._done.add(batch_id)
+            self._in_flight.pop(batch_id, None)
+            if batch_id in self._pending:
+                self._pending.remove(batch_id)
+            logger.info(f'Пачка {batch_id} от {worker_id} учтена ({len(self._done)}/{len(self._batches)}, {elapsed} с)')
+            self._lock.notify_all()
+
+    def _watch(self) -> None:
+        """
+        Сторож: узлы без сообщений дольше heartbeat_timeout отключаются,
+        их пачки возвращаются в очередь
+        """
+        while self._server is not None:
+            time.sleep(self.heartbeat_timeout / 4)
+            now = time.monotonic()
+            with self._lock:
+                dead = [
+                    (worker_id, sock) for worker_id, (sock, seen) in self._workers.items()
+                    if now - seen > self.heartbeat_timeout
+                ]
+                for worker_id, sock in dead:
+                    logger.warning(f'Узел {worker_id} не отвечает {self.heartbeat_timeout} с - отключаем')
+                    del self._workers[worker_id]
+                    self._requeue(worker_id)
+            for _, sock in dead:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+
+def make_batches(
+        games: int,
+        size: int = settings.BOARD_SIZE,
+        players: int = settings.PLAYERS_AMOUNT,
+        tokens: int = settings.INITIAL_TOKENS,
+        policy: str = POLICY_GREEDY,
+        seed: int = 0,
+        chunk: int = 1000,
+        variant: str = DEFAULT_SPEC.name,
+        ) -> list[Batch]:
+    """
+    Пачки в том же порядке и с теми же номерами партий, что и в simulate: итог
+    кластера совпадает с локальной симуляцией при том же seed
+    """
+    return [
+        Batch(batch_id, start, min(chunk, games - start), size, players, tokens, policy, seed, variant)
+        for batch_id, start in enumerate(range(0, games, chunk))
+    ]
+
+
+def run_worker(
+        host: str = settings.CLUSTER_HOST,
+        port: int = settings.CLUSTER_PORT,
+        heartbeat_interval: float = settings.CLUSTER_HEARTBEAT_INTERVAL,
+        retries: int = 5,
+        ) -> int:
+    """
+    Рабочий узел: берет пачки у координатора, пока тот не скажет stop.
+    Пока пачка считается, отдельный поток шлет heartbeat. При обрыве
+    соединения узел переподключается (не больше retries попыток подряд).
+    Возвращает число сыгранных пачек
+    """
+    played = 0
+    failures = 0
+    name = f'{socket.gethostname()}-{os.getpid()}'
+    while failures < retries:
+        try:
+            with socket.create_connection((host, port)) as sock:
+                failures = 0
+                send_lock = threading.Lock()
+                with send_lock:
+                    send_message(sock, {'type': 'hello', 'name': name})
+                while True:
+                    with send_lock:
+                        send_message(sock, {'type': 'request'})
+                    message = recv_message(sock)
+                    if message['type'] == 'stop':
+                        logger.info(f'Узел {name}: работа окончена, пачек {played}')
+                        return played
+                    if message['type'] == 'wait':
+                        time.sleep(message['delay'])
+                        continue
+                    batch = Batch.from_dict(message['batch'])
+                    stats, elapsed = _play_batch(sock, send_lock, batch, heartbeat_interval)
+                    with send_lock:
+                        send_message(sock, {
+                            'type': 'result', 'batch_id': batch.batch_id,
+                            'stats': stats.to_dict(), 'elapsed': round(elapsed, 3),
+                        })
+                    played += 1
+        except (ConnectionError, OSError, ClusterProtocolError) as error:
+            failures += 1
+            logger.warning(f'Узел {name}: нет связи с координатором ({error!r}), попытка {failures}/{retries}')
+            time.sleep(min(2.0 ** failures / 10, 5.0))
+    return played
+
+
+def _play_batch(
+        sock: socket.socket,
+        send_lock: threading.Lock,
+        batch: Batch,
+        heartbeat_interval: float,
+        ) -> tuple[GameStats, float]:
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(heartbeat_interval):
+            try:
+                with send_lock:
+                    send_message(sock, {'type': 'heartbeat', 'batch_id': batch.batch_id})
+            except OSError:
+                return
+
+    heartbeat = threading.Thread(target=beat, name='cluster-heartbeat', daemon=True)
+    heartbeat.start()
+    started = time.perf_counter()
+    try:
+        stats = simulate_chunk(batch.task())
+    finally:
+        stop.set()
+        heartbeat.join()
+    return stats, time.perf_counter() - started
+
+
+def spawn_local_workers(count: int, host: str, port: int) -> list[subprocess.Popen]:
+    """
+    Локальные процессы-узлы - замена отдельных машин для проверки на localhost
+    """
+    command = [sys.executable, '-m', 'core.cluster', 'worker', '--host', host, '--port', str(port)]
+    return [subprocess.Popen(command) for _ in range(count)]
+
+
+def main() -> None:
+    """
+    Координатор: python -m core.cluster coordinator --games 1000000 --local 4
+    Узел:        python -m core.cluster worker --host 10.0.0.1
+    """
+    parser = argparse.ArgumentParser(description='Симуляция партий ThunderTruth на нескольких машинах')
+    parser.add_argument('role', choices=['coordinator', 'worker'])
+    parser.add_argument('--host', default=settings.CLUSTER_HOST)
+    parser.add_argument('--port', type=int, default=settings.CLUSTER_PORT)
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--size', type=int, default=settings.BOARD_SIZE, help='размер доски')
+    parser.add_argument('--players', type=int, default=settings.PLAYERS_AMOUNT)
+    parser.add_argument('--tokens', type=int, default=settings.INITIAL_TOKENS)
+    parser.add_argument('--policy', choices=[POLICY_RANDOM, POLICY_GREEDY], default=POLICY_GREEDY)
+    parser.add_argument('--seed', type=int, default=settings.SEED or 0)
+    parser.add_argument('--chunk', type=int, default=1000, help='партий в пачке')
+    parser.add_argument('--variant', choices=list(VARIANTS), default=DEFAULT_SPEC.name, help='вариант правил')
+    parser.add_argument('--local', type=int, default=0, help='запустить столько локальных узлов')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOGGING_LEVEL, format=settings.LOGGING_FORMAT, datefmt=settings.LOGGING_DATEFMT)
+
+    if args.role == 'worker':
+        run_worker(args.host, args.port)
+        return
+
+    batches = make_batches(
+        args.games, args.size, args.players, args.tokens, args.policy, args.seed, args.chunk, args.variant
+    )
+    coordinator = Coordinator(args.host, args.port).start()
+    host, port = coordinator.address
+    workers = spawn_local_workers(args.local, host, port)
+    started = time.perf_counter()
+    try:
+        stats = coordinator.run(batches)
+    except ClusterTimeoutError as error:
+        logger.error(str(error))
+        sys.exit(1)
+    finally:
+        coordinator.stop()
+        for process in workers:
+            process.wait()
+    elapsed = time.perf_counter() - started
+
+    print(stats.summary())
+    print(
+        f'Время: {elapsed:.1f} с ({stats.games / elapsed:.0f} партий/с), '
+        f'перевыдано пачек: {coordinator.reissued}, повторных итогов: {coordinator.duplicates}'
+    )
+
+
+if __name__ == '__main__':
+    main()
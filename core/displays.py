@@ -1,13 +1,20 @@
 # core/displays.py
 from abc import ABC, abstractmethod
 import logging
+from typing import TYPE_CHECKING
 
 from colorama import Fore, Style
 
 from core import settings, utils
 from core.board import Board
 from core.elements import Stub
+from core.events import EventBus, PointsAwarded, RoundEnded, TurnEnded, XorSteal
 from core.players import Player
+from core.snapshots import CELL_EMPTY, CELL_FALSE, CELL_TRUE
+
+if TYPE_CHECKING:
+    # Только для аннотаций: подсказки загружаются при первом запросе
+    from core.hints import Hints
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +31,7 @@ class Display(ABC):
         pass
 
     @abstractmethod
-    def show_score(self, players: list[Player]):
+    def show_score(self, players: list[Player], scores: tuple[int, ...]):
         pass
 
     @abstractmethod
@@ -43,6 +50,38 @@ class Display(ABC):
     def show_winner(self, winner: Player | None) -> None:
         pass
 
+    def show_ponder_report(self, report: str) -> None:
+        """
+        Сводка ИИ за раунд: какая доля ходов взята из обдуманного
+        """
+        self.show_prompt(report)
+
+    def subscribe(self, events: EventBus) -> None:
+        """
+        Подписка на события партии: очки, XOR-кража, конец хода и раунда
+        """
+        events.subscribe(PointsAwarded, self._on_points_awarded)
+        events.subscribe(XorSteal, self._on_xor_steal)
+        events.subscribe(TurnEnded, self._on_turn_ended)
+        events.subscribe(RoundEnded, self._on_round_ended)
+
+    def _on_points_awarded(self, event: PointsAwarded) -> None:
+        self.show_prompt(f'Игрок {event.player.name} набирает {event.points} очков')
+
+    def _on_xor_steal(self, event: XorSteal) -> None:
+        self.show_prompt(f'Игрок {event.thief.name} набирает дополнительно +1 очко')
+        if event.amount:
+            self.show_prompt(f'Игрок {event.victim.name} лишается {event.amount} очка')
+
+    def _on_turn_ended(self, event: TurnEnded) -> None:
+        self.show_score(event.players, event.scores)
+        self.show_next_move_notification()
+
+    def _on_round_ended(self, event: RoundEnded) -> None:
+        self.display_board(event.board)
+        self.show_winner(event.winner)
+        self.show_prompt(f"Конец игры!")
+
 
 class ConsoleShowMixin:
     def _substitute_to_string(self, element, row, col):
@@ -64,7 +103,27 @@ class ConsoleShowMixin:
 
 
 class ConsoleDisplay(Display, ConsoleShowMixin):
-    def display_board(self, board: Board) -> None:
+    """
+    Вывод в консоль. Доски больше viewport_size выводятся окном вокруг
+    якоря (по умолчанию - последнего хода) с мини-картой заполненности по областям
+    """
+    MINIMAP_SHADES = ['.', '░', '▒', '▓', '█']
+
+    def __init__(self, viewport_size: int = settings.VIEWPORT_SIZE) -> None:
+        self.viewport_size = viewport_size
+        self._anchor: tuple[int, int] | None = None
+
+    def set_anchor(self, anchor: tuple[int, int] | None) -> None:
+        """
+        Центр окна просмотра. None - следовать за последним ходом
+        """
+        self._anchor = anchor
+
+    def display_board(self, board: Board, anchor: tuple[int, int] | None = None) -> None:
+        if board.get_size() > self.viewport_size:
+            self._display_viewport(board, anchor or self._anchor)
+            return
+
         output_board = []
 
         for row in range(board.get_size_buffered()):
@@ -79,12 +138,127 @@ class ConsoleDisplay(Display, ConsoleShowMixin):
         print(output_board)
         logger.debug(f'Отрисовано поле в коносль:\n{output_board}\n')
 
+    def _viewport_range(self, center: int, size: int) -> range:
+        first = min(max(1, center - self.viewport_size // 2), size - self.viewport_size + 1)
+        return range(first, first + self.viewport_size)
+
+    def _display_viewport(self, board: Board, anchor: tuple[int, int] | None) -> None:
+        """
+        Окно viewport_size x viewport_size: стоимость зависит только от размера окна
+        """
+        size = board.get_size()
+        center_row, center_col = anchor or board.get_last_move() or ((size + 1) // 2, (size + 1) // 2)
+        rows = self._viewport_range(center_row, size)
+        cols = self._viewport_range(center_col, size)
+
+        # Заголовки строк и столбцов - как у буфера из заглушек в полном выводе
+        header = Stub()
+        output_board = [' | '.join(
+            [self._substitute_to_string(header, 0, 0)] +
+            [self._substitute_to_string(header, 0, col) for col in cols]
+        )]
+        for row in rows:
+            row_cells = [self._substitute_to_string(header, row, 0)]
+            for col in cols:
+                element = board.get_cell_buffered(row, col).value
+                row_cells.append(self._substitute_to_string(element, row, col))
+            output_board.append(' | '.join(row_cells))
+        output_board = '\n'.join(output_board)
+
+        print(
+            f'{Style.DIM}Строки {rows[0]}-{rows[-1]}, столбцы {cols[0]}-{cols[-1]} '
+            f'из {size}x{size}{Style.RESET_ALL}'
+        )
+        print(output_board)
+        self.show_minimap(board)
+        logger.debug(f'Отрисовано окно поля в консоль: строки {rows[0]}-{rows[-1]}, столбцы {cols[0]}-{cols[-1]}')
+
+    def show_minimap(self, board: Board) -> None:
+        """
+        Мини-карта: символ на область поля. Плотность - доля занятых токенами клеток,
+        цвет - игрок с большинством токенов в области
+        """
+        stats = board.region_stats()
+        region_rows = max(region_row for region_row, _ in stats) + 1
+        region_cols = max(region_col for _, region_col in stats) + 1
+        shades = self.MINIMAP_SHADES
+
+        lines = []
+        for region_row in range(region_rows):
+            line = []
+            for region_col in range(region_cols):
+                region = stats[(region_row, region_col)]
+                free = region['cells'] - region['operands']
+                filled = region['tokens'] / free if free else 0
+                shade = shades[0] if not region['tokens'] else shades[1 + min(3, int(filled * 3))]
+                owners = region['owners']
+                if owners:
+                    leader = max(owners, key=owners.get)
+                    shade = self.colorize(shade, leader.get_color() if leader else Fore.WHITE)
+                line.append(shade)
+            lines.append(''.join(line))
+
+        print(f'Мини-карта (область {board.get_region_size()}x{board.get_region_size()}):')
+        print('\n'.join(lines))
+
+    def show_hints(self, hints: 'Hints') -> None:
+        """
+        Подсказка: лучшие ходы и карта оценок свободных клеток для каждого типа
+        токена в руке. Лучшая оценка - зеленым, хуже лучшей на 3 и более - красным.
+        На больших досках карта выводится окном вокруг лучшего хода
+        """
+        if not hints.values:
+            self.show_prompt('Подсказка: ходов нет')
+            return
+
+        if not hints.complete:
+            print(
+                f'{Style.DIM}Подсказка неполная: оценено перебором {hints.searched} из {len(hints.values)} ходов, '
+                f'остальные - по очкам сразу после хода{Style.RESET_ALL}'
+            )
+        best_moves = ', '.join(
+            f'{token_type.__name__} ({row}, {col}): {value:+d}' for (token_type, row, col), value in hints.top()
+        )
+        print(f'Лучшие ходы (глубина {hints.depth}): {best_moves}')
+
+        position = hints.position
+        token_types = list(dict.fromkeys(token_type for token_type, _, _ in hints.values))
+        for token_type in token_types:
+            heatmap = hints.heatmap(token_type)
+            best = max(heatmap.values())
+            best_row, best_col = max(heatmap, key=heatmap.get)
+            rows = cols = range(1, position.size + 1)
+            if position.size > self.viewport_size:
+                rows = self._viewport_range(best_row, position.size)
+                cols = self._viewport_range(best_col, position.size)
+
+            lines = ['     ' + ' '.join(self.colorize(f'{col:>3}', Fore.LIGHTMAGENTA_EX) for col in cols)]
+            for row in rows:
+                line = [self.colorize(f'{row:>3}', Fore.LIGHTMAGENTA_EX) + '  ']
+                for col in cols:
+                    code = position.get(row, col)
+                    if (row, col) in heatmap:
+                        value = heatmap[(row, col)]
+                        color = Fore.GREEN if value == best else Fore.RED if value <= best - 3 else Fore.WHITE
+                        line.append(self.colorize(f'{value:>3}', color))
+                    elif code in (CELL_FALSE, CELL_TRUE):
+                        line.append(f'{Style.DIM}{"T" if code == CELL_TRUE else "F":>3}{Style.RESET_ALL}')
+                    elif code == CELL_EMPTY:
+                        line.append('   ')
+                    else:
+                        line.append(f'{"·":>3}')
+                lines.append(' '.join(line))
+
+            print(f'{Style.BRIGHT}{token_type.__name__}{Style.RESET_ALL}:')
+            print('\n'.join(lines))
+        logger.debug(f'Выведена подсказка: {best_moves}')
+
     def show_prompt(self, msg: str) -> None:
         print(msg)
         logger.debug(f'Выведено сообщение в консоль: {msg}')
 
-    def show_score(self, players: list[Player]):
-        result_table = {player.name:player.get_points() for player in players}
+    def show_score(self, players: list[Player], scores: tuple[int, ...]):
+        result_table = {player.name: points for player, points in zip(players, scores)}
         str_output = '\n'.join(map(lambda x: f'{x[0]}: {x[1]}', result_table.items()))
         print(
             f'{Style.BRIGHT}Текущий счет:\n'
@@ -97,9 +271,7 @@ class ConsoleDisplay(Display, ConsoleShowMixin):
             f"{''.join(self._get_rules())}\n{'=' * 75}\n")
 
     def _get_rules(self):
-        rules = utils.get_path_compiling('RULES.md')
-        with open(rules, 'r', encoding='utf-8') as f:
-            return f.readlines()
+        return utils.read_resource('RULES.md').splitlines(keepends=True)
         
     def show_now_turn(self, player: Player):
         print(f"Ход игрока {player.get_color()}{Style.BRIGHT}{player.name}{Style.RESET_ALL}")
@@ -110,6 +282,9 @@ class ConsoleDisplay(Display, ConsoleShowMixin):
     def show_next_move_notification(self) -> None:
         print(f'{Style.DIM}Следующий ход...{Style.RESET_ALL}')
 
+    def show_ponder_report(self, report: str) -> None:
+        print(f'{Style.DIM}{report}{Style.RESET_ALL}')
+
     def show_winner(self, winner: Player | None) -> None:
         if winner:
             print(
@@ -118,3 +293,36 @@ class ConsoleDisplay(Display, ConsoleShowMixin):
             )
         else:
             print(f"{Style.BRIGHT}Ничья{Style.RESET_ALL}")
+
+
+class NullDisplay(Display):
+    """
+    Дисплей без вывода: для анализа, симуляций и других режимов без консоли.
+    На события не подписывается - партия без подписчиков их даже не создает
+    """
+    def subscribe(self, events: EventBus) -> None:
+        pass
+
+    def display_board(self, board: Board) -> None:
+        pass
+
+    def show_prompt(self, msg: str) -> None:
+        pass
+
+    def show_score(self, players: list[Player], scores: tuple[int, ...]) -> None:
+        pass
+
+    def show_start(self) -> None:
+        pass
+
+    def show_now_turn(self, player: Player) -> None:
+        pass
+
+    def show_token_available(self, player: Player) -> None:
+        pass
+
+    def show_next_move_notification(self) -> None:
+        pass
+
+    def show_winner(self, winner: Player | None) -> None:
+        pass
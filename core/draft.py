@@ -0,0 +1,237 @@
+# core/draft.py
+from itertools import combinations_with_replacement
+import logging
+import os
+import random
+import time
+from typing import TYPE_CHECKING
+
+from core import settings
+from core.search import SearchEngine, SearchState, Searcher
+from core.snapshots import CELL_EMPTY, TOKEN_TYPES, PlayerState, Position
+
+if TYPE_CHECKING:
+    # Только для аннотаций: пул процессов импортируется лениво в _run
+    from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Доля плейаутов, в которых игрок ходит случайно, а не жадно по немедленным очкам
+PLAYOUT_NOISE = 0.25
+# Во сколько раз бюджет времени может быть превышен при бюджете в оценках
+DEADLINE_CAP = 10
+
+
+def hand_multisets(hand_size: int) -> list[tuple[int, ...]]:
+    """
+    Все наборы токенов заданного размера как мультимножества индексов типов
+    (для 4 токенов 4 типов - 35 наборов)
+    """
+    return list(combinations_with_replacement(range(len(TOKEN_TYPES)), hand_size))
+
+
+def _with_hands(position: Position, hands: dict[int, tuple[int, ...]]) -> Position:
+    players = [
+        PlayerState(player.kind, player.points, list(hands.get(idx, player.hand)))
+        for idx, player in enumerate(position.players)
+    ]
+    return Position(position.size, position.current, position.cells, players)
+
+
+def playout(engine: SearchEngine, state: SearchState, player: int, rng: random.Random) -> int:
+    """
+    Итог раунда для игрока при жадной игре всех игроков с долей случайных ходов
+    """
+    state = engine.playout(state, lambda current: engine.greedy_move(current, rng, PLAYOUT_NOISE))
+    return engine.evaluate(state, player)
+
+
+def solve(searcher: Searcher, engine: SearchEngine, position: Position, player: int, table: dict) -> int:
+    """
+    Точная оценка позиции для игрока (перебор до конца раунда, два игрока).
+    table - общая таблица перестановок: после первых ходов наборы разных
+    кандидатов совпадают, и поддеревья переиспользуются
+    """
+    value = searcher.evaluate_position(position, engine, table)
+    return value if position.current == player else -value
+
+
+def _evaluate_task(args: tuple) -> dict[tuple[int, ...], tuple[float, int]]:
+    """
+    Оценка части наборов в процессе пула: {набор: (сумма оценок, число оценок)}.
+    Наборы оцениваются по кругу, пока не сделано rounds оценок каждого
+    или не наступил deadline (time.time() - общие часы для всех процессов;
+    при бюджете в оценках это только предохранитель).
+    opponents - известные наборы соперников или None для неизвестных:
+    при точном переборе они перебираются по кругу, в плейаутах выбираются случайно.
+    У каждого набора свой генератор (seeds), поэтому оценки не зависят от деления на процессы
+    """
+    position, player, hands, opponents, all_hands, rounds, exact, seeds, deadline = args
+    engine = SearchEngine(position)
+    searcher = Searcher(sum(1 for code in position.cells if code == CELL_EMPTY))
+    results = {hand: (0.0, 0) for hand in hands}
+    rngs = {hand: random.Random(seeds[hand]) for hand in hands}
+    table: dict = {}
+
+    for round_idx in range(rounds):
+        for hand in hands:
+            if time.time() > deadline:
+                return results
+            rng = rngs[hand]
+            assigned = {player: hand}
+            for idx, known in opponents.items():
+                if known is not None:
+                    assigned[idx] = known
+                elif exact:
+                    assigned[idx] = all_hands[round_idx % len(all_hands)]
+                else:
+                    assigned[idx] = rng.choice(all_hands)
+
+            candidate = _with_hands(position, assigned)
+            if exact:
+                value = solve(searcher, engine, candidate, player, table)
+            else:
+                value = playout(engine, engine.state_from_position(candidate), player, rng)
+            total, count = results[hand]
+            results[hand] = (total + value, count + 1)
+    return results
+
+
+class DraftOptimizer:
+    """
+    ОПИСАНИЕ:
+    - Выбор набора токенов по уже расставленным операндам. Каждый набор
+    (мультимножество типов) оценивается средним итогом раунда: разница очков
+    с лучшим соперником. На маленьких досках итог считается точным перебором,
+    на больших - жадными плейаутами с шумом. Работа делится между процессами
+    пула и ограничена бюджетом времени: по его истечении выбирается лучший
+    из уже оцененных наборов. С заданным SEED бюджет считается в оценках,
+    чтобы выбор не зависел от скорости машины и повторялся с тем же сидом
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - rank_hands: наборы с оценками, от лучшего к худшему
+    - best_hand: лучший набор токенов (типы)
+    - shutdown: остановить процессы пула
+    """
+    def __init__(
+            self,
+            budget_ms: float = settings.DRAFT_BUDGET_MS,
+            playouts: int = settings.DRAFT_PLAYOUTS,
+            workers: int = settings.DRAFT_WORKERS,
+            exact_cells: int = settings.DRAFT_EXACT_CELLS,
+            evaluations: int = settings.DRAFT_EVALUATIONS if settings.SEED is not None else 0,
+            ) -> None:
+        """
+        attr:evaluations - бюджет в оценках на выбор (0 - бюджет по времени)
+        attr:_executor - пул процессов, создается при первом выборе и переиспользуется
+        """
+        self.budget_ms = budget_ms
+        self.playouts = playouts
+        self.workers = workers or os.cpu_count() or 1
+        self.exact_cells = exact_cells
+        self.evaluations = evaluations
+        self._executor: 'ProcessPoolExecutor | None' = None
+
+    def _is_exact(self, position: Position) -> bool:
+        empty = sum(1 for code in position.cells if code == CELL_EMPTY)
+        return len(position.players) == 2 and empty <= self.exact_cells
+
+    def _run(self, tasks: list[tuple], deadline: float) -> list[dict]:
+        if self.workers == 1 or len(tasks) == 1:
+            return [_evaluate_task(task) for task in tasks]
+
+        # Пул нужен только при выборе наборов - multiprocessing не грузим при запуске игры
+        from concurrent.futures import ProcessPoolExecutor, wait
+
+        try:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            futures = [self._executor.submit(_evaluate_task, task) for task in tasks]
+        except OSError as error:
+            logger.warning(f'Пул процессов недоступен ({error}), оценка наборов в текущем процессе')
+            self.workers = 1
+            return [_evaluate_task(task) for task in tasks]
+
+        # Задачи сами останавливаются по deadline; небольшой запас - на возврат результата
+        done, _ = wait(futures, timeout=max(0.0, deadline - time.time()) + 0.05)
+        return [future.result() for future in done]
+
+    def rank_hands(
+            self,
+            position: Position,
+            player: int,
+            hand_size: int = settings.INITIAL_TOKENS,
+            rng: random.Random | None = None,
+            ) -> list[tuple[tuple[int, ...], float, int]]:
+        """
+        Наборы (индексы типов), их средняя оценка и число оценок - от лучшего к худшему.
+        Пустые наборы соперников в позиции считаются неизвестными и перебираются
+        """
+        if self.budget_ms <= 0:
+            return []
+        rng = rng or random.Random()
+        budget_ms = self.budget_ms * DEADLINE_CAP if self.evaluations else self.budget_ms
+        deadline = time.time() + budget_ms / 1000
+        hands = hand_multisets(hand_size)
+        exact = self._is_exact(position)
+
+        opponents = {
+            idx: tuple(state.hand) if state.hand else None
+            for idx, state in enumerate(position.players) if idx != player
+        }
+        if not exact:
+            rounds = self.playouts
+        elif None in opponents.values():
+            # При точном переборе раунд - один вариант неизвестного набора соперника
+            rounds = len(hands)
+        else:
+            rounds = 1
+        if self.evaluations:
+            # Одинаковое число оценок каждого набора - результат не зависит от времени
+            rounds = min(rounds, max(1, self.evaluations // len(hands)))
+
+        seeds = {hand: rng.getrandbits(64) for hand in hands}
+        chunks = [hands[i::self.workers] for i in range(min(self.workers, len(hands)))]
+        tasks = [
+            (position, player, chunk, opponents, hands, rounds, exact, seeds, deadline)
+            for chunk in chunks
+        ]
+
+        totals: dict[tuple[int, ...], tuple[float, int]] = {}
+        for results in self._run(tasks, deadline):
+            totals.update(results)
+
+        ranked = sorted(
+            ((hand, total / count, count) for hand, (total, count) in totals.items() if count),
+            # При равных оценках - по набору, а не по порядку ответов процессов
+            key=lambda item: (-item[1], item[0]),
+        )
+        logger.info(
+            f'Оценено наборов: {len(ranked)} из {len(hands)}, '
+            f'оценок: {sum(count for _, _, count in ranked)}, '
+            f'режим: {"перебор" if exact else "плейауты"}'
+        )
+        return ranked
+
+    def best_hand(
+            self,
+            position: Position,
+            player: int,
+            hand_size: int = settings.INITIAL_TOKENS,
+            rng: random.Random | None = None,
+            ) -> list[type] | None:
+        """
+        Лучший набор токенов (типы) или None, если за бюджет не оценен ни один набор
+        """
+        ranked = self.rank_hands(position, player, hand_size, rng)
+        if not ranked:
+            return None
+        hand, score, count = ranked[0]
+        logger.info(f'Лучший набор: {[TOKEN_TYPES[idx].__name__ for idx in hand]}, оценка {score:.2f} ({count})')
+        return [TOKEN_TYPES[idx] for idx in hand]
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,172 @@
+# core/events.py
+import logging
+import queue
+import threading
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class Event:
+    """
+    Базовый класс событий партии. События - легкие объекты со слотами:
+    создаются, только если на их тип кто-то подписан
+    """
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+
+class TokenPlaced(Event):
+    __slots__ = ('player', 'token', 'row', 'col')
+
+    def __init__(self, player, token, row: int, col: int) -> None:
+        self.player = player
+        self.token = token
+        self.row = row
+        self.col = col
+
+
+class PointsAwarded(Event):
+    __slots__ = ('player', 'points')
+
+    def __init__(self, player, points: int) -> None:
+        self.player = player
+        self.points = points
+
+
+class XorSteal(Event):
+    """
+    amount - сколько очков потерял victim (очки не уходят ниже нуля), thief получает +1
+    """
+    __slots__ = ('thief', 'victim', 'row', 'col', 'amount')
+
+    def __init__(self, thief, victim, row: int, col: int, amount: int) -> None:
+        self.thief = thief
+        self.victim = victim
+        self.row = row
+        self.col = col
+        self.amount = amount
+
+
+class TurnEnded(Event):
+    """
+    players - игроки по порядку, scores - их очки на момент конца хода
+    """
+    __slots__ = ('player', 'token', 'players', 'scores')
+
+    def __init__(self, player, token, players: tuple, scores: tuple[int, ...]) -> None:
+        self.player = player
+        self.token = token
+        self.players = players
+        self.scores = scores
+
+
+class RoundEnded(Event):
+    """
+    position - снимок итоговой позиции, scores - итоговые очки игроков по порядку
+    (очки игроков обнуляются сразу после события). board - доска раунда:
+    следующий раунд играется на новой доске, поэтому она больше не меняется
+    """
+    __slots__ = ('winner', 'board', 'position', 'scores')
+
+    def __init__(self, winner, board, position, scores: tuple[int, ...]) -> None:
+        self.winner = winner
+        self.board = board
+        self.position = position
+        self.scores = scores
+
+
+Handler = Callable[[Event], Any]
+
+
+class EventBus:
+    """
+    ОПИСАНИЕ:
+    - Шина событий партии. Подписчики вызываются синхронно в порядке подписки.
+    Издатель проверяет wants перед созданием события, поэтому без подписчиков
+    событие стоит одну проверку словаря. Ошибка подписчика пишется в лог
+    и не прерывает игру
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - subscribe: подписать обработчик на тип события
+    - unsubscribe: отписать обработчик
+    - wants: есть ли подписчики на тип события
+    - emit: передать событие подписчикам
+    """
+    def __init__(self) -> None:
+        self._handlers: dict[type[Event], list[Handler]] = {}
+
+    def subscribe(self, event_type: type[Event], handler: Handler) -> None:
+        self._handlers.setdefault(event_type, []).append(handler)
+
+    def unsubscribe(self, event_type: type[Event], handler: Handler) -> None:
+        handlers = self._handlers.get(event_type)
+        if handlers and handler in handlers:
+            handlers.remove(handler)
+            if not handlers:
+                del self._handlers[event_type]
+
+    def wants(self, event_type: type[Event]) -> bool:
+        return event_type in self._handlers
+
+    def emit(self, event: Event) -> None:
+        for handler in self._handlers.get(type(event), ()):
+            try:
+                handler(event)
+            except Exception as error:
+                logger.error(f'Ошибка подписчика {handler!r} на {type(event).__name__}: {error}')
+
+
+class QueuedHandler:
+    """
+    ОПИСАНИЕ:
+    - Подписчик, который только кладет событие в очередь. Обработчик вызывается
+    в фоновом потоке, игровой цикл его не ждет (запись партий, метрики, сеть).
+    При переполнении очереди событие отбрасывается и учитывается в dropped
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - start: запустить поток-обработчик
+    - stop: обработать очередь до конца и остановить поток
+    """
+    _SENTINEL = None
+
+    def __init__(self, handler: Handler, maxsize: int = 10000) -> None:
+        self.handler = handler
+        self.queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self._thread: threading.Thread | None = None
+
+    def __call__(self, event: Event) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self) -> 'QueuedHandler':
+        self._thread = threading.Thread(target=self._run, name='event-handler', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while True:
+            event = self.queue.get()
+            if event is self._SENTINEL:
+                return
+            try:
+                self.handler(event)
+            except Exception as error:
+                logger.error(f'Ошибка фонового подписчика на {type(event).__name__}: {error}')
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self.queue.put(self._SENTINEL)
+        self._thread.join()
+        self._thread = None
+        if self.dropped:
+            logger.warning(f'Очередь событий переполнялась: пропущено событий: {self.dropped}')
@@ -9,3 +9,10 @@ class BoardCoordinateTypeError(Exception): ...
 class InvalidNameTypeError(Exception): ...
 class InputHandlerDataError(Exception): ...
 class RulesOwnershipError(Exception): ...
+class SnapshotError(Exception): ...
+class SearchCancelledError(Exception): ...
+class RulesSpecError(Exception): ...
+class ClusterProtocolError(Exception): ...
+class PositionIndexError(Exception): ...
+class SpectatorProtocolError(Exception): ...
+class ClusterTimeoutError(Exception): ...
\ No newline at end of file
@@ -0,0 +1,477 @@
+# core/fuzz.py
+import argparse
+import logging
+import os
+import random
+import time
+
+from core import settings
+from core.board import Board
+from core.displays import NullDisplay
+from core.game import Game
+from core.records import TOKEN_TYPES_BY_NAME, GameRecord, read_records
+from core.rng import GameRandom
+from core.rules import ThunderTruthRules
+from core.search import SearchEngine
+from core.snapshots import (
+    CELL_EMPTY, CELL_FALSE, CELL_TRUE, MAX_PLAYERS, PLAYER_AI, TOKEN_TYPES,
+    PlayerState, Position, decode_position, encode_position, token_code,
+)
+from core.tokens import XOR, Token
+
+logger = logging.getLogger(__name__)
+
+XOR_IDX = TOKEN_TYPES.index(XOR)
+
+
+class EngineCandidate:
+    """
+    Проверяемый движок: скомпилированные правила SearchEngine.
+    Кандидат получает начальную позицию и ходы, отдает коды клеток и очки
+    """
+    name = 'engine'
+
+    def __init__(self, start: Position) -> None:
+        self._engine = SearchEngine(start)
+        self._state = self._engine.state_from_position(start)
+
+    def play(self, type_idx: int, row: int, col: int) -> None:
+        self._state = self._engine.apply(self._state, (type_idx, self._engine.cell_index(row, col)))
+
+    def cells(self) -> list[int]:
+        return list(self._state.cells)
+
+    def points(self) -> list[int]:
+        return list(self._state.points)
+
+
+class IndexCandidate:
+    """
+    Проверка инкрементальных индексов правил: своя копия объектной модели,
+    в которой очки хода считаются по индексу, а не по count_points /
+    exclude_points_xor. Ошибка индекса проявляется расхождением очков с эталоном.
+    Базовый класс считает все по эталону, наследники подменяют _gain или _victim
+    """
+    def __init__(self, start: Position) -> None:
+        self._game = _reference_game(start)
+
+    def _probe(self, player, token_type: type[Token], row: int, col: int) -> tuple[int, object]:
+        """
+        Эталонные очки и жертва кражи: токен ставится на доску и сразу снимается
+        """
+        game = self._game
+        game.board.put_token(token_type(owner=player), row, col)
+        try:
+            points = game.rules.count_points(game.board, row, col)
+            extra_points = game.rules.exclude_points_xor(game.board, row, col)
+        finally:
+            game.board.peek(row, col).clear()
+        return points, extra_points[0] if extra_points else None
+
+    def _gain(self, player, token_type: type[Token], row: int, col: int) -> int:
+        return self._probe(player, token_type, row, col)[0]
+
+    def _victim(self, player, token_type: type[Token], row: int, col: int):
+        return self._probe(player, token_type, row, col)[1]
+
+    def play(self, type_idx: int, row: int, col: int) -> None:
+        game = self._game
+        player = game.get_current_player()
+        token = player.get_token(TOKEN_TYPES[type_idx])
+        # Индексы опрашиваются до хода: после постановки клетка из них выбывает
+        points = self._gain(player, type(token), row, col)
+        victim = self._victim(player, type(token), row, col)
+
+        game.move(player, token, row, col)
+        # Порядок и ограничение снизу - как в Game.impute
+        player.add_points(points)
+        if victim is not None:
+            victim.add_points(-1)
+            player.add_points(1)
+        game.end_turn(player, token)
+
+    def cells(self) -> list[int]:
+        return self._game.to_position().cells
+
+    def points(self) -> list[int]:
+        return [player.get_points() for player in self._game.players]
+
+
+class PotentialsCandidate(IndexCandidate):
+    """
+    Очки за постановку - из MovePotentials (ThunderTruthRules.potentials), кража - по эталону
+    """
+    name = 'potentials'
+
+    def _gain(self, player, token_type: type[Token], row: int, col: int) -> int:
+        points = self._game.rules.potentials.get_points(token_type, row, col)
+        if points is None:
+            raise ValueError(f'Клетки ({row}, {col}) нет в таблице потенциалов')
+        return points
+
+
+class XorIndexCandidate(IndexCandidate):
+    """
+    Кража - по XorStealIndex из ThunderTruthRules.setup, очки за постановку - по эталону
+    """
+    name = 'xor_index'
+
+    def _victim(self, player, token_type: type[Token], row: int, col: int):
+        index = self._game.rules.xor_index
+        victims = index.get_victims(row, col) if token_type is XOR else []
+        victim = victims[0] if victims else None
+        if token_type is XOR and index.is_steal_cell(player, row, col) != (victim is not None and victim is not player):
+            raise ValueError(f'is_steal_cell в ({row}, {col}) расходится с get_victims')
+        return victim
+
+
+# Реестр кандидатов: новый быстрый движок или индекс добавляется сюда с тем же интерфейсом
+CANDIDATES = {
+    candidate.name: candidate
+    for candidate in (EngineCandidate, PotentialsCandidate, XorIndexCandidate)
+}
+
+
+class Mismatch:
+    """
+    Расхождение кандидата с эталоном: полуход, что разошлось, ожидалось и получено
+    """
+    __slots__ = ('ply', 'field', 'expected', 'actual')
+
+    def __init__(self, ply: int, field: str, expected, actual) -> None:
+        self.ply = ply
+        self.field = field
+        self.expected = expected
+        self.actual = actual
+
+    def __repr__(self) -> str:
+        return f'Mismatch(ply={self.ply}, field={self.field}, expected={self.expected}, actual={self.actual})'
+
+
+def _reference_game(start: Position) -> Game:
+    """
+    Эталон: объектная модель Game/Board/ThunderTruthRules без ввода и вывода
+    """
+    game = Game(Board(), ThunderTruthRules(), None, NullDisplay(), rng=GameRandom(0))
+    game.load_position(start)
+    return game
+
+
+def _reference_move(game: Game, type_idx: int, row: int, col: int) -> None:
+    # Порядок как в Game.play: ход, подсчет очков (с кражей XOR), конец хода
+    player = game.get_current_player()
+    token = player.get_token(TOKEN_TYPES[type_idx])
+    game.move(player, token, row, col)
+    game.impute(player, row, col)
+    game.end_turn(player, token)
+
+
+def _winners(points: list[int]) -> list[int]:
+    best = max(points)
+    return [idx for idx, value in enumerate(points) if value == best]
+
+
+def _compare(ply: int, game: Game, candidate) -> Mismatch | None:
+    """
+    Сравнение после полухода: очки, клетки с типами и владельцами токенов, лидеры
+    """
+    position = game.to_position()
+    expected_points = [player.points for player in position.players]
+    actual_points = candidate.points()
+    if expected_points != actual_points:
+        return Mismatch(ply, 'points', expected_points, actual_points)
+    actual_cells = candidate.cells()
+    if position.cells != actual_cells:
+        diff = [
+            (idx, expected, actual)
+            for idx, (expected, actual) in enumerate(zip(position.cells, actual_cells))
+            if expected != actual
+        ]
+        return Mismatch(ply, 'cells', diff, len(actual_cells))
+    if _winners(expected_points) != _winners(actual_points):
+        return Mismatch(ply, 'winners', _winners(expected_points), _winners(actual_points))
+    return None
+
+
+def replay(record: GameRecord, candidate_name: str = EngineCandidate.name) -> Mismatch | None:
+    """
+    Переигрывает партию в эталоне и кандидате, сравнивая их после каждого полухода.
+    Ход, невозможный в эталоне, - не расхождение, а негодная партия (ValueError)
+    """
+    start = decode_position(record.start)
+    game = _reference_game(start)
+    candidate = CANDIDATES[candidate_name](start)
+    mismatch = _compare(-1, game, candidate)
+    if mismatch is not None:
+        return mismatch
+
+    for ply, (name, row, col) in enumerate(record.moves):
+        type_idx = TOKEN_TYPES.index(TOKEN_TYPES_BY_NAME[name])
+        try:
+            _reference_move(game, type_idx, row, col)
+        except Exception as error:
+            raise ValueError(f'Полуход {ply} невозможен в эталоне: {error!r}') from error
+        try:
+            candidate.play(type_idx, row, col)
+        except Exception as error:
+            return Mismatch(ply, 'error', None, repr(error))
+        mismatch = _compare(ply, game, candidate)
+        if mismatch is not None:
+            return mismatch
+    return None
+
+
+def random_start(rng: random.Random) -> Position:
+    """
+    Начальная позиция со «злыми» случаями: доски от 2x2 до 8x8, до PLAYERS_AMOUNT игроков
+    (Game не принимает больше; для трех игроков - PLAYERS_AMOUNT=3),
+    наборы с перекосом в XOR (больше краж), ненулевые стартовые очки (ограничение снизу
+    при краже), токены, уже лежащие на доске у разных владельцев
+    """
+    size = rng.randint(2, 8)
+    players = rng.randint(2, max(2, min(MAX_PLAYERS, settings.PLAYERS_AMOUNT)))
+    cells = [
+        (CELL_TRUE if rng.random() < 0.5 else CELL_FALSE) if (row + col) % 2 == 0 else CELL_EMPTY
+        for row in range(1, size + 1)
+        for col in range(1, size + 1)
+    ]
+    if rng.random() < 0.3:
+        empty = [idx for idx, code in enumerate(cells) if code == CELL_EMPTY]
+        for idx in rng.sample(empty, rng.randint(0, len(empty) // 2)):
+            cells[idx] = token_code(rng.randrange(len(TOKEN_TYPES)), rng.randrange(players))
+
+    xor_bias = rng.choice([0.0, 0.5, 0.9])
+    free = sum(1 for code in cells if code == CELL_EMPTY)
+    hand_size = rng.randint(1, max(1, free // players + 1))
+    states = []
+    for _ in range(players):
+        hand = [
+            XOR_IDX if rng.random() < xor_bias else rng.randrange(len(TOKEN_TYPES))
+            for _ in range(hand_size)
+        ]
+        points = rng.choice([0, 0, 0, 1, rng.randint(0, 5)])
+        states.append(PlayerState(PLAYER_AI, points, hand))
+    return Position(size, rng.randrange(players), cells, states)
+
+
+def _choose_move(game: Game, rng: random.Random) -> tuple[int, int, int] | None:
+    """
+    Ход для генерации партии: случайный или, чаще, рядом с токенами на доске -
+    там замыкаются XOR-цепочки
+    """
+    player = game.get_current_player()
+    if not player.tokens:
+        return None
+    empty = game.board.empty_cells()
+    if not empty:
+        return None
+    type_idx = TOKEN_TYPES.index(type(rng.choice(player.tokens)))
+
+    if rng.random() < 0.7:
+        board = game.board
+        near = [
+            (row, col) for row, col in empty
+            if any(isinstance(value, Token) for value in board.neighbor_values(row, col))
+        ]
+        if near:
+            return (type_idx, *rng.choice(near))
+    return (type_idx, *rng.choice(empty))
+
+
+def generate_game(rng: random.Random, candidate_name: str) -> tuple[GameRecord, Mismatch | None]:
+    """
+    Генерирует партию, сразу сравнивая эталон с кандидатом по полуходам
+    """
+    start = random_start(rng)
+    record = GameRecord(encode_position(start))
+    game = _reference_game(start)
+    candidate = CANDIDATES[candidate_name](start)
+
+    ply = 0
+    while True:
+        move = _choose_move(game, rng)
+        if move is None:
+            break
+        type_idx, row, col = move
+        record.moves.append((TOKEN_TYPES[type_idx].__name__, row, col))
+        _reference_move(game, type_idx, row, col)
+        try:
+            candidate.play(type_idx, row, col)
+        except Exception as error:
+            return record, Mismatch(ply, 'error', None, repr(error))
+        mismatch = _compare(ply, game, candidate)
+        if mismatch is not None:
+            return record, mismatch
+        ply += 1
+    return record, None
+
+
+def _with_moves(record: GameRecord, moves: list[tuple[str, int, int]]) -> GameRecord:
+    """
+    Партия с другими ходами: наборы игроков пересчитываются так, чтобы
+    каждый владел ровно теми токенами, которыми ходит
+    """
+    start = decode_position(record.start)
+    hands: list[list[int]] = [[] for _ in start.players]
+    current = start.current
+    for name, _, _ in moves:
+        hands[current].append(TOKEN_TYPES.index(TOKEN_TYPES_BY_NAME[name]))
+        current = (current + 1) % len(hands)
+    players = [PlayerState(state.kind, state.points, hand) for state, hand in zip(start.players, hands)]
+    return GameRecord(encode_position(Position(start.size, start.current, start.cells, players)), list(moves))
+
+
+def _with_start(record: GameRecord, **changes) -> GameRecord:
+    start = decode_position(record.start)
+    cells = changes.get('cells', start.cells)
+    players = [
+        PlayerState(state.kind, points, state.hand)
+        for state, points in zip(start.players, changes.get('points', [state.points for state in start.players]))
+    ]
+    return GameRecord(encode_position(Position(start.size, start.current, cells, players)), record.moves)
+
+
+def shrink(record: GameRecord, candidate_name: str = EngineCandidate.name) -> tuple[GameRecord, Mismatch]:
+    """
+    Сводит расхождение к минимальному воспроизведению (жадно, пока хоть что-то
+    упрощается): ходы после расхождения отбрасываются, ходы убираются по одному,
+    токены заменяются на AND, стартовые очки обнуляются, лишние токены на доске
+    убираются. Упрощение принимается, если расхождение сохраняется
+    """
+    def failing(candidate_record: GameRecord) -> Mismatch | None:
+        try:
+            return replay(candidate_record, candidate_name)
+        except ValueError:
+            return None
+
+    record = _with_moves(record, record.moves)
+    mismatch = failing(record)
+    if mismatch is None:
+        raise ValueError('Партия не воспроизводит расхождение')
+
+    changed = True
+    while changed:
+        changed = False
+        attempts = []
+        moves = record.moves[:max(0, mismatch.ply) + 1]
+        if len(moves) < len(record.moves):
+            attempts.append(_with_moves(record, moves))
+        for idx in range(len(moves)):
+            attempts.append(_with_moves(record, moves[:idx] + moves[idx + 1:]))
+        for idx, (name, row, col) in enumerate(moves):
+            if name != 'AND':
+                attempts.append(_with_moves(record, moves[:idx] + [('AND', row, col)] + moves[idx + 1:]))
+
+        start = decode_position(record.start)
+        if any(state.points for state in start.players):
+            attempts.append(_with_start(record, points=[0] * len(start.players)))
+        for idx, code in enumerate(start.cells):
+            if code not in (CELL_EMPTY, CELL_TRUE, CELL_FALSE):
+                cells = list(start.cells)
+                cells[idx] = CELL_EMPTY
+                attempts.append(_with_start(record, cells=cells))
+
+        for attempt in attempts:
+            found = failing(attempt)
+            if found is not None:
+                record, mismatch, changed = attempt, found, True
+                break
+    return record, mismatch
+
+
+def fuzz_chunk(args: tuple) -> tuple[int, int, list[tuple[str, str]]]:
+    """
+    Пачка партий в процессе пула: (партий, полуходов, [(воспроизведение JSON, расхождение)]).
+    Генератор пачки - дочерний поток корневого сида, итог не зависит от числа процессов
+    """
+    games, seed, chunk_idx, candidate_name, max_reports = args
+    # Эталон пишет в лог каждый ход - в фаззинге это только тормозит
+    logging.disable(logging.INFO)
+    rng = GameRandom(seed, ('fuzz', chunk_idx))
+    plies = 0
+    reports = []
+    for _ in range(games):
+        record, mismatch = generate_game(rng, candidate_name)
+        plies += len(record.moves)
+        if mismatch is not None and len(reports) < max_reports:
+            minimal, minimal_mismatch = shrink(record, candidate_name)
+            reports.append((minimal.to_json(), repr(minimal_mismatch)))
+    return games, plies, reports
+
+
+def fuzz(
+        games: int,
+        seed: int = 0,
+        workers: int | None = None,
+        chunk: int = 500,
+        candidate_name: str = EngineCandidate.name,
+        max_reports: int = 10,
+        ) -> tuple[int, int, list[tuple[str, str]]]:
+    """
+    Фаззинг в пуле процессов: (сыграно партий, полуходов, найденные расхождения)
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = [
+        (min(chunk, games - start), seed, chunk_idx, candidate_name, max_reports)
+        for chunk_idx, start in enumerate(range(0, games, chunk))
+    ]
+    played = plies = 0
+    reports: list[tuple[str, str]] = []
+
+    if workers == 1:
+        results = map(fuzz_chunk, tasks)
+        for chunk_games, chunk_plies, chunk_reports in results:
+            played, plies = played + chunk_games, plies + chunk_plies
+            reports.extend(chunk_reports)
+        return played, plies, reports[:max_reports]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_games, chunk_plies, chunk_reports in executor.map(fuzz_chunk, tasks):
+            played, plies = played + chunk_games, plies + chunk_plies
+            reports.extend(chunk_reports)
+    return played, plies, reports[:max_reports]
+
+
+def main() -> None:
+    """
+    Дифференциальный фаззинг: python -m core.fuzz --games 1000000
+    Проверка сохраненных воспроизведений: python -m core.fuzz --replay mismatches.jsonl
+    """
+    parser = argparse.ArgumentParser(description='Сравнение быстрых движков с эталонными правилами ThunderTruth')
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=settings.SEED or 0)
+    parser.add_argument('--workers', type=int, default=None, help='число процессов')
+    parser.add_argument('--chunk', type=int, default=500, help='партий в пачке процесса')
+    parser.add_argument('--candidate', choices=list(CANDIDATES), default=EngineCandidate.name)
+    parser.add_argument('--out', default=None, help='записать минимальные воспроизведения в JSONL')
+    parser.add_argument('--replay', default=None, help='переиграть воспроизведения из JSONL')
+    args = parser.parse_args()
+
+    if args.replay:
+        logging.disable(logging.INFO)
+        failed = 0
+        for record in read_records(args.replay):
+            mismatch = replay(record, args.candidate)
+            failed += mismatch is not None
+            print(f'{"РАСХОЖДЕНИЕ" if mismatch else "совпадает"}: {mismatch or ""}')
+        raise SystemExit(1 if failed else 0)
+
+    started = time.perf_counter()
+    played, plies, reports = fuzz(args.games, args.seed, args.workers, args.chunk, args.candidate)
+    elapsed = time.perf_counter() - started
+
+    print(f'Партий: {played}, полуходов: {plies}, время: {elapsed:.1f} с ({played / elapsed:.0f} партий/с)')
+    for line, mismatch in reports:
+        print(mismatch)
+        print(line)
+    if args.out and reports:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.writelines(line + '\n' for line, _ in reports)
+    print('Расхождений нет' if not reports else f'Расхождений: {len(reports)} (показаны минимальные)')
+    raise SystemExit(1 if reports else 0)
+
+
+if __name__ == '__main__':
+    main()
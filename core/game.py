@@ -1,22 +1,39 @@
 # core/game.py
 
 import logging
-import random
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from colorama import Fore, Style
-from core import settings
+from core import profiling, settings
 from core.board import Board
 from core.displays import Display
+from core.draft import DraftOptimizer
+from core.events import EventBus, PointsAwarded, RoundEnded, TokenPlaced, TurnEnded, XorSteal
 from core.exceptions import (
     CellOccupiedError, CellOutOfBorderError, 
-    PlayerInvalidError, RulesOwnershipError
+    PlayerInvalidError, PositionIndexError, RulesOwnershipError
 )
 from core.handlers import InputHandler
+from core.hints import HintAdvisor
+from core.operands import Operand
 from core.players import AIPlayer, HumanPlayer, Player
+from core.ponder import Ponderer
+from core.records import GameRecord, append_record
+from core.rng import GameRandom
 from core.rules import Rules
+from core.snapshots import (
+    CELL_EMPTY, CELL_FALSE, CELL_TOKEN, CELL_TRUE,
+    PLAYER_AI, PLAYER_HUMAN, TOKEN_TYPES,
+    PlayerState, Position,
+    decode_position, encode_position, split_token_code, token_code,
+)
 from core.tokens import AND, IMP, OR, XOR, Token
 
+if TYPE_CHECKING:
+    # Только для аннотаций: книга и пул раскладок загружаются лениво
+    from core.book import PositionIndex
+    from core.layouts import LayoutPool
+
 logger = logging.getLogger(__name__)
 
 class Game:
@@ -26,13 +43,26 @@ class Game:
             rules: Rules,
             input_handler: InputHandler,
             display: Display,
+            rng: GameRandom | None = None,
+            events: EventBus | None = None,
             ) -> None:
         self._board = board
+        # Вся случайность партии (операнды, токены ИИ, ходы ИИ, id) идет через этот генератор
+        self._rng = rng or GameRandom(settings.SEED)
         self._rules = rules
         self._input_handler = input_handler
         self._display = display
+        # Изменения партии (очки, кражи, конец хода и раунда) идут через шину событий.
+        # Дисплей - один из подписчиков, наравне с записью партий, метриками и сетью
+        self._events = events or EventBus()
+        display.subscribe(self._events)
         self._players = []
         self._current_player_index = 0
+        self._record: GameRecord | None = None
+        self._draft: DraftOptimizer | None = None
+        self._book: 'PositionIndex | None' = None
+        self._hints: HintAdvisor | None = None
+        self._layouts: 'LayoutPool | None' = None
         self.play_again = False
         
 
@@ -55,6 +85,21 @@ class Game:
     @property
     def players(self):
         return self._players
+
+    @property
+    def events(self) -> EventBus:
+        return self._events
+
+    @property
+    def rng(self):
+        return self._rng
+
+    @property
+    def record(self) -> GameRecord | None:
+        """
+        Запись текущего раунда: стартовый снимок и сделанные ходы
+        """
+        return self._record
     
     def get_current_player(self):
         return self.players[self._current_player_index]
@@ -94,19 +139,94 @@ class Game:
 
     def _add_human_player(self) -> None:
         player_name = self.input_handler.get_name()
-        new_player = HumanPlayer(name=player_name)
+        new_player = HumanPlayer(name=player_name, rng=self.rng)
         setattr(new_player, 'color', Fore.CYAN)
         self.add_player(new_player)
 
     def _add_ai_player(self) -> None:
-        ai_player = AIPlayer()
+        ponderer = Ponderer() if settings.AI_SEARCH_DEPTH > 0 else None
+        book = self._get_book() if ponderer is not None else None
+        ai_player = AIPlayer(rng=self.rng, ponderer=ponderer, book=book)
         setattr(ai_player, 'color', Fore.RED)
         self.add_player(ai_player)
 
     def _get_tokens_random(self) -> list[AND | XOR | IMP | OR]:
-        tokens = [random.choice([AND(), XOR(), IMP(), OR()]) for _ in range(settings.INITIAL_TOKENS)]
+        token_types = [AND, XOR, IMP, OR]
+        tokens = [self.rng.choice(token_types)(rng=self.rng) for _ in range(settings.INITIAL_TOKENS)]
         return tokens
 
+    def _get_book(self) -> 'PositionIndex | None':
+        """
+        Книга опыта ИИ из AI_BOOK, открывается один раз за игру.
+        Если файла нет или он поврежден - ИИ играет без книги
+        """
+        if self._book is None and settings.AI_BOOK:
+            from core.book import PositionIndex
+
+            try:
+                self._book = PositionIndex(settings.AI_BOOK)
+            except (OSError, PositionIndexError) as error:
+                logger.warning(f'Книга опыта {settings.AI_BOOK} не открыта: {error}')
+        return self._book
+
+    def _get_layouts(self) -> 'LayoutPool | None':
+        """
+        Запас сбалансированных расстановок под размер доски, пополняется в фоне всю игру
+        """
+        if not settings.BALANCED_LAYOUTS:
+            return None
+        if self._layouts is None or self._layouts.generator.size != self.board.get_size():
+            from core.layouts import LayoutGenerator, LayoutPool
+
+            if self._layouts is not None:
+                self._layouts.stop()
+            self._layouts = LayoutPool(LayoutGenerator(self.board.get_size(), self.rng.split('layouts')))
+            self._layouts.start()
+        return self._layouts
+
+    def _take_layout(self) -> dict[tuple[int, int], bool] | None:
+        """
+        Сбалансированная расстановка для раунда или None - тогда операнды расставляются случайно.
+        С заданным SEED раунд ждет расстановку без ограничения: иначе от скорости потока
+        пополнения зависело бы, будет ли расстановка сбалансированной и сколько чисел
+        возьмет из генератора партии случайная расстановка
+        """
+        pool = self._get_layouts()
+        if pool is None:
+            return None
+        layout = pool.take(None) if settings.SEED is not None else pool.take()
+        if layout is None:
+            logger.warning('Запас сбалансированных расстановок пуст, операнды расставлены случайно')
+        return layout
+
+    def _get_hints(self) -> HintAdvisor | None:
+        """
+        Подсказки человеку: одни на игру, таблица оценок переиспользуется между ходами
+        """
+        if self._hints is None and settings.HINTS and settings.HINT_DEPTH > 0:
+            self._hints = HintAdvisor()
+        return self._hints
+
+    def _get_draft(self) -> DraftOptimizer:
+        if self._draft is None:
+            self._draft = DraftOptimizer()
+        return self._draft
+
+    def _get_tokens_draft(self, player: Player) -> list[Token]:
+        """
+        Набор ИИ, лучший по оценке на расставленных операндах.
+        Если за бюджет времени ни один набор не оценен - случайный
+        """
+        hand = self._get_draft().best_hand(self.to_position(), self.players.index(player), rng=self.rng)
+        if hand is None:
+            return self._get_tokens_random()
+        return [token_type(rng=self.rng) for token_type in hand]
+
+    def _get_draft_hint(self, player: Player) -> list[type[Token]] | None:
+        if not settings.DRAFT_HINTS:
+            return None
+        return self._get_draft().best_hand(self.to_position(), self.players.index(player), rng=self.rng)
+
     def setup(self, multiplayer: bool = settings.MULTIPLAYER) -> None:
         """
         Запрашивает выбор токенов у игроков и инициализирует доску
@@ -123,14 +243,17 @@ class Game:
                 self._add_human_player()
                 self._add_ai_player()
 
-        self.board.setup()
+        layout = self._take_layout()
+        self.board.setup(self.rng, layout=layout)
+        self.rules.setup(self.board)
         for player in self.players:
             self.display.show_prompt(f'Выбор токенов для игрока: {player.name}\n')
             if isinstance(player, HumanPlayer):
-                tokens = self.input_handler.get_tokens()
+                tokens = self.input_handler.get_tokens(hint=self._get_draft_hint(player), rng=self.rng)
             elif isinstance(player, AIPlayer):
-                tokens = self._get_tokens_random()
+                tokens = self._get_tokens_draft(player)
             player.set_tokens(tokens)
+        self._record = GameRecord(self.snapshot())
         logger.info('Игра инициализирована!')
 
     def move(self, player: Player, token: Token, row: int, col: int):
@@ -142,25 +265,34 @@ class Game:
         
         # Проверка на тип координат, токена, валидность координат и занятость клетки идет внутри доски
         self.board.place_token(token, row, col)
+        self.rules.on_token_placed(self.board, row, col)
+        if self._events.wants(TokenPlaced):
+            self._events.emit(TokenPlaced(player, token, row, col))
 
     def impute(self, player: Player, row: int, col: int) -> None:
         """
-        Рассчет очков после хода
+        Рассчет очков после хода. Замер памяти - здесь, а не в Game.play,
+        чтобы его видели и партии без консоли (фаззер, анализатор, матчи)
         """
-        points = self.rules.count_points(self.board, row, col)
-        player.add_points(points)
-        self.display.show_prompt(f'Игрок {player.name} набирает {points} очков')
-        logger.debug(f'Игрок {player.get_id()} ({player.name}): +{points} очков')
-        logger.debug(f'Очки игрока {player.get_id()} ({player.name}): {player.get_points()}')
+        with profiling.memory('Game.impute'):
+            points = self.rules.count_points(self.board, row, col)
+            player.add_points(points)
+            if self._events.wants(PointsAwarded):
+                self._events.emit(PointsAwarded(player, points))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f'Игрок {player.get_id()} ({player.name}): +{points} очков')
+                logger.debug(f'Очки игрока {player.get_id()} ({player.name}): {player.get_points()}')
 
-        extra_points = self.rules.exclude_points_xor(self.board, row, col)
+            extra_points = self.rules.exclude_points_xor(self.board, row, col)
         
-        if extra_points:
-            opponent, this_player = extra_points
-            opponent.add_points(-1)
-            this_player.add_points(1)
-            self.display.show_prompt(f'Игрок {this_player.name} набирает дополнительно +1 очко')
-            self.display.show_prompt(f'Игрок {opponent.name} лишается 1 очка')
+            if extra_points:
+                opponent, this_player = extra_points
+                before = opponent.get_points()
+                opponent.add_points(-1)
+                amount = before - opponent.get_points()
+                this_player.add_points(1)
+                if self._events.wants(XorSteal):
+                    self._events.emit(XorSteal(this_player, opponent, row, col, amount))
 
     def _turn_info(self, player: Player):
         self.display.show_now_turn(player)
@@ -169,27 +301,51 @@ class Game:
         
     def _get_info(self, player: Player) -> tuple[Token, int, int]:
         if isinstance(player, HumanPlayer):
-            token_idx, row, col = self.input_handler.get_move(player)
+            advisor = self._get_hints()
+            if advisor is None:
+                token_idx, row, col = self.input_handler.get_move(player)
+            else:
+                # Оценка ходов идет в фоне, пока человек думает
+                position = self.to_position()
+                advisor.start(position)
+                try:
+                    token_idx, row, col = self.input_handler.get_move(player, hints=lambda: advisor.hints(position))
+                finally:
+                    advisor.stop()
         else:
-            token_idx, row, col = player.think(self.board)
+            token_idx, row, col = player.think(self.board, self.to_position())
         token = player.tokens[token_idx]
         return token, row, col
     
+    def _scores(self) -> tuple[int, ...]:
+        return tuple(player.get_points() for player in self.players)
+
     def end_turn(self, player: Player, token: Token):
         player.pop_token(token)
-        self.display.show_score(self.players)
-        self.display.show_next_move_notification()
+        if self._events.wants(TurnEnded):
+            self._events.emit(TurnEnded(player, token, tuple(self.players), self._scores()))
         self.switch_player()
 
     def end_round(self, debug) -> bool:
-        self.display.display_board(self.board)
         winner = self.rules.check_winner(self.board, *self.players)
-        self.display.show_winner(winner)
+        if self._events.wants(RoundEnded):
+            self._events.emit(RoundEnded(winner, self.board, self.to_position(), self._scores()))
+        if self.record is not None and settings.RECORDS_PATH:
+            try:
+                append_record(settings.RECORDS_PATH, self.record)
+            except OSError as error:
+                logger.error(f'Запись партии в {settings.RECORDS_PATH} не сохранена: {error}')
+        for player in self.players:
+            if isinstance(player, AIPlayer):
+                player.stop_pondering()
+                report = player.ponder_report()
+                if report:
+                    self.display.show_ponder_report(report)
+                    logger.info(report)
         
         if not debug:
             for player in self.players:
                 player.reset_points()
-        self.display.show_prompt(f"Конец игры!")
 
         if isinstance(self.get_current_player(), AIPlayer):
             self.switch_player()
@@ -224,33 +380,141 @@ class Game:
         logger.error(f'Неожиданная ошибка: {str(error)}')
         self.display.show_prompt(f'Ошибка: {str(error)}. Попробуйте снова.')
 
+    def snapshot(self) -> bytes:
+        """
+        Компактный снимок партии между ходами: доска, очки, наборы токенов, чей ход.
+        Состояние генератора случайных чисел в снимок не входит
+        """
+        data = encode_position(self.to_position())
+        logger.debug(f'Снимок партии: {len(data)} байт')
+        return data
+
+    def restore(self, data: bytes) -> None:
+        """
+        Восстанавливает партию из снимка Game.snapshot
+        """
+        self.load_position(decode_position(data))
+
+    def to_position(self) -> Position:
+        """
+        Плоское представление текущей позиции
+        """
+        owners = {id(player): idx for idx, player in enumerate(self.players)}
+        size = self.board.get_size()
+        cells = []
+
+        for row in range(1, size + 1):
+            for col in range(1, size + 1):
+                value = self.board.peek_value(row, col)
+                if isinstance(value, Token):
+                    type_idx = TOKEN_TYPES.index(type(value))
+                    cells.append(token_code(type_idx, owners[id(value.get_last_owner())]))
+                elif isinstance(value, Operand):
+                    cells.append(CELL_TRUE if value.get_value() else CELL_FALSE)
+                else:
+                    cells.append(CELL_EMPTY)
+
+        players = [
+            PlayerState(
+                kind=PLAYER_AI if isinstance(player, AIPlayer) else PLAYER_HUMAN,
+                points=player.get_points(),
+                hand=[TOKEN_TYPES.index(type(token)) for token in player.tokens],
+            )
+            for player in self.players
+        ]
+        return Position(size, self._current_player_index, cells, players)
+
+    def _restore_players(self, states: list[PlayerState]) -> None:
+        kinds = [PLAYER_AI if isinstance(player, AIPlayer) else PLAYER_HUMAN for player in self.players]
+        if kinds == [state.kind for state in states]:
+            return
+
+        # Состав игроков не совпадает со снимком - создаем игроков заново
+        self._players = []
+        for state in states:
+            if state.kind == PLAYER_AI:
+                player = AIPlayer(rng=self.rng)
+                setattr(player, 'color', Fore.RED)
+            else:
+                player = HumanPlayer(rng=self.rng)
+                setattr(player, 'color', Fore.CYAN)
+            self.add_player(player)
+
+    def load_position(self, position: Position) -> None:
+        """
+        Восстанавливает доску, игроков и очередь хода по позиции
+        """
+        self._restore_players(position.players)
+
+        board = Board(position.size)
+        layout = {}
+        placed = []
+        for row in range(1, position.size + 1):
+            for col in range(1, position.size + 1):
+                code = position.get(row, col)
+                if code in (CELL_TRUE, CELL_FALSE):
+                    layout[(row, col)] = code == CELL_TRUE
+                elif code >= CELL_TOKEN:
+                    type_idx, owner_idx = split_token_code(code)
+                    placed.append((TOKEN_TYPES[type_idx], self.players[owner_idx], row, col))
+
+        board.setup(layout=layout)
+        for token_type, owner, row, col in placed:
+            # Токен на доске помнит последнего владельца, но уже не входит в его набор
+            token = token_type(owner=owner, rng=self.rng)
+            token.remove_owner()
+            board.put_token(token, row, col)
+
+        self._board = board
+        self.rules.setup(board)
+
+        for player, state in zip(self.players, position.players):
+            player.set_tokens([TOKEN_TYPES[type_idx](rng=self.rng) for type_idx in state.hand])
+            player.reset_points()
+            player.add_points(state.points)
+
+        self._current_player_index = position.current
+        logger.info(f'Партия восстановлена из снимка: доска {position.size}x{position.size}')
+
     def start_round(self):
         if self.play_again:
             self._board = Board()
         self.setup()
 
     def play(self, debug=False):
+        # Запас расстановок начинает пополняться, пока игрок читает правила
+        self._get_layouts()
         self.display.show_start()
         if not self.input_handler.ask_go_ahead():
+            if self._layouts is not None:
+                self._layouts.stop()
             self.display.show_prompt('До встречи!')
             return
         
         while True:
-            self.start_round()
+            with profiling.phase('setup'):
+                self.start_round()
             
             while True:
                 player = self.get_current_player()
                 self._turn_info(player)
 
                 try:
-                    token, row, col = self._get_info(player)
-                    self.move(player, token, row, col)
-                    self.impute(player, row, col)
+                    with profiling.phase('ai' if isinstance(player, AIPlayer) else 'input'):
+                        token, row, col = self._get_info(player)
+                    with profiling.phase('move'):
+                        self.move(player, token, row, col)
+                        self.impute(player, row, col)
                 except Exception as error:
                     self.handle_exception(error, player, row, col)
                     continue
 
+                if self.record is not None:
+                    self.record.moves.append((type(token).__name__, row, col))
                 self.end_turn(player, token)
+                # Пока человек думает над ходом, ИИ обдумывает ответы
+                if isinstance(player, AIPlayer) and isinstance(self.get_current_player(), HumanPlayer):
+                    player.ponder(self.to_position())
 
                 if (
                     self.rules.is_board_full(self.board) or 
@@ -258,8 +522,15 @@ class Game:
                 ):
                     break
 
-            self.play_again = self.end_round(debug)
+            with profiling.phase('round_end'):
+                self.play_again = self.end_round(debug)
             if not self.play_again:
+                if self._draft is not None:
+                    self._draft.shutdown()
+                if self._book is not None:
+                    self._book.close()
+                if self._layouts is not None:
+                    self._layouts.stop()
                 self.display.show_prompt('Игра завершена!')
                 return
 
@@ -2,12 +2,17 @@
 
 from abc import ABC, abstractmethod
 import logging
+import random
+from typing import TYPE_CHECKING, Callable
 
 from core import settings
 from core.displays import ConsoleDisplay
 from core.players import Player
 from core.tokens import AND, IMP, OR, XOR, Token
 
+if TYPE_CHECKING:
+    # Только для аннотаций: подсказки загружаются при первом запросе
+    from core.hints import Hints
 
 logger = logging.getLogger(__name__)
 
@@ -47,8 +52,20 @@ class ConsoleInputHandler(InputHandler):
         }
         self.display = ConsoleDisplay()
 
-    def get_tokens(self, tokens_amount=settings.INITIAL_TOKENS) -> list[Token]:
+    def get_tokens(
+            self,
+            tokens_amount=settings.INITIAL_TOKENS,
+            hint: list[type[Token]] | None = None,
+            rng: random.Random | None = None,
+            ) -> list[Token]:
+        """
+        hint - подсказка: лучший по оценке набор для текущей расстановки операндов
+        rng - генератор партии для id токенов
+        """
         tokens = []
+        if hint:
+            names = {token_type: name for name, token_type in self.valid_tokens.items()}
+            self.display.show_prompt(f"Подсказка: лучший набор для этого поля - {', '.join(names[t] for t in hint)}")
 
         for i in range(1, tokens_amount + 1):
             while True:
@@ -62,7 +79,7 @@ class ConsoleInputHandler(InputHandler):
                         f"Неверный тип токена: Доступные токены: {list(self.valid_tokens.keys())}: "
                         )
                 else:
-                    tokens.append(token_type())
+                    tokens.append(token_type(rng=rng))
                     break
 
         logger.info(f'Игрок успешно выбрал токены: {[token.to_string() for token in tokens]}')
@@ -72,11 +89,20 @@ class ConsoleInputHandler(InputHandler):
         if not 1 <= token_idx <= len(player.tokens):
             raise IndexError(f"Порядковый номер токена должен быть от 1 до {len(player.tokens)}")
     
-    def get_move(self, player: Player) -> tuple[int, int, int]:
+    def get_move(self, player: Player, hints: 'Callable[[], Hints] | None' = None) -> tuple[int, int, int]:
+        """
+        hints - подсказка по запросу: по вводу '?' вместо номера токена
+        выводятся лучшие ходы и карта оценок клеток
+        """
+        prompt = "Введите порядковый номер токена" + (" (? - подсказка): " if hints else ": ")
         while True:
             try:
-                self.display.show_prompt("Введите порядковый номер токена: ")
-                token_idx = int(input())
+                self.display.show_prompt(prompt)
+                answer = input().strip()
+                if hints and answer == '?':
+                    self.display.show_hints(hints())
+                    continue
+                token_idx = int(answer)
                 self._validate_token_index(token_idx, player)
             except ValueError as e:
                 logger.warning(f'Ошибка: {e}')
@@ -0,0 +1,161 @@
+# core/hints.py
+import logging
+import threading
+import time
+
+from core import settings
+from core.exceptions import SearchCancelledError
+from core.search import SearchEngine, Searcher
+from core.snapshots import CELL_FALSE, CELL_TRUE, TOKEN_TYPES, Position
+
+logger = logging.getLogger(__name__)
+
+
+class Hints:
+    """
+    Подсказка для позиции: оценка каждого хода {(тип токена, row, col): оценка}
+    и сколько ходов уже оценено перебором на полную глубину (остальные - по очкам
+    сразу после хода). Оценка - разница очков с лучшим соперником
+    """
+    __slots__ = ('position', 'values', 'searched', 'depth')
+
+    def __init__(self, position: Position, values: dict, searched: int, depth: int) -> None:
+        self.position = position
+        self.values = values
+        self.searched = searched
+        self.depth = depth
+
+    @property
+    def complete(self) -> bool:
+        return self.searched == len(self.values)
+
+    def top(self, k: int = settings.HINT_TOP) -> list[tuple[tuple[type, int, int], int]]:
+        return sorted(self.values.items(), key=lambda item: -item[1])[:k]
+
+    def heatmap(self, token_type: type) -> dict[tuple[int, int], int]:
+        """
+        Оценки клеток для одного типа токена: {(row, col): оценка}
+        """
+        return {(row, col): value for (move_type, row, col), value in self.values.items() if move_type is token_type}
+
+
+class HintAdvisor:
+    """
+    ОПИСАНИЕ:
+    - Подсказки человеку во время хода. С началом хода фоновый поток оценивает
+    ходы: сначала все - по очкам сразу после хода (таблицы движка, мгновенно),
+    затем по одному перебором на глубину depth, начиная с лучших. Запрос подсказки
+    ждет не дольше budget_ms и отдает то, что готово. Между ходами переиспользуются
+    скомпилированные правила (операнды за раунд не меняются) и таблица оценок узлов
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - start: начать оценку позиции в фоне
+    - hints: подсказка для позиции (ждет не дольше бюджета)
+    - stop: остановить фоновую оценку
+    """
+    def __init__(
+            self,
+            depth: int = settings.HINT_DEPTH,
+            budget_ms: float = settings.HINT_BUDGET_MS,
+            table_size: int = settings.PONDER_TABLE_SIZE,
+            ) -> None:
+        """
+        attr:_table - оценки узлов всех переборов раунда
+        attr:_values - оценки ходов текущей позиции, пополняются фоновым потоком
+        """
+        self._searcher = Searcher(depth)
+        self.budget_ms = budget_ms
+        self._table_size = table_size
+        self._engine: SearchEngine | None = None
+        self._layout: tuple | None = None
+        self._table: dict = {}
+        self._position: Position | None = None
+        self._values: dict = {}
+        self._searched: dict = {}
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self._ready = threading.Event()
+
+    def _engine_for(self, position: Position) -> SearchEngine:
+        layout = tuple(code if code in (CELL_FALSE, CELL_TRUE) else 0 for code in position.cells)
+        if layout != self._layout:
+            self._engine = self._searcher.engine_for(position)
+            self._layout = layout
+            self._table.clear()
+        return self._engine
+
+    def start(self, position: Position) -> None:
+        self.stop()
+        engine = self._engine_for(position)
+        state = engine.state_from_position(position)
+        # Немедленные оценки - по таблицам движка, считаются сразу: подсказка
+        # готова в любой момент хода
+        immediate = {
+            move: engine.evaluate(engine.apply(state, move), state.current)
+            for move in engine.moves(state)
+        }
+        self._position = position
+        self._values = {
+            (TOKEN_TYPES[type_idx], *engine.cell_coords(idx)): value
+            for (type_idx, idx), value in immediate.items()
+        }
+        self._searched = {}
+        self._stop_event = threading.Event()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(engine, position, immediate, self._stop_event, self._ready),
+            name='hints',
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        if len(self._table) > self._table_size:
+            self._table.clear()
+
+    def _run(
+            self,
+            engine: SearchEngine,
+            position: Position,
+            immediate: dict[tuple[int, int], int],
+            stop: threading.Event,
+            ready: threading.Event,
+            ) -> None:
+        # Перебор пишет оценки в отдельный словарь по мере готовности;
+        # сначала ходы, лучшие по немедленной оценке
+        ordered = sorted(immediate, key=lambda move: -immediate[move])
+        started = time.perf_counter()
+        try:
+            self._searcher.evaluate_moves(
+                position, engine, table=self._table, stop=stop, moves=ordered, values=self._searched
+            )
+        except SearchCancelledError:
+            pass
+        finally:
+            ready.set()
+        logger.debug(
+            f'Подсказка: оценено перебором {len(self._searched)} из {len(immediate)} ходов '
+            f'за {(time.perf_counter() - started) * 1000:.0f} мс'
+        )
+
+    def hints(self, position: Position) -> Hints:
+        """
+        Подсказка для позиции. Если фоновая оценка начата для другой позиции
+        (или не начата), она начинается заново
+        """
+        if self._position is None or self._position.cells != position.cells or self._thread is None:
+            self.start(position)
+        self._ready.wait(self.budget_ms / 1000)
+
+        # Копии словарей: фоновый поток может продолжать их пополнять
+        values = dict(self._values)
+        searched = dict(self._searched)
+        values.update(searched)
+        return Hints(position, values, len(searched), self._searcher.depth)
@@ -0,0 +1,269 @@
+# core/layouts.py
+import argparse
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+
+from core import settings
+from core.draft import playout, solve
+from core.rng import GameRandom
+from core.search import SearchEngine, Searcher
+from core.snapshots import CELL_EMPTY, CELL_FALSE, CELL_TRUE, PLAYER_AI, TOKEN_TYPES, PlayerState, Position
+
+logger = logging.getLogger(__name__)
+
+# После скольких оценок проверяется ранний отказ и сколько стандартных ошибок
+# должно отделять среднее от допуска, чтобы отказать не дожидаясь всех оценок
+EARLY_CHECK_SAMPLES = 16
+EARLY_REJECT_SIGMAS = 2.0
+
+
+def random_layout(size: int, rng: random.Random) -> dict[tuple[int, int], bool]:
+    """
+    Расстановка операндов как в Board.setup: монетка на каждую клетку шахматного порядка
+    """
+    return {
+        (row, col): bool(rng.choice([0, 1]))
+        for row in range(1, size + 1)
+        for col in range(1, size + 1)
+        if (row + col) % 2 == 0
+    }
+
+
+def layout_position(
+        layout: dict[tuple[int, int], bool],
+        size: int,
+        hands: list[list[int]],
+        ) -> Position:
+    """
+    Начальная позиция раунда с расстановкой layout и наборами hands (индексы типов)
+    """
+    cells = [CELL_EMPTY] * (size * size)
+    for (row, col), value in layout.items():
+        cells[(row - 1) * size + (col - 1)] = CELL_TRUE if value else CELL_FALSE
+    return Position(size, 0, cells, [PlayerState(PLAYER_AI, 0, hand) for hand in hands])
+
+
+class LayoutFairness:
+    """
+    ОПИСАНИЕ:
+    - Оценка расстановки: средний итог раунда для первого игрока (разница очков
+    со вторым), его стандартная ошибка, число оценок и доля пар (свободная
+    клетка, тип токена), приносящих очки: у расстановок из одних нулей она мала
+    """
+    __slots__ = ('advantage', 'error', 'samples', 'scoring')
+
+    def __init__(self, advantage: float, error: float, samples: int, scoring: float) -> None:
+        self.advantage = advantage
+        self.error = error
+        self.samples = samples
+        self.scoring = scoring
+
+    def __repr__(self) -> str:
+        return (
+            f'LayoutFairness(advantage={self.advantage:.2f}±{self.error:.2f}, '
+            f'samples={self.samples}, scoring={self.scoring:.2f})'
+        )
+
+
+def estimate_fairness(
+        layout: dict[tuple[int, int], bool],
+        size: int,
+        rng: random.Random,
+        samples: int = settings.LAYOUT_SAMPLES,
+        tolerance: float = settings.LAYOUT_TOLERANCE,
+        tokens: int = settings.INITIAL_TOKENS,
+        exact_cells: int = settings.DRAFT_EXACT_CELLS,
+        ) -> LayoutFairness:
+    """
+    Итог раунда для первого игрока при случайных наборах двух игроков: точным
+    перебором на маленьких досках, жадными плейаутами с шумом - на больших.
+    Таблицы правил компилируются один раз на расстановку. Если после
+    EARLY_CHECK_SAMPLES оценок среднее уже заведомо вне допуска, оценка
+    прекращается - большинство перекошенных расстановок отсеивается дешево
+    """
+    position = layout_position(layout, size, [[], []])
+    engine = SearchEngine(position)
+    empty = [idx for idx, code in enumerate(position.cells) if code == CELL_EMPTY]
+    scoring = sum(
+        engine.get_points(type_idx, idx) > 0 for idx in empty for type_idx in range(len(TOKEN_TYPES))
+    ) / max(1, len(empty) * len(TOKEN_TYPES))
+
+    exact = len(empty) <= exact_cells
+    searcher = Searcher(len(empty)) if exact else None
+    table: dict = {}
+    total = total_sq = 0.0
+    count = 0
+    for _ in range(samples):
+        hands = [[rng.randrange(len(TOKEN_TYPES)) for _ in range(tokens)] for _ in range(2)]
+        start = layout_position(layout, size, hands)
+        if exact:
+            value = solve(searcher, engine, start, 0, table)
+        else:
+            value = playout(engine, engine.state_from_position(start), 0, rng)
+        total += value
+        total_sq += value * value
+        count += 1
+
+        if count >= EARLY_CHECK_SAMPLES and count % EARLY_CHECK_SAMPLES == 0:
+            mean = total / count
+            error = math.sqrt(max(0.0, total_sq / count - mean * mean) / count)
+            if abs(mean) - EARLY_REJECT_SIGMAS * error > tolerance:
+                break
+
+    mean = total / count
+    error = math.sqrt(max(0.0, total_sq / count - mean * mean) / count)
+    return LayoutFairness(mean, error, count, scoring)
+
+
+class LayoutGenerator:
+    """
+    ОПИСАНИЕ:
+    - Генератор сбалансированных расстановок. Кандидаты - расстановки Board.setup
+    из дочерних потоков сида ('layout', номер), поэтому последовательность
+    принятых расстановок зависит только от сида. Принимаются расстановки,
+    где преимущество первого игрока по модулю не больше tolerance и очки
+    приносит не меньше min_scoring пар (свободная клетка, тип токена)
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - accepts: проходит ли оценка расстановки порог
+    - next_layout: следующая принятая расстановка {(row, col): значение операнда}
+    :::Счетчики:::
+    - checked: оценено кандидатов
+    - accepted: принято
+    """
+    def __init__(
+            self,
+            size: int,
+            rng: GameRandom,
+            tolerance: float = settings.LAYOUT_TOLERANCE,
+            min_scoring: float = settings.LAYOUT_MIN_SCORING,
+            samples: int = settings.LAYOUT_SAMPLES,
+            ) -> None:
+        self.size = size
+        self._rng = rng
+        self.tolerance = tolerance
+        self.min_scoring = min_scoring
+        self.samples = samples
+        self.checked = 0
+        self.accepted = 0
+
+    def accepts(self, fairness: LayoutFairness) -> bool:
+        return abs(fairness.advantage) <= self.tolerance and fairness.scoring >= self.min_scoring
+
+    def next_layout(self, stop: threading.Event | None = None) -> dict[tuple[int, int], bool] | None:
+        """
+        None - поиск остановлен флагом stop
+        """
+        while stop is None or not stop.is_set():
+            candidate_rng = self._rng.split('layout', self.checked)
+            self.checked += 1
+            layout = random_layout(self.size, candidate_rng)
+            fairness = estimate_fairness(layout, self.size, candidate_rng, self.samples, self.tolerance)
+            if self.accepts(fairness):
+                self.accepted += 1
+                logger.debug(f'Расстановка принята: {fairness}')
+                return layout
+        return None
+
+
+class LayoutPool:
+    """
+    ОПИСАНИЕ:
+    - Запас принятых расстановок для мгновенного начала раунда. Фоновый поток
+    пополняет запас до capacity, пока идет игра; take отдает готовую
+    расстановку и будит поток
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - start: запустить пополнение в фоне
+    - take: взять расстановку (ждет не дольше timeout, если запас пуст; None - до готовности)
+    - stop: остановить пополнение
+    """
+    def __init__(self, generator: LayoutGenerator, capacity: int = settings.LAYOUT_POOL_SIZE) -> None:
+        self.generator = generator
+        self.capacity = max(1, capacity)
+        self._layouts: deque[dict[tuple[int, int], bool]] = deque()
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __len__(self) -> int:
+        return len(self._layouts)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='layout-pool', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        stop = self._stop_event
+        while not stop.is_set():
+            with self._condition:
+                while len(self._layouts) >= self.capacity and not stop.is_set():
+                    self._condition.wait()
+            layout = self.generator.next_layout(stop)
+            if layout is None:
+                return
+            with self._condition:
+                self._layouts.append(layout)
+                self._condition.notify_all()
+
+    def take(self, timeout: float | None = settings.LAYOUT_WAIT_MS / 1000) -> dict[tuple[int, int], bool] | None:
+        """
+        Расстановка из запаса или None, если за timeout она не появилась.
+        С timeout=None ждет готовую расстановку; если поток пополнения
+        не запущен, следующая расстановка генерируется здесь же
+        """
+        with self._condition:
+            if not self._layouts and timeout is None and (self._thread is None or not self._thread.is_alive()):
+                return self.generator.next_layout()
+            if not self._layouts:
+                self._condition.wait_for(lambda: self._layouts, timeout)
+            if not self._layouts:
+                return None
+            layout = self._layouts.popleft()
+            self._condition.notify_all()
+            return layout
+
+
+def main() -> None:
+    """
+    Скорость и доля принятых расстановок: python -m core.layouts --size 5 --count 100
+    """
+    parser = argparse.ArgumentParser(description='Генератор сбалансированных расстановок ThunderTruth')
+    parser.add_argument('--count', type=int, default=100, help='сколько расстановок принять')
+    parser.add_argument('--size', type=int, default=settings.BOARD_SIZE, help='размер доски')
+    parser.add_argument('--tolerance', type=float, default=settings.LAYOUT_TOLERANCE)
+    parser.add_argument('--samples', type=int, default=settings.LAYOUT_SAMPLES)
+    parser.add_argument('--seed', type=int, default=settings.SEED or 0)
+    args = parser.parse_args()
+
+    generator = LayoutGenerator(args.size, GameRandom(args.seed), args.tolerance, samples=args.samples)
+    started = time.perf_counter()
+    for _ in range(args.count):
+        generator.next_layout()
+    elapsed = time.perf_counter() - started
+    print(
+        f'Принято {generator.accepted} из {generator.checked} расстановок, время: {elapsed:.1f} с '
+        f'({generator.accepted / elapsed:.1f} расстановок/с, {elapsed / generator.accepted * 1000:.0f} мс на расстановку)'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+# core/logqueue.py
+import atexit
+import logging
+from logging.handlers import QueueHandler, RotatingFileHandler
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+POLICY_DROP = 'drop'
+POLICY_BLOCK = 'block'
+
+
+class BatchedRotatingFileHandler(RotatingFileHandler):
+    """
+    Файловый хендлер с ротацией, который не сбрасывает буфер на каждую запись.
+    Сброс на диск делает фоновый писатель - один раз на пачку записей
+    """
+    def flush(self) -> None:
+        pass
+
+    def flush_batch(self) -> None:
+        super().flush()
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    ОПИСАНИЕ:
+    - Хендлер, который только кладет запись в ограниченную очередь.
+    Игровой цикл не ждет диска: при переполнении очереди запись
+    отбрасывается (drop) или ожидает место не дольше block_timeout (block)
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - enqueue: положить запись в очередь по выбранной политике
+    - take_dropped: число отброшенных записей с прошлого вызова
+    """
+    def __init__(self, log_queue: queue.Queue, policy: str = POLICY_DROP, block_timeout: float = 0.05) -> None:
+        super().__init__(log_queue)
+        if policy not in (POLICY_DROP, POLICY_BLOCK):
+            raise ValueError(f'Неизвестная политика очереди логов: {policy}')
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if self.policy == POLICY_BLOCK:
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self._dropped += 1
+
+    def take_dropped(self) -> int:
+        with self._dropped_lock:
+            dropped, self._dropped = self._dropped, 0
+        return dropped
+
+
+class BatchingQueueListener:
+    """
+    ОПИСАНИЕ:
+    - Фоновый писатель логов. Забирает из очереди пачку записей (до batch_size),
+    передает их хендлерам и сбрасывает буферы один раз на пачку.
+    При остановке дописывает все, что осталось в очереди
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - start: запустить поток-писатель
+    - stop: дописать очередь, сбросить и закрыть хендлеры
+    """
+    _SENTINEL = None
+
+    def __init__(
+            self,
+            log_queue: queue.Queue,
+            handlers: list[logging.Handler],
+            queue_handler: BoundedQueueHandler,
+            batch_size: int = 256,
+            ) -> None:
+        self.queue = log_queue
+        self.handlers = handlers
+        self.queue_handler = queue_handler
+        self.batch_size = batch_size
+        self._thread: threading.Thread | None = None
+        self._stopped = False
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _handle(self, record: logging.LogRecord) -> None:
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def _flush(self) -> None:
+        dropped = self.queue_handler.take_dropped()
+        if dropped:
+            self._handle(logging.LogRecord(
+                logger.name, logging.WARNING, __file__, 0,
+                f'Очередь логов переполнена: пропущено записей: {dropped}', None, None,
+            ))
+        for handler in self.handlers:
+            if isinstance(handler, BatchedRotatingFileHandler):
+                handler.flush_batch()
+            else:
+                handler.flush()
+
+    def _run(self) -> None:
+        while True:
+            record = self.queue.get()
+            stop = record is self._SENTINEL
+            if not stop:
+                self._handle(record)
+
+            # Дозабираем то, что уже лежит в очереди, без ожидания
+            written = 1
+            while not stop and written < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is self._SENTINEL:
+                    stop = True
+                    break
+                self._handle(record)
+                written += 1
+
+            self._flush()
+            if stop:
+                return
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._stopped or self._thread is None:
+                return
+            self._stopped = True
+
+        # Маркер остановки ставится в очередь блокирующе: все записи до него будут записаны
+        self.queue.put(self._SENTINEL)
+        self._thread.join()
+        for handler in self.handlers:
+            handler.close()
@@ -1,6 +1,7 @@
 # core/main.py
 import logging
-from logging.handlers import RotatingFileHandler
+import sys
+from typing import TYPE_CHECKING
 
 import colorama
 
@@ -9,30 +10,54 @@ from core.rules import ThunderTruthRules
 from core.handlers import ConsoleInputHandler
 from core.displays import ConsoleDisplay
 from core.game import Game
-from core import settings
+from core import profiling, settings
 
+if TYPE_CHECKING:
+    # Только для аннотаций: очередь логов загружается лишь в режиме PRODUCTION
+    from core.logqueue import BatchingQueueListener
 
-def setup_logging():
+
+def setup_logging() -> 'BatchingQueueListener | None':
     """
-    Настраивает логирование в зависимости от режима (DEBUG или PRODUCTION)
+    Настраивает логирование в зависимости от режима (DEBUG или PRODUCTION).
+    В боевом режиме возвращает фоновый писатель логов, который нужно остановить при выходе
     """
     logger = logging.getLogger()
     logger.setLevel(settings.LOGGING_LEVEL)
     log_format = logging.Formatter(settings.LOGGING_FORMAT, datefmt=settings.LOGGING_DATEFMT)
+    listener = None
     
     # Очищаем существующие хендлеры, чтобы избежать дублирования
     logger.handlers.clear()
     
     if settings.PRODUCTION:
-        # В боевом режиме логи только в файл
-        file_handler = RotatingFileHandler(
+        # В боевом режиме логи только в файл. Запись и ротация идут
+        # в фоновом потоке, игровой цикл только кладет записи в очередь.
+        # logging.handlers тянет socket и pickle - импортируем только здесь
+        import queue
+        from core.logqueue import BatchedRotatingFileHandler, BatchingQueueListener, BoundedQueueHandler
+
+        file_handler = BatchedRotatingFileHandler(
             'game.log',
             maxBytes=5*1024*1024,  # 5 MB
             backupCount=3  # Хранить до 3 архивных логов
         )
         file_handler.setLevel(settings.LOGGING_LEVEL)
         file_handler.setFormatter(log_format)
-        logger.addHandler(file_handler)
+
+        log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        queue_handler = BoundedQueueHandler(
+            log_queue,
+            policy=settings.LOG_QUEUE_POLICY,
+            block_timeout=settings.LOG_QUEUE_BLOCK_TIMEOUT,
+        )
+        queue_handler.setLevel(settings.LOGGING_LEVEL)
+        logger.addHandler(queue_handler)
+
+        listener = BatchingQueueListener(
+            log_queue, [file_handler], queue_handler, batch_size=settings.LOG_BATCH_SIZE
+        )
+        listener.start()
     else:
         # В режиме разработки логи в консоль
         stream_handler = logging.StreamHandler()
@@ -41,21 +66,31 @@ def setup_logging():
         logger.addHandler(stream_handler)
     
     logging.info("Инициализация логирования завершена")
+    return listener
 
 def main():
     """
     Точка входа для игры
     """
     colorama.init(strip=False)
-    setup_logging()
+    log_listener = setup_logging()
     logger = logging.getLogger(__name__)
     logger.info("Запуск игры")
+    # Единственный флаг запуска - без argparse, он заметно удлиняет старт
+    if settings.PROFILE or '--profile' in sys.argv[1:]:
+        profiling.start()
 
     board = Board(settings.BOARD_SIZE)
     rules = ThunderTruthRules()
     input_handler = ConsoleInputHandler()
     display = ConsoleDisplay()
     game = Game(board, rules, input_handler, display)
+    spectators = None
+    if settings.SPECTATE:
+        # asyncio нужен только трансляции - импорт по месту
+        from core.spectate import serve_spectators
+
+        spectators = serve_spectators(game)
 
     # Запуск игрового цикла
     try:
@@ -66,6 +101,15 @@ def main():
     except Exception as e:
         logger.error(f"Произошла ошибка: {str(e)}")
         display.show_prompt(f"Ошибка: {str(e)}")
+    finally:
+        if spectators is not None:
+            spectators.stop()
+        reports = profiling.stop()
+        if reports:
+            display.show_prompt(f"Отчеты профилирования: {', '.join(reports)}")
+        # Дописываем очередь логов до выхода из процесса
+        if log_listener is not None:
+            log_listener.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
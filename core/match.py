@@ -0,0 +1,351 @@
+# core/match.py
+import argparse
+import json
+import logging
+import math
+import os
+import time
+
+from colorama import Fore
+
+from core import settings
+from core.board import Board
+from core.displays import NullDisplay
+from core.game import Game
+from core.players import AIPlayer
+from core.ponder import Ponderer
+from core.rng import GameRandom
+from core.rules import ThunderTruthRules
+from core.snapshots import TOKEN_TYPES
+
+logger = logging.getLogger(__name__)
+
+SPRT_ACCEPT = 'H1'
+SPRT_REJECT = 'H0'
+SPRT_CONTINUE = None
+
+SEAT_COLORS = [Fore.CYAN, Fore.RED]
+
+# Доля очков новой стратегии в паре для итогов 0, 0.5, 1, 1.5, 2 очка
+PAIR_SCORES = [0.0, 0.25, 0.5, 0.75, 1.0]
+PSEUDO_COUNT = 1e-3
+
+
+class Strategy:
+    """
+    ОПИСАНИЕ:
+    - Настройка AIPlayer для матча. Описание - строка 'depth=2,book=book.idx':
+    depth - глубина перебора (0 - случайные ходы), book - книга опыта
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - parse: настройка из строки
+    - make_player: ИИ-игрок с этой настройкой
+    """
+    __slots__ = ('spec', 'depth', 'book', '_book_index')
+
+    def __init__(self, spec: str, depth: int, book: str | None = None) -> None:
+        self.spec = spec
+        self.depth = depth
+        self.book = book
+        self._book_index = None
+
+    def __repr__(self) -> str:
+        return f'Strategy({self.spec!r})'
+
+    @classmethod
+    def parse(cls, spec: str) -> 'Strategy':
+        options = dict(item.split('=', 1) for item in spec.split(',') if item)
+        unknown = set(options) - {'depth', 'book'}
+        if unknown:
+            raise ValueError(f'Неизвестные параметры стратегии {spec!r}: {sorted(unknown)}')
+        return cls(spec, int(options.get('depth', settings.AI_SEARCH_DEPTH)), options.get('book'))
+
+    def make_player(self, name: str, rng: GameRandom) -> AIPlayer:
+        ponderer = Ponderer(self.depth, self.depth) if self.depth > 0 else None
+        if self.book and self._book_index is None:
+            from core.book import PositionIndex
+
+            self._book_index = PositionIndex(self.book)
+        return AIPlayer(name, rng, ponderer, self._book_index if ponderer is not None else None)
+
+
+class SPRT:
+    """
+    ОПИСАНИЕ:
+    - Последовательный тест отношения правдоподобия по парам партий.
+    H0: новая стратегия сильнее старой на elo0, H1: на elo1 (логистическое Эло).
+    Итог пары - сумма очков новой стратегии за обе партии (0, 0.5, ..., 2):
+    партии пары связаны общей расстановкой, поэтому единица наблюдения - пара
+    (пентаномиальная модель). LLR - обобщенный SPRT: отношение правдоподобий
+    распределений итогов пар, наиболее правдоподобных при средних H1 и H0
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - add_pair: учесть итог пары
+    - llr: логарифм отношения правдоподобия
+    - status: SPRT_ACCEPT (H1), SPRT_REJECT (H0) или SPRT_CONTINUE
+    - elo: оценка разницы Эло и полуширина 95% интервала
+    """
+    def __init__(
+            self,
+            elo0: float = settings.SPRT_ELO0,
+            elo1: float = settings.SPRT_ELO1,
+            alpha: float = settings.SPRT_ALPHA,
+            beta: float = settings.SPRT_BETA,
+            ) -> None:
+        """
+        attr:pentanomial - число пар с итогом 0, 0.5, 1, 1.5, 2 очка
+        """
+        self.elo0, self.elo1 = elo0, elo1
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.pentanomial = [0] * 5
+
+    @staticmethod
+    def expected_score(elo: float) -> float:
+        return 1 / (1 + 10 ** (-elo / 400))
+
+    @property
+    def pairs(self) -> int:
+        return sum(self.pentanomial)
+
+    def add_pair(self, points: float) -> None:
+        self.pentanomial[round(points * 2)] += 1
+
+    def _frequencies(self) -> list[float]:
+        """
+        Доли пар по итогам. Пустые итоги получают малую псевдочастоту: иначе
+        при одинаковых первых парах ограничение на среднее невыполнимо
+        """
+        counts = [count or PSEUDO_COUNT for count in self.pentanomial]
+        total = sum(counts)
+        return [count / total for count in counts]
+
+    def _mean_var(self) -> tuple[float, float]:
+        frequencies = self._frequencies()
+        mean = sum(freq * score for freq, score in zip(frequencies, PAIR_SCORES))
+        var = sum(freq * (score - mean) ** 2 for freq, score in zip(frequencies, PAIR_SCORES))
+        return mean, var
+
+    @staticmethod
+    def _constrained(frequencies: list[float], target: float) -> list[float]:
+        """
+        Распределение итогов пар с наибольшим правдоподобием при среднем target:
+        p_i = f_i / (1 + lam * (a_i - target)), lam - корень условия на среднее
+        (монотонная функция, ищется делением пополам)
+        """
+        shifts = [score - target for score in PAIR_SCORES]
+        low = -1 / max(shifts) + 1e-12
+        high = -1 / min(shifts) - 1e-12
+
+        def excess(lam: float) -> float:
+            return sum(freq * shift / (1 + lam * shift) for freq, shift in zip(frequencies, shifts))
+
+        for _ in range(100):
+            middle = (low + high) / 2
+            if excess(middle) > 0:
+                low = middle
+            else:
+                high = middle
+        lam = (low + high) / 2
+        return [freq / (1 + lam * shift) for freq, shift in zip(frequencies, shifts)]
+
+    def llr(self) -> float:
+        if not self.pairs:
+            return 0.0
+        frequencies = self._frequencies()
+        h0 = self._constrained(frequencies, self.expected_score(self.elo0))
+        h1 = self._constrained(frequencies, self.expected_score(self.elo1))
+        return self.pairs * sum(
+            freq * math.log(p1 / p0) for freq, p0, p1 in zip(frequencies, h0, h1)
+        )
+
+    def status(self) -> str | None:
+        llr = self.llr()
+        if llr >= self.upper:
+            return SPRT_ACCEPT
+        if llr <= self.lower:
+            return SPRT_REJECT
+        return SPRT_CONTINUE
+
+    def elo(self) -> tuple[float, float]:
+        if not self.pairs:
+            return 0.0, math.inf
+        mean, var = self._mean_var()
+
+        def to_elo(score: float) -> float:
+            score = min(max(score, 1e-6), 1 - 1e-6)
+            return -400 * math.log10(1 / score - 1)
+
+        spread = 1.96 * math.sqrt(var / self.pairs)
+        return to_elo(mean), (to_elo(mean + spread) - to_elo(mean - spread)) / 2
+
+
+def play_match_game(
+        board_seed: tuple,
+        hands: list[list[int]],
+        strategies: list[Strategy],
+        size: int,
+        seed: int,
+        ) -> list[int]:
+    """
+    Партия ИИ против ИИ на объектной модели игры: операнды - Board.setup
+    с генератором board_seed, наборы hands по местам. Возвращает очки по местам
+    """
+    board = Board(size)
+    board.setup(GameRandom(seed, board_seed))
+    game = Game(board, ThunderTruthRules(), None, NullDisplay(), rng=GameRandom(seed, (*board_seed, 'moves')))
+    game.rules.setup(board)
+    for seat, (strategy, hand) in enumerate(zip(strategies, hands)):
+        player = strategy.make_player(f'{seat + 1}: {strategy.spec}', game.rng)
+        setattr(player, 'color', SEAT_COLORS[seat])
+        player.set_tokens([TOKEN_TYPES[type_idx]() for type_idx in hand])
+        game.add_player(player)
+
+    players = game.players
+    while not game.rules.is_board_full(board) and game.rules.are_tokens_left(players):
+        player = game.get_current_player()
+        token_idx, row, col = player.think(board, game.to_position())
+        token = player.tokens[token_idx]
+        game.move(player, token, row, col)
+        game.impute(player, row, col)
+        game.end_turn(player, token)
+    return [player.get_points() for player in players]
+
+
+def _score(points: list[int], seat: int) -> float:
+    other = points[1 - seat]
+    return 1.0 if points[seat] > other else 0.5 if points[seat] == other else 0.0
+
+
+def match_chunk(args: tuple) -> list[float]:
+    """
+    Пачка пар в процессе пула: очки новой стратегии за каждую пару.
+    В паре обе партии идут на одной расстановке и с одними наборами мест,
+    стратегии меняются местами
+    """
+    first_pair, pairs, new_spec, old_spec, size, tokens, seed = args
+    # Партии пишут в лог каждый ход - в матче это только тормозит
+    logging.disable(logging.INFO)
+    new, old = Strategy.parse(new_spec), Strategy.parse(old_spec)
+    results = []
+    for pair_idx in range(first_pair, first_pair + pairs):
+        hands_rng = GameRandom(seed, ('match', pair_idx, 'hands'))
+        hands = [[hands_rng.randrange(len(TOKEN_TYPES)) for _ in range(tokens)] for _ in range(2)]
+        board_seed = ('match', pair_idx, 'board')
+        first = play_match_game(board_seed, hands, [new, old], size, seed)
+        second = play_match_game(board_seed, hands, [old, new], size, seed)
+        results.append(_score(first, 0) + _score(second, 1))
+    return results
+
+
+def run_match(
+        new_spec: str,
+        old_spec: str,
+        sprt: SPRT,
+        size: int = settings.BOARD_SIZE,
+        tokens: int = settings.INITIAL_TOKENS,
+        seed: int = 0,
+        workers: int | None = None,
+        chunk: int = settings.MATCH_CHUNK,
+        max_pairs: int = settings.MATCH_MAX_PAIRS,
+        ) -> tuple[str | None, list[tuple[int, float]]]:
+    """
+    Матч до решения SPRT или max_pairs пар: (решение, траектория [(пар, LLR)]).
+    Пачки считаются параллельно, но учитываются в порядке номеров, поэтому
+    решение и траектория при том же сиде не зависят от числа процессов
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = (
+        (start, min(chunk, max_pairs - start), new_spec, old_spec, size, tokens, seed)
+        for start in range(0, max_pairs, chunk)
+    )
+    trajectory: list[tuple[int, float]] = []
+
+    def account(results: list[float]) -> str | None:
+        for points in results:
+            sprt.add_pair(points)
+        trajectory.append((sprt.pairs, sprt.llr()))
+        elo, error = sprt.elo()
+        logger.info(f'Пар: {sprt.pairs}, LLR {trajectory[-1][1]:.2f} [{sprt.lower:.2f}; {sprt.upper:.2f}], Эло {elo:+.1f} ± {error:.1f}')
+        return sprt.status()
+
+    if workers == 1:
+        for task in tasks:
+            status = account(match_chunk(task))
+            if status is not None:
+                return status, trajectory
+        return SPRT_CONTINUE, trajectory
+
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(match_chunk, task))
+            if len(pending) < workers * 2:
+                continue
+            status = account(pending.popleft().result())
+            if status is not None:
+                for future in pending:
+                    future.cancel()
+                return status, trajectory
+        while pending:
+            status = account(pending.popleft().result())
+            if status is not None:
+                for future in pending:
+                    future.cancel()
+                return status, trajectory
+    return SPRT_CONTINUE, trajectory
+
+
+def main() -> None:
+    """
+    Матч двух настроек ИИ с ранней остановкой:
+    python -m core.match --new depth=3 --old depth=2 --elo0 0 --elo1 20
+    """
+    parser = argparse.ArgumentParser(description='Матч настроек ИИ ThunderTruth с SPRT')
+    parser.add_argument('--new', required=True, help="новая настройка, например 'depth=3'")
+    parser.add_argument('--old', required=True, help="старая настройка, например 'depth=2,book=book.idx'")
+    parser.add_argument('--elo0', type=float, default=settings.SPRT_ELO0)
+    parser.add_argument('--elo1', type=float, default=settings.SPRT_ELO1)
+    parser.add_argument('--alpha', type=float, default=settings.SPRT_ALPHA)
+    parser.add_argument('--beta', type=float, default=settings.SPRT_BETA)
+    parser.add_argument('--size', type=int, default=settings.BOARD_SIZE, help='размер доски')
+    parser.add_argument('--tokens', type=int, default=settings.INITIAL_TOKENS)
+    parser.add_argument('--seed', type=int, default=settings.SEED or 0)
+    parser.add_argument('--workers', type=int, default=None, help='число процессов')
+    parser.add_argument('--chunk', type=int, default=settings.MATCH_CHUNK, help='пар в пачке процесса')
+    parser.add_argument('--max-pairs', type=int, default=settings.MATCH_MAX_PAIRS)
+    parser.add_argument('--out', default=None, help='записать траекторию LLR в JSONL')
+    args = parser.parse_args()
+
+    for spec in (args.new, args.old):
+        Strategy.parse(spec)
+    sprt = SPRT(args.elo0, args.elo1, args.alpha, args.beta)
+    started = time.perf_counter()
+    status, trajectory = run_match(
+        args.new, args.old, sprt, args.size, args.tokens, args.seed, args.workers, args.chunk, args.max_pairs,
+    )
+    elapsed = time.perf_counter() - started
+
+    print(f'Траектория LLR (границы {sprt.lower:.2f}; {sprt.upper:.2f}):')
+    for pairs, llr in trajectory:
+        print(f'{pairs:>8} пар  LLR {llr:+.2f}')
+    elo, error = sprt.elo()
+    verdict = {
+        SPRT_ACCEPT: f'принята H1 ({args.elo1:+g} Эло) - {args.new} сильнее {args.old}',
+        SPRT_REJECT: f'принята H0 ({args.elo0:+g} Эло) - {args.new} не сильнее {args.old}',
+        SPRT_CONTINUE: f'не решено за {sprt.pairs} пар',
+    }[status]
+    print(f'Итог: {verdict}. Эло {elo:+.1f} ± {error:.1f}, пары {sprt.pentanomial}, '
+          f'партий {sprt.pairs * 2}, время {elapsed:.1f} с')
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps({'pairs': pairs, 'llr': llr}) + '\n' for pairs, llr in trajectory)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,28 +2,39 @@
 from abc import ABC, abstractmethod
 import logging
 import random
-import secrets
 import string
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from core import settings
 from core.board import Board
 from core.exceptions import InvalidNameTypeError, TokenInvalidError
 from core.tokens import AND, IMP, OR, XOR, Token
 
+if TYPE_CHECKING:
+    # Только для аннотаций: перебор и книга загружаются при первом ходе ИИ
+    from core.book import PositionIndex
+    from core.ponder import Ponderer
+    from core.snapshots import Position
+
 logger = logging.getLogger(__name__)
 
+_system_random = random.SystemRandom()
+
 
 class Player(ABC):
     """
     Абстрактный класс для игрока
     Хранит информацию об игроке и управляет своим набором токенов-операторов.
+    Набор - мультимножество по типам токенов: добавление, удаление и проверка
+    наличия за O(1), при этом сами токены (владелец, цвет) сохраняются для отображения
     """
-    def __init__(self, name: str | None = None) -> None:
-        self._tokens: list = []
+    def __init__(self, name: str | None = None, rng: random.Random | None = None) -> None:
+        self._tokens: dict[str, Token] = {}
+        self._tokens_by_type: dict[type[Token], dict[str, Token]] = {}
         self._id = None
         self._name: str | None = name
         self._points = 0
+        self._rng = rng
 
     def get_id(self) -> str | None:
         """
@@ -33,13 +44,15 @@ class Player(ABC):
         return self._id
     
     @staticmethod
-    def _generate_id(prefix='', length=10) -> str:
+    def _generate_id(prefix='', length=10, rng=None) -> str:
         """
         Возвращает случайный id с префиксом
-        По умолчанию случайный набор из букв и цифр длиной 10
+        По умолчанию случайный набор из букв и цифр длиной 10.
+        При заданном генераторе партии id воспроизводим
         """
         characters = string.ascii_letters + string.digits
-        suffix = ''.join(secrets.choice(characters) for _ in range(length))
+        choice = rng.choice if rng is not None else _system_random.choice
+        suffix = ''.join(choice(characters) for _ in range(length))
         return prefix + '_' + suffix
 
     @property
@@ -47,8 +60,49 @@ class Player(ABC):
         return self._name
 
     @property
-    def tokens(self):
-        return self._tokens
+    def tokens(self) -> list[Token]:
+        """
+        Токены набора в порядке получения
+        """
+        return list(self._tokens.values())
+
+    def has_token(self, token: Token) -> bool:
+        return token.get_id() in self._tokens
+
+    def count_tokens(self, token_type: type[Token] | None = None) -> int:
+        """
+        Число токенов в наборе: всего или данного типа
+        """
+        if token_type is None:
+            return len(self._tokens)
+        return len(self._tokens_by_type.get(token_type, ()))
+
+    def token_types(self) -> list[type[Token]]:
+        """
+        Различные типы токенов в наборе
+        """
+        return list(self._tokens_by_type)
+
+    def get_token(self, token_type: type[Token]) -> Token | None:
+        """
+        Любой токен данного типа из набора
+        """
+        tokens = self._tokens_by_type.get(token_type)
+        if not tokens:
+            return None
+        return next(iter(tokens.values()))
+
+    def discard_token(self, token: Token) -> bool:
+        """
+        Убирает токен из набора без проверок. Возвращает, был ли токен в наборе
+        """
+        if self._tokens.pop(token.get_id(), None) is None:
+            return False
+        same_type = self._tokens_by_type[type(token)]
+        del same_type[token.get_id()]
+        if not same_type:
+            del self._tokens_by_type[type(token)]
+        return True
     
     def _validate_name(self, name):
         if not isinstance(name, str):
@@ -80,7 +134,8 @@ class Player(ABC):
         for token in self.tokens:
             token.remove_owner()
 
-        self._tokens = []
+        self._tokens = {}
+        self._tokens_by_type = {}
 
         for token in tokens:
             self.add_token(token)
@@ -92,7 +147,8 @@ class Player(ABC):
         return True
 
     def add_token(self, token: Token) -> bool:
-        self.tokens.append(token)
+        self._tokens[token.get_id()] = token
+        self._tokens_by_type.setdefault(type(token), {})[token.get_id()] = token
         if token.get_owner() is not self:
             token.set_owner(self)
         logger.debug(
@@ -106,7 +162,7 @@ class Player(ABC):
             logger.warning(f'Попытка извлечь из набора игрока неверный тип токена: {token}')
             raise TokenInvalidError('Токен должен быть подклассом Token')
         
-        if not token in self.tokens:
+        if not self.has_token(token):
             logger.warning(
                 f"Токен {token.to_string()} (token_id_{token.get_id()}) "
                 f"не найден у игрока id_{self.get_id()}"
@@ -115,7 +171,7 @@ class Player(ABC):
 
     def pop_token(self, token: Token) -> Token:
         self._validate_pop_token(token)
-        self.tokens.remove(token)
+        self.discard_token(token)
         if token.get_owner():
             token.remove_owner()
         logger.debug(
@@ -135,7 +191,7 @@ class Player(ABC):
         
     def make_id(self):
         if not self.get_id():
-            self._id = self._generate_id(self.prefix)
+            self._id = self._generate_id(self.prefix, rng=self._rng)
 
     def get_points(self) -> int:
         return self._points
@@ -149,8 +205,8 @@ class Player(ABC):
 
 
 class HumanPlayer(Player):
-    def __init__(self, name: str | None = None) -> None:
-        super().__init__(name)
+    def __init__(self, name: str | None = None, rng: random.Random | None = None) -> None:
+        super().__init__(name, rng)
         self.prefix = 'human'
         self.make_id()
         self._name = name or f'AnonymousPlayer_{self.get_id()}'
@@ -159,32 +215,126 @@ class HumanPlayer(Player):
     
 
 class AIPlayer(Player):
-    def __init__(self, name: str | None = None) -> None:
-        super().__init__(name)
+    """
+    ИИ-соперник. С перебором (ponderer) выбирает лучший ход по оценке
+    и обдумывает ответы, пока ходит соперник; без него ходит случайно
+    """
+    def __init__(
+            self,
+            name: str | None = None,
+            rng: random.Random | None = None,
+            ponderer: 'Ponderer | None' = None,
+            book: 'PositionIndex | None' = None,
+            ) -> None:
+        """
+        attr:_ponderer - перебор с обдумыванием (core.ponder.Ponderer)
+        attr:_book - книга опыта (core.book.PositionIndex) для выбора из равных ходов
+        attr:_ponder_shares - доля работы из обдуманного по каждому ходу ИИ за раунд
+        """
+        super().__init__(name, rng)
         self.prefix = 'ai'
         self.make_id()
         self._name = name or f'{settings.AI_OPPONENT_DEFAULT}'
+        self._ponderer = ponderer
+        self._book = book
+        self._ponder_shares: list[float] = []
         
         logger.debug(f"Игрок с именем {self.name} успешно создан (id_{self.get_id()})")
 
+    def _get_rng(self):
+        """
+        Генератор партии, если задан, иначе модуль random
+        """
+        return self._rng or random
+
     def _choose_token_random(self):
+        """
+        Случайный тип токена из набора (одинаковые токены - один вариант).
+        Возвращает порядковый номер токена этого типа в наборе
+        """
         if self.tokens:
-            return random.randint(1, len(self.tokens))
+            token_type = self._get_rng().choice(self.token_types())
+            return self.tokens.index(self.get_token(token_type)) + 1
         return None
     
-    def think(self, board: Board) -> tuple[int, int, int]:
+    def think(self, board: Board, position: 'Position | None' = None) -> tuple[int, int, int]:
+        """
+        Ход ИИ: (индекс токена в наборе, row, col).
+        position - позиция партии (Game.to_position), нужна для перебора
+        """
+        if self._ponderer is not None and position is not None:
+            move = self._think_search(position)
+            if move is not None:
+                return move
+
         token_idx = self._choose_token_random()
 
-        empty_cells = []
-        for row in range(1, board.get_size() + 1):
-            for col in range(1, board.get_size() + 1):
-                if board.get_cell(row, col).is_empty:
-                    empty_cells.append((row, col))
+        empty_cells = board.empty_cells()
 
-        row, col = random.choice(empty_cells)
+        row, col = self._get_rng().choice(empty_cells)
         logger.debug(f'AI {self.name}:{self.get_id()} выбрал {row, col} из пустых клеток: {empty_cells}')
 
         return token_idx - 1, row, col
 
 
-    
\ No newline at end of file
+    
+    def _think_search(self, position: 'Position') -> tuple[int, int, int] | None:
+        """
+        Лучший по перебору ход или None, если перебор не нашел ни одного хода -
+        тогда ИИ ходит случайно
+        """
+        values, share = self._ponderer.evaluate(position)
+        if not values:
+            logger.warning(f'AI {self.name}:{self.get_id()}: перебор не нашел ходов, ход случайный')
+            return None
+        best = max(values.values())
+        candidates = [move for move, value in values.items() if value == best]
+        if self._book is not None and len(candidates) > 1:
+            candidates = self._book_candidates(position, candidates)
+        # Из равных по оценке ходов - случайный, чтобы игра не была однообразной
+        token_type, row, col = self._get_rng().choice(candidates)
+        self._ponder_shares.append(share)
+        logger.info(
+            f'AI {self.name}:{self.get_id()} выбрал {token_type.__name__} в {row, col} '
+            f'(оценка {best}), из обдуманного: {share:.0%}'
+        )
+        return self.tokens.index(self.get_token(token_type)), row, col
+
+    def _book_candidates(self, position: 'Position', candidates: list[tuple]) -> list[tuple]:
+        """
+        Из равных по оценке ходов - лучшие по книге опыта. Если книга
+        ни один ход не знает, кандидаты не меняются
+        """
+        from core.book import rank_moves
+
+        scores = rank_moves(self._book, position, candidates)
+        if not scores:
+            return candidates
+        best = max(scores.values())
+        logger.info(f'AI {self.name}:{self.get_id()}: ходов по книге {len(scores)}, лучшая доля очков {best:.0%}')
+        return [move for move, score in scores.items() if score == best]
+
+    def ponder(self, position: 'Position') -> None:
+        """
+        Начать обдумывание позиции после своего хода, пока ходит соперник
+        """
+        if self._ponderer is not None and settings.AI_PONDER:
+            self._ponderer.start(position)
+
+    def stop_pondering(self) -> None:
+        if self._ponderer is not None:
+            self._ponderer.stop()
+
+    def ponder_report(self) -> str | None:
+        """
+        Сводка за раунд: сколько ходов ИИ и в среднем какая доля работы взята из обдуманного.
+        Сбрасывает накопленные доли
+        """
+        shares, self._ponder_shares = self._ponder_shares, []
+        if not shares:
+            return None
+        answered = sum(1 for share in shares if share == 1.0)
+        return (
+            f'AI {self.name}: ходов {len(shares)}, полностью из обдуманного {answered}, '
+            f'в среднем из обдуманного {sum(shares) / len(shares):.0%}'
+        )
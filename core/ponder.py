@@ -0,0 +1,128 @@
+# core/ponder.py
+import logging
+import threading
+
+from core import settings
+from core.exceptions import SearchCancelledError
+from core.rules import ThunderTruthRules
+from core.search import SearchEngine, Searcher
+from core.snapshots import CELL_FALSE, CELL_TRUE, Position, position_key
+
+logger = logging.getLogger(__name__)
+
+
+class Ponderer:
+    """
+    ОПИСАНИЕ:
+    - Перебор ИИ с обдумыванием. После хода ИИ фоновый поток перебирает ответы
+    ИИ на ходы соперника в порядке их вероятности (сначала ходы с большими очками)
+    и складывает оценки в таблицу раунда. Когда соперник походил, поток
+    останавливается: если его ход был обдуман, оценки берутся готовыми,
+    иначе перебор идет заново, но с уже посчитанными поддеревьями
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - start: начать обдумывание позиции после хода ИИ
+    - stop: остановить обдумывание и дождаться потока
+    - evaluate: оценки ходов позиции и доля работы, взятой из обдуманного
+    """
+    def __init__(
+            self,
+            depth: int = settings.AI_SEARCH_DEPTH,
+            ponder_depth: int = settings.AI_PONDER_DEPTH,
+            table_size: int = settings.PONDER_TABLE_SIZE,
+            rules: ThunderTruthRules | None = None,
+            ) -> None:
+        """
+        attr:_table - оценки узлов из всех переборов раунда (обдумывание и ходы ИИ)
+        attr:_results - готовые оценки корневых позиций {ключ позиции: оценки ходов}
+        attr:_layout - расстановка операндов, под которую скомпилирован _engine
+        """
+        self._searcher = Searcher(depth, rules)
+        self._ponder_searcher = Searcher(max(depth, ponder_depth), rules)
+        self._table_size = table_size
+        self._engine: SearchEngine | None = None
+        self._layout: tuple | None = None
+        self._table: dict = {}
+        self._results: dict[bytes, dict] = {}
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+
+    def _engine_for(self, position: Position) -> SearchEngine:
+        layout = tuple(code if code in (CELL_FALSE, CELL_TRUE) else 0 for code in position.cells)
+        if layout != self._layout:
+            # Новый раунд: другие операнды - прошлые оценки не годятся
+            self._engine = self._searcher.engine_for(position)
+            self._layout = layout
+            self._table.clear()
+            self._results.clear()
+        return self._engine
+
+    def start(self, position: Position) -> None:
+        self.stop()
+        engine = self._engine_for(position)
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(engine, position, self._stop_event), name='ai-ponder', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self, engine: SearchEngine, position: Position, stop: threading.Event) -> None:
+        state = engine.state_from_position(position)
+        if engine.is_terminal(state):
+            return
+        kinds = [player.kind for player in position.players]
+
+        def likelihood(move: tuple[int, int]) -> int:
+            type_idx, idx = move
+            steal = type_idx == engine.steal_idx and engine.steal_victim(state, idx) is not None
+            return engine.get_points(type_idx, idx) + steal
+
+        replies = sorted(engine.moves(state), key=likelihood, reverse=True)
+        pondered = 0
+        for reply in replies:
+            child = engine.apply(state, reply)
+            if engine.is_terminal(child):
+                continue
+            child_position = engine.position_from_state(child, kinds)
+            key = position_key(child_position)
+            if key in self._results:
+                continue
+            try:
+                self._results[key] = self._ponder_searcher.evaluate_moves(
+                    child_position, engine, table=self._table, stop=stop
+                )
+            except SearchCancelledError:
+                break
+            pondered += 1
+        logger.debug(f'Обдумано ответов: {pondered} из {len(replies)}')
+
+    def evaluate(self, position: Position) -> tuple[dict[tuple[type, int, int], int], float]:
+        """
+        Оценки ходов {(тип токена, row, col): оценка} и доля работы из обдумывания:
+        1.0 - позиция была обдумана целиком, иначе доля узлов перебора,
+        закрытых оценками, посчитанными заранее
+        """
+        self.stop()
+        engine = self._engine_for(position)
+        values = self._results.get(position_key(position))
+        if values is not None:
+            return values, 1.0
+
+        searcher = self._searcher
+        searcher.nodes = searcher.known_hits = 0
+        table: dict = {}
+        values = searcher.evaluate_moves(position, engine, table=table, known=self._table)
+        share = searcher.known_hits / searcher.nodes if searcher.nodes else 0.0
+
+        if len(self._table) + len(table) > self._table_size:
+            self._table.clear()
+        self._table.update(table)
+        return values, share
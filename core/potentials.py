@@ -0,0 +1,146 @@
+# core/potentials.py
+import heapq
+import logging
+
+from core.tokens import Token
+
+logger = logging.getLogger(__name__)
+
+
+class MovePotentials:
+    """
+    ОПИСАНИЕ:
+    - Таблица немедленных очков за постановку токена каждого типа в каждую
+    пустую клетку. Операнды после Board.setup не меняются, поэтому значения
+    фиксированы на всю партию: таблица строится один раз и только сужается
+    по мере заполнения клеток
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - get_points: очки за постановку токена данного типа в клетку
+    - best_cells: клетки с максимумом очков для данного типа токена
+    - top_moves: k лучших ходов (тип токена, клетка) по убыванию очков
+    - discard: исключить занятую клетку из таблицы
+    - cells: пустые клетки, которые еще есть в таблице
+    """
+    def __init__(self, table: dict[tuple[int, int], dict[type[Token], int]]) -> None:
+        """
+        attr:_table - очки по клеткам: {(row, col): {тип токена: очки}}
+        attr:_token_types - типы токенов в порядке, задающем порядок при равных очках
+        attr:_heap - общая куча ходов (-очки, номер типа, row, col) с ленивым удалением
+        attr:_heaps_by_type - такие же кучи отдельно для каждого типа токена
+        """
+        self._table = table
+        self._token_types: list[type[Token]] = []
+        for points_by_type in table.values():
+            for token_type in points_by_type:
+                if token_type not in self._token_types:
+                    self._token_types.append(token_type)
+
+        self._heap: list[tuple[int, int, int, int]] = []
+        self._heaps_by_type: dict[type[Token], list[tuple[int, int, int, int]]] = {
+            token_type: [] for token_type in self._token_types
+        }
+        for (row, col), points_by_type in table.items():
+            for token_type, points in points_by_type.items():
+                entry = (-points, self._token_types.index(token_type), row, col)
+                self._heap.append(entry)
+                self._heaps_by_type[token_type].append(entry)
+
+        heapq.heapify(self._heap)
+        for heap in self._heaps_by_type.values():
+            heapq.heapify(heap)
+        self._stale = 0
+
+        logger.debug(f'Построена таблица потенциалов ходов: {len(table)} клеток')
+
+    def __contains__(self, cell: tuple[int, int]) -> bool:
+        return cell in self._table
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def cells(self) -> list[tuple[int, int]]:
+        """
+        Пустые клетки, которые еще есть в таблице
+        """
+        return list(self._table)
+
+    def get_points(self, token_type: type[Token], row: int, col: int) -> int | None:
+        """
+        Очки за постановку токена типа token_type в клетку (row, col).
+        Для занятых клеток возвращает None
+        """
+        points_by_type = self._table.get((row, col))
+        if points_by_type is None:
+            return None
+        return points_by_type.get(token_type)
+
+    def discard(self, row: int, col: int) -> None:
+        """
+        Исключает занятую клетку из таблицы.
+        Записи в кучах удаляются лениво, при обходе
+        """
+        if self._table.pop((row, col), None) is None:
+            return
+        self._stale += len(self._token_types)
+
+        # Когда устаревших записей больше половины, кучи дешевле перестроить
+        if self._stale * 2 > len(self._heap):
+            self._rebuild_heaps()
+
+    def _rebuild_heaps(self) -> None:
+        self._heap = [entry for entry in self._heap if (entry[2], entry[3]) in self._table]
+        heapq.heapify(self._heap)
+        for token_type, heap in self._heaps_by_type.items():
+            heap[:] = [entry for entry in heap if (entry[2], entry[3]) in self._table]
+            heapq.heapify(heap)
+        self._stale = 0
+
+    def _iter_sorted(self, heap: list[tuple[int, int, int, int]]):
+        """
+        Обход кучи по возрастанию без ее изменения: O(k log k) для первых k записей.
+        Записи занятых клеток пропускаются
+        """
+        if not heap:
+            return
+        frontier = [(heap[0], 0)]
+        while frontier:
+            entry, idx = heapq.heappop(frontier)
+            for child in (2 * idx + 1, 2 * idx + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+            if (entry[2], entry[3]) in self._table:
+                yield entry
+
+    def best_cells(self, token_type: type[Token]) -> list[tuple[int, int]]:
+        """
+        Клетки, в которых токен данного типа приносит максимум очков
+        """
+        best = []
+        best_points = None
+        for points, _, row, col in self._iter_sorted(self._heaps_by_type.get(token_type, [])):
+            if best_points is None:
+                best_points = points
+            if points != best_points:
+                break
+            best.append((row, col))
+        return best
+
+    def top_moves(self, k: int, token_types=None) -> list[tuple[type[Token], int, int, int]]:
+        """
+        k лучших ходов в виде (тип токена, row, col, очки).
+        token_types ограничивает выбор типами токенов (например, из набора игрока)
+        """
+        moves = []
+        if k <= 0:
+            return moves
+
+        for points, type_idx, row, col in self._iter_sorted(self._heap):
+            token_type = self._token_types[type_idx]
+            if token_types is not None and token_type not in token_types:
+                continue
+            moves.append((token_type, row, col, -points))
+            if len(moves) == k:
+                break
+        return moves
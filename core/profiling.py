@@ -0,0 +1,362 @@
+# core/profiling.py
+from contextlib import contextmanager, nullcontext
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Callable
+
+from core import settings
+
+logger = logging.getLogger(__name__)
+
+# Пустой контекст для точек замера, когда профилирование выключено
+_NULL_CONTEXT = nullcontext()
+
+
+class StackSampler:
+    """
+    ОПИСАНИЕ:
+    - Выборка стеков: фоновый поток раз в interval снимает стек наблюдаемого
+    потока через sys._current_frames и считает одинаковые стеки. Итог -
+    свернутый формат ("фаза;файл:функция;... число"), понятный flamegraph.pl
+    и speedscope
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - start: начать выборку
+    - stop: остановить выборку
+    - folded: строки свернутых стеков
+    """
+    MAX_DEPTH = 64
+
+    def __init__(self, interval: float, phase: Callable[[], str | None], thread_id: int | None = None) -> None:
+        self.interval = interval
+        self._phase = phase
+        self._thread_id = thread_id or threading.get_ident()
+        self._counts: dict[str, int] = {}
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.samples = 0
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.MAX_DEPTH:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            key = ';'.join([self._phase() or 'none', *reversed(stack)])
+            self._counts[key] = self._counts.get(key, 0) + 1
+            self.samples += 1
+
+    def folded(self) -> list[str]:
+        return [f'{stack} {count}' for stack, count in sorted(self._counts.items(), key=lambda item: -item[1])]
+
+
+class Profiler:
+    """
+    ОПИСАНИЕ:
+    - Профилирование запуска: cProfile отдельно по фазам (вложенная фаза
+    приостанавливает внешнюю), по желанию - снимки tracemalloc вокруг
+    отмеченных мест (Board.setup, Game.impute) и выборка стеков.
+    tracemalloc видит выделения всех потоков, а полные снимки дороги
+    и попадают во время фазы - поэтому они только для первых вызовов места.
+    Отчеты пишутся в каталог out_dir в файлы с префиксом run_id
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - start: начать профилирование
+    - phase: контекст фазы запуска
+    - memory: контекст замера памяти вокруг места
+    - stop: остановить профилирование и записать отчеты
+    """
+    def __init__(
+            self,
+            run_id: str | None = None,
+            out_dir: str = settings.PROFILE_DIR,
+            trace_memory: bool = settings.PROFILE_MEMORY,
+            sample_ms: float = settings.PROFILE_SAMPLE_MS,
+            memory_snapshots: int = settings.PROFILE_MEMORY_SNAPSHOTS,
+            ) -> None:
+        """
+        attr:_profiles - профиль cProfile каждой фазы, копится за все ее входы
+        attr:_stack - стек активных фаз, профилируется только верхняя
+        attr:_memory - по месту: [вызовы, сумма прироста памяти, пик, {строка: прирост}]
+        """
+        self.run_id = run_id or f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}'
+        self.out_dir = out_dir
+        self.trace_memory = trace_memory
+        self.sample_ms = sample_ms
+        self.memory_snapshots = memory_snapshots
+        self._profiles: dict = {}
+        self._wall: dict[str, list] = {}
+        self._stack: list[str] = []
+        self._memory: dict[str, list] = {}
+        self._sampler: StackSampler | None = None
+        self._started = 0.0
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        if self.trace_memory:
+            import tracemalloc
+
+            tracemalloc.start()
+        if self.sample_ms > 0:
+            self._sampler = StackSampler(self.sample_ms / 1000, self.current_phase)
+            self._sampler.start()
+        logger.info(f'Профилирование {self.run_id} начато, отчеты - в {self.out_dir}')
+
+    def current_phase(self) -> str | None:
+        return self._stack[-1] if self._stack else None
+
+    @contextmanager
+    def phase(self, name: str):
+        import cProfile
+
+        profile = self._profiles.get(name)
+        if profile is None:
+            profile = self._profiles[name] = cProfile.Profile()
+        outer = self._profiles[self._stack[-1]] if self._stack else None
+
+        if outer is not None:
+            outer.disable()
+        self._stack.append(name)
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            wall = self._wall.setdefault(name, [0, 0.0])
+            wall[0] += 1
+            wall[1] += time.perf_counter() - started
+            self._stack.pop()
+            if outer is not None:
+                outer.enable()
+
+    @contextmanager
+    def memory(self, site: str):
+        import tracemalloc
+
+        stats = self._memory.setdefault(site, [0, 0, 0, {}])
+        snapshot = stats[0] < self.memory_snapshots
+        before = tracemalloc.take_snapshot() if snapshot else None
+        tracemalloc.reset_peak()
+        current_before = tracemalloc.get_traced_memory()[0]
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            stats[0] += 1
+            stats[1] += current - current_before
+            stats[2] = max(stats[2], peak - current_before)
+            if snapshot:
+                # Собственные структуры tracemalloc в отчет не попадают
+                own = [tracemalloc.Filter(False, tracemalloc.__file__)]
+                after = tracemalloc.take_snapshot().filter_traces(own)
+                lines = stats[3]
+                for stat in after.compare_to(before.filter_traces(own), 'lineno'):
+                    if stat.size_diff:
+                        key = str(stat.traceback)
+                        lines[key] = lines.get(key, 0) + stat.size_diff
+
+    def stop(self) -> list[str]:
+        """
+        Останавливает профилирование, возвращает пути записанных отчетов
+        """
+        while self._stack:
+            self._profiles[self._stack.pop()].disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        os.makedirs(self.out_dir, exist_ok=True)
+        paths = [self._write_phases(), *self._write_profiles()]
+        if self._sampler is not None:
+            paths.append(self._write_report('stacks.txt', self._sampler.folded()))
+        if self.trace_memory:
+            import tracemalloc
+
+            paths.append(self._write_report('memory.txt', self._memory_lines()))
+            tracemalloc.stop()
+        logger.info(f'Профилирование {self.run_id} завершено, отчеты: {paths}')
+        return paths
+
+    def _path(self, suffix: str) -> str:
+        return os.path.join(self.out_dir, f'{self.run_id}.{suffix}')
+
+    def _write_report(self, suffix: str, lines: list[str]) -> str:
+        path = self._path(suffix)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(line + '\n' for line in lines)
+        return path
+
+    def _write_profiles(self) -> list[str]:
+        paths = []
+        for name, profile in self._profiles.items():
+            path = self._path(f'{name}.prof')
+            profile.dump_stats(path)
+            paths.append(path)
+        return paths
+
+    def _write_phases(self) -> str:
+        import io
+        import pstats
+
+        total = time.perf_counter() - self._started
+        lines = [f'Запуск {self.run_id}: {total:.2f} с', '']
+        for name, (count, wall) in sorted(self._wall.items(), key=lambda item: -item[1][1]):
+            lines.append(f'{name}: входов {count}, время {wall:.3f} с ({wall / total:.0%})')
+        for name, profile in self._profiles.items():
+            stream = io.StringIO()
+            pstats.Stats(profile, stream=stream).sort_stats('cumulative').print_stats(settings.PROFILE_TOP)
+            lines += ['', f'=== {name} ===', stream.getvalue().strip()]
+        if self._sampler is not None:
+            lines += ['', f'Выборка стеков: {self._sampler.samples} (каждые {self.sample_ms:g} мс)']
+        return self._write_report('summary.txt', lines)
+
+    def _memory_lines(self) -> list[str]:
+        lines = []
+        for site, (calls, growth, peak, by_line) in self._memory.items():
+            lines.append(
+                f'{site}: вызовов {calls}, прирост {growth / 1024:.1f} КиБ '
+                f'({growth / max(1, calls):.0f} Б на вызов), наибольший пик {peak / 1024:.1f} КиБ'
+            )
+            top = sorted(by_line.items(), key=lambda item: -abs(item[1]))[:settings.PROFILE_TOP]
+            lines += [f'    {size:+d} Б  {line}' for line, size in top]
+        return lines
+
+
+_active: Profiler | None = None
+
+
+def start(run_id: str | None = None, **options) -> Profiler:
+    """
+    Включает профилирование процесса: фазы и места замера памяти начинают писаться
+    """
+    global _active
+    if _active is not None:
+        return _active
+    _active = Profiler(run_id, **options)
+    _active.start()
+    return _active
+
+
+def stop() -> list[str]:
+    global _active
+    if _active is None:
+        return []
+    profiler, _active = _active, None
+    return profiler.stop()
+
+
+def phase(name: str):
+    """
+    Контекст фазы: при выключенном профилировании - пустой контекст
+    """
+    if _active is None:
+        return _NULL_CONTEXT
+    return _active.phase(name)
+
+
+def memory(site: str):
+    """
+    Контекст замера памяти вокруг места: только при PROFILE_MEMORY
+    """
+    if _active is None or not _active.trace_memory:
+        return _NULL_CONTEXT
+    return _active.memory(site)
+
+
+def diff_profiles(before_path: str, after_path: str, top: int = settings.PROFILE_TOP) -> list[str]:
+    """
+    Сравнение двух профилей cProfile: функции с наибольшим изменением
+    собственного времени, затем общее время и число вызовов
+    """
+    import pstats
+
+    before = pstats.Stats(before_path).stats
+    after = pstats.Stats(after_path).stats
+    before_total = sum(stat[2] for stat in before.values())
+    after_total = sum(stat[2] for stat in after.values())
+
+    rows = []
+    for func in before.keys() | after.keys():
+        _, calls_before, own_before, cumulative_before, _ = before.get(func, (0, 0, 0.0, 0.0, {}))
+        _, calls_after, own_after, cumulative_after, _ = after.get(func, (0, 0, 0.0, 0.0, {}))
+        rows.append((
+            own_after - own_before, cumulative_after - cumulative_before,
+            calls_before, calls_after, func,
+        ))
+    rows.sort(key=lambda row: -abs(row[0]))
+
+    lines = [
+        f'Собственное время: {before_total:.3f} с -> {after_total:.3f} с ({after_total - before_total:+.3f} с)',
+        f'{"Δ собств., с":>13} {"Δ общее, с":>11} {"вызовы":>21}  функция',
+    ]
+    for own, cumulative, calls_before, calls_after, (filename, line, name) in rows[:top]:
+        calls = f'{calls_before} -> {calls_after}'
+        lines.append(f'{own:+13.4f} {cumulative:+11.4f} {calls:>21}  {os.path.basename(filename)}:{line}({name})')
+    return lines
+
+
+def main() -> None:
+    """
+    Профилирование без консоли: python -m core.profiling run core.simulate --games 10000 --workers 1
+    Сравнение профилей: python -m core.profiling diff before.prof after.prof
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Профилирование запусков ThunderTruth')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='запустить модуль (python -m) под профилированием')
+    run.add_argument('module')
+    run.add_argument('--run-id', default=None, help='префикс файлов отчетов')
+    run.add_argument('--memory', action='store_true', help='снимки tracemalloc вокруг отмеченных мест')
+    run.add_argument('--sample-ms', type=float, default=settings.PROFILE_SAMPLE_MS, help='0 - без выборки стеков')
+    run.add_argument('args', nargs=argparse.REMAINDER, help='аргументы модуля')
+
+    diff = commands.add_parser('diff', help='сравнить два профиля .prof')
+    diff.add_argument('before')
+    diff.add_argument('after')
+    diff.add_argument('--top', type=int, default=settings.PROFILE_TOP)
+    args = parser.parse_args()
+
+    if args.command == 'diff':
+        print('\n'.join(diff_profiles(args.before, args.after, args.top)))
+        return
+
+    import runpy
+
+    # Этот файл выполняется как __main__, а отмеченные места (Board.setup, Game.impute)
+    # импортируют core.profiling - профилирование включается в этом экземпляре модуля
+    from core import profiling
+
+    # Пулы процессов профилируются только в главном процессе: для полной картины - --workers 1
+    profiling.start(args.run_id, trace_memory=args.memory or settings.PROFILE_MEMORY, sample_ms=args.sample_ms)
+    sys.argv = [args.module, *args.args]
+    # SystemExit модуля (например, код 1 фаззера при расхождении) проходит дальше после отчетов
+    try:
+        with profiling.phase('main'):
+            runpy.run_module(args.module, run_name='__main__', alter_sys=True)
+    finally:
+        print('\n'.join(profiling.stop()))
+
+
+if __name__ == '__main__':
+    main()
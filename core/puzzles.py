@@ -0,0 +1,239 @@
+# core/puzzles.py
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Iterator
+
+from core import settings
+from core.rng import GameRandom
+from core.rules import ThunderTruthRules
+from core.search import SearchEngine, Searcher, SearchState
+from core.simulate import POLICY_GREEDY, POLICY_RANDOM, _choose, random_position
+from core.snapshots import CELL_EMPTY, PLAYER_AI, TOKEN_TYPES, Position, decode_position, position_key
+
+logger = logging.getLogger(__name__)
+
+PUZZLE_VERSION = 1
+THEME_STEAL = 'steal'
+THEME_POINTS = 'points'
+
+
+class Puzzle:
+    """
+    ОПИСАНИЕ:
+    - Задача «найди лучший ход»: позиция (снимок encode_position), единственный
+    лучший ход (имя типа токена, row, col), его точная оценка (разница очков
+    в конце партии), запас над любым другим ходом (не меньше margin) и тема:
+    кража XOR или очки
+    """
+    __slots__ = ('position', 'solution', 'value', 'margin', 'theme')
+
+    def __init__(self, position: bytes, solution: tuple[str, int, int], value: int, margin: int, theme: str) -> None:
+        self.position = position
+        self.solution = solution
+        self.value = value
+        self.margin = margin
+        self.theme = theme
+
+    def __repr__(self) -> str:
+        return f'Puzzle(position={self.position.hex()}, solution={self.solution}, value={self.value})'
+
+    def to_position(self) -> Position:
+        return decode_position(self.position)
+
+    def to_json(self) -> str:
+        return json.dumps({
+            'version': PUZZLE_VERSION,
+            'position': self.position.hex(),
+            'solution': list(self.solution),
+            'value': self.value,
+            'margin': self.margin,
+            'theme': self.theme,
+        })
+
+    @classmethod
+    def from_json(cls, line: str) -> 'Puzzle':
+        data = json.loads(line)
+        if data.get('version') != PUZZLE_VERSION:
+            raise ValueError(f'Неподдерживаемая версия задачи: {data.get("version")}')
+        name, row, col = data['solution']
+        return cls(
+            bytes.fromhex(data['position']), (name, int(row), int(col)),
+            int(data['value']), int(data['margin']), data['theme'],
+        )
+
+
+def iter_puzzles(path: str) -> Iterator[Puzzle]:
+    """
+    Задачи из JSONL-файла по одной
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield Puzzle.from_json(line)
+            except (ValueError, KeyError, TypeError) as error:
+                logger.warning(f'Строка {line_no} файла {path} пропущена: {error}')
+
+
+def _plies_left(state: SearchState) -> int:
+    """
+    Сколько полуходов самое большее осталось до конца партии
+    """
+    return min(state.cells.count(CELL_EMPTY), sum(sum(hand) for hand in state.hands))
+
+
+def find_puzzle(
+        engine: SearchEngine,
+        state: SearchState,
+        searcher: Searcher,
+        margin: int,
+        table: dict,
+        ) -> Puzzle | None:
+    """
+    Задача из позиции, если в ней есть единственный лучший ход с запасом margin.
+    Глубина searcher не меньше оставшихся полуходов, поэтому оценка точная
+    """
+    position = engine.position_from_state(state, [PLAYER_AI] * len(state.points))
+    found = searcher.unique_best_move(position, margin, engine, table)
+    if found is None:
+        return None
+    (type_idx, idx), value, second = found
+    row, col = engine.cell_coords(idx)
+    steal = type_idx == engine.steal_idx and engine.steal_victim(state, idx) is not None
+    return Puzzle(
+        position_key(position), (TOKEN_TYPES[type_idx].__name__, row, col),
+        value, value - second, THEME_STEAL if steal else THEME_POINTS,
+    )
+
+
+def puzzle_chunk(args: tuple) -> tuple[int, list[tuple[bytes, str]]]:
+    """
+    Пачка расстановок в процессе пула: (проверено позиций, [(ключ, задача JSON)]).
+    На каждой расстановке играется партия; позиции, до конца которых осталось
+    не больше depth полуходов, проверяются точным перебором. Повторы внутри
+    пачки отбрасываются по каноническому ключу
+    """
+    layouts, size, players, tokens, depth, margin, seed, chunk_idx = args
+    rng = GameRandom(seed, ('puzzles', chunk_idx))
+    rules = ThunderTruthRules()
+    searcher = Searcher(depth, rules)
+    checked = 0
+    seen = set()
+    found = []
+    for _ in range(layouts):
+        start = random_position(size, players, tokens, rng)
+        engine = SearchEngine(start, rules)
+        state = engine.state_from_position(start)
+        # Таблица перебора общая для позиций одной партии: поддеревья у них общие
+        table = {}
+        while _plies_left(state) >= 2:
+            moves = engine.moves(state)
+            if not moves:
+                state = SearchState(state.cells, state.hands, state.points, (state.current + 1) % len(state.points))
+                continue
+            if _plies_left(state) <= depth:
+                checked += 1
+                puzzle = find_puzzle(engine, state, searcher, margin, table)
+                if puzzle is not None and puzzle.position not in seen:
+                    seen.add(puzzle.position)
+                    found.append((puzzle.position, puzzle.to_json()))
+            # Смесь жадных и случайных ходов - разнообразие позиций
+            policy = POLICY_GREEDY if rng.random() < 0.5 else POLICY_RANDOM
+            state = engine.apply(state, _choose(engine, state, policy, rng))
+    return checked, found
+
+
+def generate(
+        count: int,
+        out_path: str,
+        size: int = settings.PUZZLE_SIZE,
+        players: int = settings.PLAYERS_AMOUNT,
+        tokens: int = settings.INITIAL_TOKENS,
+        depth: int = settings.PUZZLE_DEPTH,
+        margin: int = settings.PUZZLE_MARGIN,
+        seed: int = 0,
+        workers: int | None = None,
+        chunk: int = 50,
+        ) -> tuple[int, int]:
+    """
+    Генерация count различных задач в пуле процессов с записью в JSONL по мере
+    готовности: (записано задач, проверено позиций). Повторы между пачками
+    отбрасываются по каноническому ключу позиции
+    """
+    workers = workers or os.cpu_count() or 1
+    chunk_ids = iter(range(10 ** 12))
+
+    def task() -> tuple:
+        return chunk, size, players, tokens, depth, margin, seed, next(chunk_ids)
+
+    seen = set()
+    written = checked = 0
+    with open(out_path, 'w', encoding='utf-8') as out:
+        def write(result: tuple[int, list[tuple[bytes, str]]]) -> None:
+            nonlocal written, checked
+            chunk_checked, puzzles = result
+            checked += chunk_checked
+            for key, line in puzzles:
+                if written >= count or key in seen:
+                    continue
+                seen.add(key)
+                out.write(line + '\n')
+                written += 1
+            out.flush()
+
+        if workers == 1:
+            while written < count:
+                write(puzzle_chunk(task()))
+            return written, checked
+
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = {executor.submit(puzzle_chunk, task()) for _ in range(workers * 2)}
+            while written < count:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    write(future.result())
+                    if written < count:
+                        pending.add(executor.submit(puzzle_chunk, task()))
+            for future in pending:
+                future.cancel()
+    return written, checked
+
+
+def main() -> None:
+    """
+    Генерация задач для тренировки: python -m core.puzzles --count 10000 --out puzzles.jsonl
+    """
+    parser = argparse.ArgumentParser(description='Генератор задач «найди лучший ход» ThunderTruth')
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--out', default='puzzles.jsonl', help='файл задач (JSONL)')
+    parser.add_argument('--size', type=int, default=settings.PUZZLE_SIZE, help='размер доски')
+    parser.add_argument('--players', type=int, default=settings.PLAYERS_AMOUNT)
+    parser.add_argument('--tokens', type=int, default=settings.INITIAL_TOKENS)
+    parser.add_argument('--depth', type=int, default=settings.PUZZLE_DEPTH, help='полуходов до конца партии')
+    parser.add_argument('--margin', type=int, default=settings.PUZZLE_MARGIN, help='запас лучшего хода')
+    parser.add_argument('--seed', type=int, default=settings.SEED or 0)
+    parser.add_argument('--workers', type=int, default=None, help='число процессов')
+    parser.add_argument('--chunk', type=int, default=50, help='расстановок в пачке процесса')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    written, checked = generate(
+        args.count, args.out, args.size, args.players, args.tokens, args.depth, args.margin,
+        args.seed, args.workers, args.chunk,
+    )
+    elapsed = time.perf_counter() - started
+    print(
+        f'Задач: {written} из {checked} проверенных позиций, время: {elapsed:.1f} с '
+        f'({written / elapsed * 60:.0f} задач/мин)'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# core/records.py
+from dataclasses import dataclass, field
+import json
+import logging
+from typing import Iterator
+
+from core.snapshots import TOKEN_TYPES
+
+logger = logging.getLogger(__name__)
+
+# Метка строки лога с записью партии: так записи писались до отдельного
+# файла RECORDS_PATH, iter_records по-прежнему читает такие логи
+RECORD_LOG_MARKER = 'GAME_RECORD'
+RECORD_VERSION = 1
+
+TOKEN_TYPES_BY_NAME = {token_type.__name__: token_type for token_type in TOKEN_TYPES}
+
+
+@dataclass
+class GameRecord:
+    """
+    ОПИСАНИЕ:
+    - Запись партии: снимок позиции после Game.setup (Game.snapshot)
+    и последовательность ходов (имя типа токена, row, col)
+    """
+    start: bytes
+    moves: list[tuple[str, int, int]] = field(default_factory=list)
+
+    def to_json(self) -> str:
+        return json.dumps({
+            'version': RECORD_VERSION,
+            'start': self.start.hex(),
+            'moves': [list(move) for move in self.moves],
+        })
+
+    @classmethod
+    def from_json(cls, line: str) -> 'GameRecord':
+        data = json.loads(line)
+        if data.get('version') != RECORD_VERSION:
+            raise ValueError(f'Неподдерживаемая версия записи партии: {data.get("version")}')
+        moves = [(name, int(row), int(col)) for name, row, col in data['moves']]
+        return cls(bytes.fromhex(data['start']), moves)
+
+
+def append_record(path: str, record: GameRecord) -> None:
+    """
+    Дописывает запись партии строкой в JSONL-файл. Пишется мимо логирования:
+    запись не зависит от LOGGING_LEVEL и не может быть отброшена очередью логов.
+    Раз в раунд, поэтому файл открывается на каждую запись и сразу закрывается
+    """
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(record.to_json() + '\n')
+
+
+def iter_records(path: str) -> Iterator[GameRecord]:
+    """
+    Записи партий из файла по одной, без загрузки файла в память: JSONL
+    (по записи в строке) или лог игры (строки с меткой RECORD_LOG_MARKER)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if RECORD_LOG_MARKER in line:
+                line = line.split(RECORD_LOG_MARKER, 1)[1].strip()
+            elif not line.startswith('{'):
+                continue
+
+            try:
+                yield GameRecord.from_json(line)
+            except (ValueError, KeyError, TypeError) as error:
+                logger.warning(f'Строка {line_no} файла {path} пропущена: {error}')
+
+
+def read_records(path: str) -> list[GameRecord]:
+    """
+    Читает все записи партий из файла (см. iter_records)
+    """
+    records = list(iter_records(path))
+    logger.info(f'Прочитано записей партий из {path}: {len(records)}')
+    return records
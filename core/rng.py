@@ -0,0 +1,61 @@
+# core/rng.py
+import random
+
+
+class GameRandom(random.Random):
+    """
+    ОПИСАНИЕ:
+    - Генератор случайных чисел партии. Задается корневым сидом и путем
+    разбиения (например, ('worker', 3, 'game', 17)). Сид потока выводится
+    из пары (сид, путь) хешем, поэтому дочерние потоки независимы
+    от порядка их создания и не коррелируют между процессами
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - split: дочерний поток для подзадачи (партия, процесс-воркер, раунд)
+    - root_seed: корневой сид
+    - path: путь разбиения от корневого сида
+    """
+    def __init__(self, seed: int | None = None, path: tuple = ()) -> None:
+        """
+        attr:_root_seed - корневой сид; без сида берется случайный системный (как secrets.randbits)
+        attr:_path - ключи разбиения от корневого потока до текущего
+        """
+        self._root_seed = seed if seed is not None else random.SystemRandom().getrandbits(64)
+        self._path = tuple(path)
+        super().__init__(self._derive(self._root_seed, self._path))
+
+    @staticmethod
+    def _derive(seed: int, path: tuple) -> int:
+        # blake2b из _blake2 - тот же, что hashlib.blake2b, но без импорта
+        # hashlib с OpenSSL при запуске игры. _blake2 - приватный модуль
+        # CPython и может отсутствовать в других сборках, тогда берем hashlib
+        try:
+            from _blake2 import blake2b
+        except ImportError:
+            from hashlib import blake2b
+
+        digest = blake2b(repr((seed, path)).encode('utf-8'), digest_size=16).digest()
+        return int.from_bytes(digest, 'big')
+
+    @property
+    def root_seed(self) -> int:
+        return self._root_seed
+
+    @property
+    def path(self) -> tuple:
+        return self._path
+
+    def split(self, *keys) -> 'GameRandom':
+        """
+        Детерминированный дочерний поток. Не зависит от текущего
+        состояния генератора: split('worker', 2) всегда дает один и тот же поток
+        """
+        return GameRandom(self._root_seed, self._path + keys)
+
+    def __reduce__(self):
+        # Для передачи в процессы пула: сохраняем сид, путь и текущее состояние
+        return self.__class__, (self._root_seed, self._path), self.getstate()
+
+    def __setstate__(self, state) -> None:
+        self.setstate(state)
@@ -8,7 +8,10 @@ from core.elements import Element
 from core.exceptions import CellOutOfBorderError, TokenInvalidError
 from core.operands import FalseOperand, Operand, TrueOperand
 from core.players import Player
-from core.tokens import AND, IMP, OR, XOR, Token
+from core.potentials import MovePotentials
+from core.tokens import Token
+from core.variants import DEFAULT_SPEC, CompiledRules, RulesSpec, compile_rules
+from core.xor_index import XorStealIndex
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +35,20 @@ class Rules(ABC):
     @abstractmethod
     def are_tokens_left(self) -> bool:
         pass
+
+    @abstractmethod
+    def setup(self, board: Board) -> None:
+        """
+        Подготовка правил к раунду после расстановки операндов на доске
+        """
+        pass
+
+    @abstractmethod
+    def on_token_placed(self, board: Board, row: int, col: int) -> None:
+        """
+        Обновление состояния правил после размещения токена
+        """
+        pass
     
 class ThunderTruthRules(Rules):
     """
@@ -46,23 +63,81 @@ class ThunderTruthRules(Rules):
     - count_points: подсчитать очки после хода
     - exclude_points_xor: добавить себе/убавить сопернику очки, если токен - XOR
     - check_winner: определить победителя в конце игры
+    - setup: построить таблицу потенциалов ходов и индекс XOR-перехватов для новой доски
+    - on_token_placed: обновить таблицу потенциалов и индекс XOR-перехватов после хода
+    - potentials: таблица немедленных очков (клетка, тип токена)
+    - xor_index: индекс клеток, где XOR отнимает очко у соперника
+    - generate_moves: различные ходы игрока (тип токена, row, col)
+    - compiled: таблицы варианта правил (core.variants)
     """
-    def __init__(self) -> None:
-        self.directions = ['up', 'left', 'right', 'down']
-        self.directions_to_check = [
-            ('up', 'left'),
-            ('up', 'right'),
-            ('up', 'down'),
-            ('left', 'down'),
-            ('left', 'right'),
-            ('right', 'down'),
-        ]
-        self.valid_token_classes = [AND, OR, XOR, IMP]
+    def __init__(self, spec: RulesSpec = DEFAULT_SPEC) -> None:
+        """
+        spec - вариант правил. Описание компилируется один раз в таблицы смещений
+        и истинности, подсчет очков идет по ним
+        """
+        self._compiled: CompiledRules = compile_rules(spec)
+        self.directions = self._compiled.directions
+        self.directions_to_check = list(self._compiled.pair_names)
+        self.valid_token_classes = self._compiled.token_classes
         self.valid_operand_classes = [TrueOperand, FalseOperand]
+        # Смещения клеток цепочки кражи op1, token1, op2, XOR, op3 относительно XOR
+        self.xor_chains = self._compiled.chains
+        self.xor_chain_expected = self._compiled.chain_expected
+        self._potentials: MovePotentials | None = None
+        self._xor_index: XorStealIndex | None = None
+
+    @property
+    def compiled(self) -> CompiledRules:
+        return self._compiled
+
+    @property
+    def potentials(self) -> MovePotentials | None:
+        return self._potentials
+
+    @property
+    def xor_index(self) -> XorStealIndex | None:
+        return self._xor_index
+
+    def setup(self, board: Board) -> None:
+        """
+        Строит таблицу потенциалов ходов и индекс XOR-перехватов
+        для доски с расставленными операндами
+        """
+        self._potentials = self.build_potentials(board)
+        # Индекс перехватов рассчитан на цепочки из трех операндов
+        if self._compiled.chain_length == 3:
+            self._xor_index = XorStealIndex(board, self.xor_chains, self._compiled.steal_class())
+        else:
+            self._xor_index = None
+
+    def on_token_placed(self, board: Board, row: int, col: int) -> None:
+        if self._potentials is not None:
+            self._potentials.discard(row, col)
+        if self._xor_index is not None:
+            self._xor_index.on_token_placed(board, row, col)
+
+    def build_potentials(self, board: Board) -> MovePotentials:
+        """
+        Считает немедленные очки для каждой пустой клетки и каждого типа токена
+        """
+        samples = [token_class() for token_class in self.valid_token_classes]
+        table = {}
+
+        for row in range(1, board.get_size() + 1):
+            for col in range(1, board.get_size() + 1):
+                if not board.peek(row, col).is_empty:
+                    continue
+                table[(row, col)] = {
+                    type(sample): self._count_points_for(sample, board, row, col)
+                    for sample in samples
+                }
+
+        logger.debug(f'Таблица потенциалов построена для {len(table)} пустых клеток')
+        return MovePotentials(table)
 
     def is_board_full(self, board: Board) -> bool:
         status = all(
-            not board.get_cell(row, col).is_empty
+            not board.peek(row, col).is_empty
             for row in range(1, board.get_size() + 1) 
             for col in range(1, board.get_size() + 1)
             )
@@ -104,18 +179,21 @@ class ThunderTruthRules(Rules):
         return True
     
     def _is_chain_on_board(self, board: Board, chain: list[tuple[int, int]]) -> bool:
-        if not all(1 <= _row <= board.get_size() and 1 <= _col <= board.get_size() for _row, _col in chain):
-            logger.debug(f'Не все клетки в цепочке {chain} внутри игрового поля. Пропуск...')
+        size = board.get_size()
+        if not all(1 <= _row <= size and 1 <= _col <= size for _row, _col in chain):
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f'Не все клетки в цепочке {chain} внутри игрового поля. Пропуск...')
             return False
         return True
     
     def _has_chain_valid_types(self, elements, types):
         if not all(isinstance(element, instance) for element, instance in zip(elements, types)):
-            logger.debug(
-                f'Не все клетки в цепочке верных типов: '
-                f'Действительный/Ождиаемый типы элементов: '
-                f'{[(type(element), instance) for element, instance in zip(elements, types)]}'
-                )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    f'Не все клетки в цепочке верных типов: '
+                    f'Действительный/Ождиаемый типы элементов: '
+                    f'{[(type(element), instance) for element, instance in zip(elements, types)]}'
+                    )
             return False
         return True
         
@@ -125,45 +203,46 @@ class ThunderTruthRules(Rules):
         В случае успеха возвращет двух игроков. Первый - соперник, второй - текущий игрок с XOR
         """
         chains = [
-            [(row, col-3), (row, col-2), (row, col-1), (row, col), (row, col+1)],  # по горизонтали
-            [(row-3, col), (row-2, col), (row-1, col), (row, col), (row+1, col)],  # по вертикали
+            [(row + dr, col + dc) for dr, dc in offsets]
+            for offsets in self.xor_chains
         ]
-        expected = [Operand, Token, Operand, XOR, Operand]
+        expected = self.xor_chain_expected
+        truth_tables = self._compiled.truth_tables
 
         for chain in chains:
             # Проверяем, что все координаты в границах
             if not self._is_chain_on_board(board, chain):
                 continue
             
-            elements = [board.get_cell_buffered(_row, _col).value for _row, _col in chain]
+            elements = [board.peek_value(_row, _col) for _row, _col in chain]
             
             # Все элементы составляют цепочку op1, token1, op2, token2, op3
             if not self._has_chain_valid_types(elements, expected):
                 continue
 
-            op1, token1, op2, token2, op3 = elements
+            operands, tokens = elements[0::2], elements[1::2]
+            # Жертва - последний владелец токена перед оператором кражи
+            token1, token2 = tokens[-2], tokens[-1]
 
-            # Токены принадлежат: один - сопернику, второй - делающему ход
-            if self.is_token_owner(token2.get_last_owner(), token1):
+            # Токены принадлежат: один - сопернику, второй - делающему ход.
+            # Проверка is_token_owner без логов: это внутренний цикл правил
+            if token1.get_owner() == token2.get_last_owner():
                 continue
-            
 
-            op1_op2 = TrueOperand() if token1.evaluate(op1, op2) else FalseOperand()
-            result = token2.evaluate(op1_op2, op3)
+            # Значение цепочки сворачивается по скомпилированным таблицам
+            # истинности, как в _count_points_for: без проверок Token.evaluate
+            accumulated = operands[0].get_value()
+            for token, operand in zip(tokens[:-1], operands[1:-1]):
+                accumulated = bool(truth_tables[type(token)][(accumulated, operand.get_value())])
+            result = truth_tables[type(token2)][(accumulated, operands[-1].get_value())]
 
+            if logger.isEnabledFor(logging.DEBUG):
+                chain_text = ' '.join(element.to_string() for element in elements)
+                logger.debug(f"Цепочка кражи: {chain_text} -> {'валидна' if result else 'не валидна'}")
             if result:
-                logger.debug(
-                f"Цепочка XOR: {op1.to_string()} {token1.to_string()} {op2.to_string()} "
-                f"{token2.to_string()} {op3.to_string()} -> {result}"
-                )
-                logger.debug(f'exclude_points_xor вернул игроков: {token1.get_last_owner(), token2.get_owner()}')
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f'exclude_points_xor вернул игроков: {token1.get_last_owner(), token2.get_owner()}')
                 return token1.get_last_owner(), token2.get_owner()
-            
-            else:
-                logger.debug(
-                    f"Цепочка XOR: {op1.to_string()} {token1.to_string()} {op2.to_string()} "
-                    f"{token2.to_string()} {op3.to_string()} не валидна"
-                    )
 
         return None
         
@@ -171,37 +250,60 @@ class ThunderTruthRules(Rules):
         """
         Cчитает очки из клетки, в которую был положен токен
         """
-        element = board.get_cell(row, col).value
+        element = board.peek_value(row, col)
         self._validate_count_points_types(element, row, col)
 
         # На данном этапе обработки токен не может не принадлежать игроку,
         # потому что это проверка осуществляется ранее окрестратром Game
         # через другой метод Rules
 
-        neighbors = board.get_neighbors(row, col)
-        neighbors = dict(zip(self.directions, neighbors))
+        return self._count_points_for(element, board, row, col)
+
+    def _count_points_for(self, element: Token, board: Board, row: int, col: int) -> int:
+        """
+        Очки для токена element в клетке (row, col) без учета содержимого самой клетки
+        """
+        compiled = self._compiled
+        neighbors = board.neighbor_values(row, col, compiled.neighbor_offsets)
+        table = compiled.truth_tables[type(element)]
         points = 0
 
-        for direction1, direction2 in self.directions_to_check:
-            neighbor1 = neighbors[direction1].value
-            neighbor2 = neighbors[direction2].value
+        for first, second in compiled.scored_pairs:
+            neighbor1 = neighbors[first]
+            neighbor2 = neighbors[second]
             if isinstance(neighbor1, Operand) and isinstance(neighbor2, Operand):
-                result = element.evaluate(neighbor1, neighbor2)
-                logger.debug(
-                    f'Сосед '
-                    f'{direction1} {neighbor1.to_string()} '
-                    f'{element.to_string()} '
-                    f'{neighbor2.to_string()} {direction2} '
-                    f'-> {result}'
-                    )
+                result = table[(neighbor1.get_value(), neighbor2.get_value())]
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        f'Сосед '
+                        f'{compiled.directions[first]} {neighbor1.to_string()} '
+                        f'{element.to_string()} '
+                        f'{neighbor2.to_string()} {compiled.directions[second]} '
+                        f'-> {result}'
+                        )
                 points += 1 if result else 0
 
         return points
     
+    def generate_moves(self, board: Board, player: Player):
+        """
+        Различные ходы игрока: каждая пара (тип токена, клетка) один раз,
+        сколько бы одинаковых токенов ни было в наборе
+        """
+        token_types = player.token_types()
+        if self._potentials is not None:
+            cells = self._potentials.cells()
+        else:
+            cells = board.empty_cells()
+
+        for row, col in cells:
+            for token_type in token_types:
+                yield token_type, row, col
+
     def are_tokens_left(self, players_list: list[Player]) -> bool:
         tokens = 0
         for player in players_list:
-            tokens += len(player.tokens)
+            tokens += player.count_tokens()
 
         if not tokens:
             logger.debug(f'Проверка правила [Не осталось токенов]: Кончились.')
@@ -0,0 +1,459 @@
+# core/search.py
+import logging
+import random
+import threading
+from typing import Callable
+
+from core.exceptions import SearchCancelledError
+from core.rules import ThunderTruthRules
+from core.snapshots import (
+    CELL_EMPTY, CELL_FALSE, CELL_TOKEN, CELL_TRUE, TOKEN_TYPES,
+    PlayerState, Position, split_token_code, token_code,
+)
+from core.tokens import XOR
+
+logger = logging.getLogger(__name__)
+
+XOR_IDX = TOKEN_TYPES.index(XOR)
+
+
+class SearchState:
+    """
+    Легкое состояние партии для перебора: коды клеток построчно,
+    число токенов каждого типа у игроков, очки и индекс текущего игрока
+    """
+    __slots__ = ('cells', 'hands', 'points', 'current')
+
+    def __init__(
+            self,
+            cells: tuple[int, ...],
+            hands: tuple[tuple[int, ...], ...],
+            points: tuple[int, ...],
+            current: int,
+            ) -> None:
+        self.cells = cells
+        self.hands = hands
+        self.points = points
+        self.current = current
+
+    def key(self) -> tuple:
+        return self.cells, self.hands, self.points, self.current
+
+
+class SearchEngine:
+    """
+    ОПИСАНИЕ:
+    - Правила ThunderTruthRules, скомпилированные под конкретную расстановку
+    операндов. Операнды не меняются за партию, поэтому очки за ход и XOR-цепочки
+    каждой клетки считаются один раз, а ход в переборе - это сложение и
+    несколько проверок по таблицам
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - state_from_position: состояние перебора из позиции снимка
+    - position_from_state: позиция снимка из состояния перебора
+    - moves: различные ходы (индекс типа токена, индекс клетки) текущего игрока
+    - apply: состояние после хода - как Game.move + Game.impute + Game.end_turn
+    - is_terminal: конец раунда
+    - greedy_move: ход с наибольшими немедленными очками (с долей случайных ходов)
+    - playout: доигрывание раунда ходами выбранной политики
+    - cell_coords: координаты (row, col) клетки по индексу
+    """
+    def __init__(self, position: Position, rules: ThunderTruthRules | None = None) -> None:
+        """
+        attr:_points - очки за постановку токена каждого типа в каждую клетку
+        attr:_chains - XOR-цепочки клетки: (значение op1, индекс клетки token1, значение op2, значение op3),
+        для цепочек длиннее трех операндов - (значения операндов, индексы клеток токенов)
+        attr:steal_idx - индекс типа токена, замыкающего цепочку кражи
+        """
+        rules = rules or ThunderTruthRules()
+        compiled = rules.compiled
+        self.size = position.size
+        self.steal_idx = TOKEN_TYPES.index(compiled.steal_class)
+        self._tables = [token_type().get_truth_table() for token_type in TOKEN_TYPES]
+        self._xor_table = self._tables[self.steal_idx]
+        self._long_chains = compiled.chain_length > 3
+        self._points: list[tuple[int, ...]] = []
+        self._chains: list[list[tuple]] = []
+        self._compile(position.cells, rules)
+
+    def _operand_at(self, cells: list[int], row: int, col: int) -> bool | None:
+        if not 1 <= row <= self.size or not 1 <= col <= self.size:
+            return None
+        code = cells[self.cell_index(row, col)]
+        if code == CELL_TRUE:
+            return True
+        if code == CELL_FALSE:
+            return False
+        return None
+
+    def _compile(self, cells: list[int], rules: ThunderTruthRules) -> None:
+        compiled = rules.compiled
+
+        for idx in range(self.size * self.size):
+            row, col = self.cell_coords(idx)
+
+            neighbors = [self._operand_at(cells, row + dr, col + dc) for dr, dc in compiled.neighbor_offsets]
+            pairs = [
+                (neighbors[first], neighbors[second])
+                for first, second in compiled.scored_pairs
+                if neighbors[first] is not None and neighbors[second] is not None
+            ]
+            self._points.append(tuple(
+                sum(1 for pair in pairs if table[pair]) for table in self._tables
+            ))
+
+            chains = []
+            for chain in compiled.chains:
+                coords = [(row + dr, col + dc) for dr, dc in chain]
+                if not all(1 <= _row <= self.size and 1 <= _col <= self.size for _row, _col in coords):
+                    continue
+                operands = tuple(self._operand_at(cells, *coord) for coord in coords[0::2])
+                token_coords = coords[1:-2:2]
+                # Клетка токена с операндом никогда не станет токеном
+                if None in operands or any(self._operand_at(cells, *coord) is not None for coord in token_coords):
+                    continue
+                token_idxs = tuple(self.cell_index(*coord) for coord in token_coords)
+                if self._long_chains:
+                    chains.append((operands, token_idxs))
+                else:
+                    chains.append((operands[0], token_idxs[0], operands[1], operands[2]))
+            self._chains.append(chains)
+
+    def cell_index(self, row: int, col: int) -> int:
+        return (row - 1) * self.size + (col - 1)
+
+    def cell_coords(self, idx: int) -> tuple[int, int]:
+        row, col = divmod(idx, self.size)
+        return row + 1, col + 1
+
+    def get_points(self, type_idx: int, idx: int) -> int:
+        """
+        Немедленные очки за токен типа type_idx в клетке idx
+        """
+        return self._points[idx][type_idx]
+
+    def state_from_position(self, position: Position) -> SearchState:
+        hands = tuple(
+            tuple(player.hand.count(type_idx) for type_idx in range(len(TOKEN_TYPES)))
+            for player in position.players
+        )
+        points = tuple(player.points for player in position.players)
+        return SearchState(tuple(position.cells), hands, points, position.current)
+
+    def position_from_state(self, state: SearchState, kinds: list[int]) -> Position:
+        players = [
+            PlayerState(kind, points, [t for t, count in enumerate(hand) for _ in range(count)])
+            for kind, hand, points in zip(kinds, state.hands, state.points)
+        ]
+        return Position(self.size, state.current, list(state.cells), players)
+
+    def moves(self, state: SearchState) -> list[tuple[int, int]]:
+        """
+        Различные ходы текущего игрока: каждый (тип токена, клетка) один раз
+        """
+        hand = state.hands[state.current]
+        types = [type_idx for type_idx, count in enumerate(hand) if count]
+        return [
+            (type_idx, idx)
+            for idx, code in enumerate(state.cells) if code == CELL_EMPTY
+            for type_idx in types
+        ]
+
+    def steal_victim(self, state: SearchState, idx: int) -> int | None:
+        """
+        Индекс игрока, у которого XOR в клетке idx отнимет очко.
+        Как и exclude_points_xor, засчитывается первая истинная цепочка.
+        Владелец token1 не сравнивается с ходящим: у токенов на доске владельца
+        уже нет, и проверка is_token_owner в exclude_points_xor их не отсеивает
+        """
+        cells = state.cells
+        if self._long_chains:
+            return self._long_steal_victim(cells, idx)
+        for op1, token_idx, op2, op3 in self._chains[idx]:
+            code = cells[token_idx]
+            if code < CELL_TOKEN:
+                continue
+            type_idx, owner_idx = split_token_code(code)
+            op1_op2 = bool(self._tables[type_idx][(op1, op2)])
+            if self._xor_table[(op1_op2, op3)]:
+                return owner_idx
+        return None
+
+    def _long_steal_victim(self, cells: tuple[int, ...], idx: int) -> int | None:
+        """
+        steal_victim для цепочек длиннее трех операндов: значение сворачивается
+        слева направо, жертва - владелец токена перед оператором кражи
+        """
+        for operands, token_idxs in self._chains[idx]:
+            codes = [cells[token_idx] for token_idx in token_idxs]
+            if min(codes) < CELL_TOKEN:
+                continue
+            value = operands[0]
+            for code, operand in zip(codes, operands[1:-1]):
+                value = bool(self._tables[split_token_code(code)[0]][(value, operand)])
+            if self._xor_table[(value, operands[-1])]:
+                return split_token_code(codes[-1])[1]
+        return None
+
+    def apply(self, state: SearchState, move: tuple[int, int]) -> SearchState:
+        type_idx, idx = move
+        player = state.current
+
+        cells = list(state.cells)
+        cells[idx] = token_code(type_idx, player)
+
+        points = list(state.points)
+        points[player] += self._points[idx][type_idx]
+
+        if type_idx == self.steal_idx:
+            victim = self.steal_victim(state, idx)
+            if victim is not None:
+                # Порядок и ограничение снизу - как в Game.impute и Player.add_points
+                points[victim] = max(0, points[victim] - 1)
+                points[player] += 1
+
+        hands = list(state.hands)
+        hand = list(hands[player])
+        hand[type_idx] -= 1
+        hands[player] = tuple(hand)
+
+        return SearchState(tuple(cells), tuple(hands), tuple(points), (player + 1) % len(points))
+
+    def is_terminal(self, state: SearchState) -> bool:
+        return CELL_EMPTY not in state.cells or not any(any(hand) for hand in state.hands)
+
+    def greedy_move(self, state: SearchState, rng: random.Random, noise: float = 0.0) -> tuple[int, int]:
+        """
+        Ход с наибольшими немедленными очками (кража считается за два очка),
+        среди равных - случайный. С вероятностью noise - просто случайный ход
+        """
+        moves = self.moves(state)
+        if noise and rng.random() < noise:
+            return rng.choice(moves)
+
+        gains = [
+            self.get_points(type_idx, idx)
+            + 2 * (type_idx == self.steal_idx and self.steal_victim(state, idx) is not None)
+            for type_idx, idx in moves
+        ]
+        best = max(gains)
+        return rng.choice([move for move, gain in zip(moves, gains) if gain == best])
+
+    def playout(
+            self,
+            state: SearchState,
+            choose: Callable[[SearchState], tuple[int, int]],
+            on_move: Callable[[SearchState, tuple[int, int]], None] | None = None,
+            ) -> SearchState:
+        """
+        Доигрывание раунда: ходы выбирает choose, on_move видит состояние до хода и ход.
+        Игрок без ходов пропускает ход; раунд кончается, если пропустили все подряд
+        """
+        passes = 0
+        while not self.is_terminal(state) and passes < len(state.points):
+            if not self.moves(state):
+                state = SearchState(state.cells, state.hands, state.points, (state.current + 1) % len(state.points))
+                passes += 1
+                continue
+            passes = 0
+            move = choose(state)
+            if on_move is not None:
+                on_move(state, move)
+            state = self.apply(state, move)
+        return state
+
+    def evaluate(self, state: SearchState, player: int) -> int:
+        """
+        Оценка позиции для игрока: его очки минус лучший результат соперников
+        """
+        points = state.points
+        if len(points) == 2:
+            return points[player] - points[1 - player]
+        others = [value for idx, value in enumerate(points) if idx != player]
+        return points[player] - max(others, default=0)
+
+
+class Searcher:
+    """
+    ОПИСАНИЕ:
+    - Перебор с альфа-бета отсечением на фиксированную глубину.
+    Оценка - разница очков с точки зрения игрока, делающего ход
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - evaluate_moves: оценка каждого различного хода в позиции
+    - evaluate_position: оценка позиции для игрока, который ходит
+    - best_move: лучший ход и его оценка
+    - unique_best_move: лучший ход, если он лучше всех остальных с запасом
+    :::Счетчики:::
+    - nodes: посещенные узлы перебора
+    - known_hits: узлы, закрытые готовыми оценками из таблицы known
+    """
+    # Как часто перебор проверяет флаг отмены (маска по числу узлов)
+    STOP_CHECK_MASK = 0xFF
+
+    def __init__(self, depth: int = 2, rules: ThunderTruthRules | None = None) -> None:
+        self.depth = max(1, depth)
+        self._rules = rules or ThunderTruthRules()
+        self.nodes = 0
+        self.known_hits = 0
+        self._known: dict | None = None
+        self._stop: threading.Event | None = None
+
+    def engine_for(self, position: Position) -> SearchEngine:
+        return SearchEngine(position, self._rules)
+
+    def _negamax(
+            self,
+            engine: SearchEngine,
+            state: SearchState,
+            depth: int,
+            alpha: int,
+            beta: int,
+            table: dict,
+            ) -> int:
+        self.nodes += 1
+        if self._stop is not None and not self.nodes & self.STOP_CHECK_MASK and self._stop.is_set():
+            raise SearchCancelledError('Перебор отменен')
+
+        player = state.current
+        if depth == 0 or engine.is_terminal(state):
+            return engine.evaluate(state, player)
+
+        key = (state.key(), depth)
+        cached = table.get(key)
+        if cached is None and self._known is not None:
+            cached = self._known.get(key)
+            if cached is not None:
+                self.known_hits += 1
+        if cached is not None:
+            return cached
+
+        moves = engine.moves(state)
+        if not moves:
+            # Нечем ходить - ход переходит сопернику
+            passed = SearchState(state.cells, state.hands, state.points, (player + 1) % len(state.points))
+            return -self._negamax(engine, passed, depth, -beta, -alpha, table)
+
+        # Сначала ходы с большими немедленными очками - так отсечения срабатывают раньше
+        moves.sort(key=lambda move: -engine.get_points(*move))
+        alpha_original = alpha
+        best = None
+        for move in moves:
+            value = -self._negamax(engine, engine.apply(state, move), depth - 1, -beta, -alpha, table)
+            if best is None or value > best:
+                best = value
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                return best
+
+        # Значение не выше исходного alpha - лишь верхняя граница, в таблицу не кладем
+        if best > alpha_original:
+            table[key] = best
+        return best
+
+    def evaluate_moves(
+            self,
+            position: Position,
+            engine: SearchEngine | None = None,
+            table: dict | None = None,
+            known: dict | None = None,
+            stop: threading.Event | None = None,
+            moves: list[tuple[int, int]] | None = None,
+            values: dict | None = None,
+            ) -> dict[tuple[type, int, int], int]:
+        """
+        Точная (в пределах глубины) оценка каждого хода: {(тип токена, row, col): оценка}
+        table - таблица перестановок, в которую пишет перебор (по умолчанию новая)
+        known - таблица прошлых переборов той же партии, только для чтения
+        stop - флаг отмены: при его установке перебор бросает SearchCancelledError,
+        а уже записанные в table точные оценки остаются верными
+        moves - ходы движка в порядке оценки (по умолчанию все ходы engine.moves)
+        values - словарь, в который оценки пишутся по мере готовности (читается из другого потока)
+        """
+        engine = engine or self.engine_for(position)
+        state = engine.state_from_position(position)
+        table = {} if table is None else table
+        values = {} if values is None else values
+        infinity = 10 ** 9
+
+        self._known, self._stop = known, stop
+        try:
+            for type_idx, idx in engine.moves(state) if moves is None else moves:
+                child = engine.apply(state, (type_idx, idx))
+                value = -self._negamax(engine, child, self.depth - 1, -infinity, infinity, table)
+                values[(TOKEN_TYPES[type_idx], *engine.cell_coords(idx))] = value
+        finally:
+            self._known, self._stop = None, None
+
+        logger.debug(f'Оценено ходов: {len(values)}, узлов перебора: {self.nodes}')
+        return values
+
+    def evaluate_position(
+            self,
+            position: Position,
+            engine: SearchEngine | None = None,
+            table: dict | None = None,
+            ) -> int:
+        """
+        Оценка позиции для текущего игрока. Дешевле evaluate_moves:
+        отсечения работают и на первом уровне
+        """
+        engine = engine or self.engine_for(position)
+        state = engine.state_from_position(position)
+        infinity = 10 ** 9
+        return self._negamax(engine, state, self.depth, -infinity, infinity, {} if table is None else table)
+
+    def unique_best_move(
+            self,
+            position: Position,
+            margin: int,
+            engine: SearchEngine | None = None,
+            table: dict | None = None,
+            ) -> tuple[tuple[int, int], int, int] | None:
+        """
+        Лучший ход движка (тип, клетка), если любой другой ход хуже него не меньше чем
+        на margin: (ход, оценка, верхняя граница оценки остальных ходов). Иначе None.
+        Точная оценка нужна только лучшему ходу: остальные проверяются перебором
+        с нулевым окном "оценка выше best - margin?", поэтому отказ находится быстро
+        """
+        engine = engine or self.engine_for(position)
+        state = engine.state_from_position(position)
+        table = {} if table is None else table
+        infinity = 10 ** 9
+
+        player = state.current
+        moves = engine.moves(state)
+        if len(moves) < 2:
+            return None
+        children = {move: engine.apply(state, move) for move in moves}
+        # Сначала ходы, лучшие по немедленной оценке: лучший ход обычно первый
+        moves.sort(key=lambda move: -engine.evaluate(children[move], player))
+
+        best_move, best, second = None, None, -infinity
+        for move in moves:
+            child = children[move]
+            if best is None:
+                best_move, best = move, -self._negamax(engine, child, self.depth - 1, -infinity, infinity, table)
+                continue
+            threshold = best - margin
+            value = -self._negamax(engine, child, self.depth - 1, -threshold - 1, -threshold, table)
+            if value <= threshold:
+                second = max(second, value)
+                continue
+            value = -self._negamax(engine, child, self.depth - 1, -infinity, infinity, table)
+            if value < best + margin:
+                return None
+            best_move, best, second = move, value, best
+        return best_move, best, second
+
+    def best_move(self, position: Position) -> tuple[tuple[type, int, int], int] | None:
+        """
+        Лучший ход (тип токена, row, col) и его оценка
+        """
+        values = self.evaluate_moves(position)
+        if not values:
+            return None
+        move = max(values, key=values.get)
+        return move, values[move]
@@ -2,15 +2,18 @@
 import logging
 import os
 
-from dotenv import load_dotenv
-
 from core import utils
 
-load_dotenv(utils.get_path_compiling('.env'))
+# Разбор .env без python-dotenv: его импорт занимал заметную часть времени запуска
+utils.load_env(utils.get_path_compiling('.env'))
 
 # Разработка
+# Бюджет времени запуска до первого запроса ввода (python -m core.bench_startup), мс
+STARTUP_BUDGET_MS = float(os.getenv('STARTUP_BUDGET_MS', 100))
 DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
 PRODUCTION = os.getenv('PRODUCTION', 'False').lower() == 'true'
+# Проверки во внутреннем слое доступа к доске (Board.peek, put_token и т.д.) - для тестов и отладки
+ENGINE_ASSERTS = os.getenv('ENGINE_ASSERTS', 'False').lower() == 'true'
 
 
 
@@ -23,6 +26,13 @@ else:
 LOGGING_FORMAT = '%(levelname)s - %(asctime)s - %(name)s - %(message)s'
 LOGGING_DATEFMT = '%Y-%m-%d %H:%M:%S'
 
+# Очередь логов в боевом режиме: размер, политика при переполнении
+# (drop - отбросить запись, block - ждать место не дольше таймаута) и размер пачки записи
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+LOG_QUEUE_POLICY = os.getenv('LOG_QUEUE_POLICY', 'drop').lower()
+LOG_QUEUE_BLOCK_TIMEOUT = float(os.getenv('LOG_QUEUE_BLOCK_TIMEOUT', 0.05))
+LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', 256))
+
 
 
 # Игровые настройки
@@ -33,6 +43,120 @@ MULTIPLAYER = False
 BOARD_SIZE = int(os.getenv('BOARD_SIZE', 3))
 INITIAL_TOKENS = int(os.getenv('INITIAL_TOKENS', 4))
 
+# Отображение больших досок: окно вокруг последнего хода и мини-карта по областям
+VIEWPORT_SIZE = int(os.getenv('VIEWPORT_SIZE', 15))
+MINIMAP_REGION = int(os.getenv('MINIMAP_REGION', 8))
+
 PLAYERS_AMOUNT = int(os.getenv('PLAYERS_AMOUNT', 2))
 
-AI_OPPONENT_DEFAULT = os.getenv('AI_OPPONENT_DEFAULT', 'Зевс')
\ No newline at end of file
+AI_OPPONENT_DEFAULT = os.getenv('AI_OPPONENT_DEFAULT', 'Зевс')
+
+# Сила ИИ: глубина перебора (0 - случайные ходы). Обдумывание - перебор
+# ответов на вероятные ходы соперника, пока тот думает над своим ходом
+AI_SEARCH_DEPTH = int(os.getenv('AI_SEARCH_DEPTH', 2))
+AI_PONDER = os.getenv('AI_PONDER', 'True').lower() == 'true'
+AI_PONDER_DEPTH = int(os.getenv('AI_PONDER_DEPTH', AI_SEARCH_DEPTH + 1))
+# Предел размера таблицы оценок обдумывания за раунд
+PONDER_TABLE_SIZE = int(os.getenv('PONDER_TABLE_SIZE', 500000))
+
+# Книга опыта ИИ: индекс позиций по сыгранным партиям (python -m core.book build).
+# Из равных по оценке перебора ходов ИИ выбирает лучший по книге, если позиция
+# после хода встречалась не реже AI_BOOK_MIN_GAMES раз. Пусто - без книги
+AI_BOOK = os.getenv('AI_BOOK', '')
+AI_BOOK_MIN_GAMES = int(os.getenv('AI_BOOK_MIN_GAMES', 20))
+# Вхождений в одном прогоне внешней сортировки при построении индекса
+BOOK_RUN_SIZE = int(os.getenv('BOOK_RUN_SIZE', 1000000))
+
+# Подсказки человеку ('?' при выборе токена): оценки ходов считаются в фоне
+# с начала хода, запрос ждет не дольше HINT_BUDGET_MS и показывает готовое
+HINTS = os.getenv('HINTS', 'True').lower() == 'true'
+HINT_DEPTH = int(os.getenv('HINT_DEPTH', 2))
+HINT_BUDGET_MS = float(os.getenv('HINT_BUDGET_MS', 100))
+HINT_TOP = int(os.getenv('HINT_TOP', 3))
+
+# Сбалансированные расстановки операндов: принимаются только те, где среднее
+# преимущество первого игрока (по LAYOUT_SAMPLES оценкам со случайными наборами)
+# не больше LAYOUT_TOLERANCE очков и очки приносит не меньше LAYOUT_MIN_SCORING
+# пар (свободная клетка, тип токена). Запас из LAYOUT_POOL_SIZE расстановок пополняется в фоне
+BALANCED_LAYOUTS = os.getenv('BALANCED_LAYOUTS', 'True').lower() == 'true'
+LAYOUT_TOLERANCE = float(os.getenv('LAYOUT_TOLERANCE', 1.0))
+LAYOUT_MIN_SCORING = float(os.getenv('LAYOUT_MIN_SCORING', 0.5))
+LAYOUT_SAMPLES = int(os.getenv('LAYOUT_SAMPLES', 64))
+LAYOUT_POOL_SIZE = int(os.getenv('LAYOUT_POOL_SIZE', 8))
+LAYOUT_WAIT_MS = float(os.getenv('LAYOUT_WAIT_MS', 500))
+
+# Профилирование (python -m core.main --profile или PROFILE=True): cProfile по фазам,
+# выборка стеков раз в PROFILE_SAMPLE_MS (0 - без выборки), при PROFILE_MEMORY -
+# снимки tracemalloc вокруг Board.setup и Game.impute (полные - для первых
+# PROFILE_MEMORY_SNAPSHOTS вызовов места). Отчеты - в PROFILE_DIR
+PROFILE = os.getenv('PROFILE', 'False').lower() == 'true'
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_MEMORY = os.getenv('PROFILE_MEMORY', 'False').lower() == 'true'
+PROFILE_MEMORY_SNAPSHOTS = int(os.getenv('PROFILE_MEMORY_SNAPSHOTS', 5))
+PROFILE_SAMPLE_MS = float(os.getenv('PROFILE_SAMPLE_MS', 10))
+PROFILE_TOP = int(os.getenv('PROFILE_TOP', 25))
+
+# Матч настроек ИИ (python -m core.match): SPRT с гипотезами "новая настройка
+# сильнее на SPRT_ELO0 / SPRT_ELO1 Эло" и ошибками первого и второго рода.
+# Пачки по MATCH_CHUNK пар, не больше MATCH_MAX_PAIRS пар на матч
+SPRT_ELO0 = float(os.getenv('SPRT_ELO0', 0))
+SPRT_ELO1 = float(os.getenv('SPRT_ELO1', 20))
+SPRT_ALPHA = float(os.getenv('SPRT_ALPHA', 0.05))
+SPRT_BETA = float(os.getenv('SPRT_BETA', 0.05))
+MATCH_CHUNK = int(os.getenv('MATCH_CHUNK', 10))
+MATCH_MAX_PAIRS = int(os.getenv('MATCH_MAX_PAIRS', 10000))
+
+# Трансляция партии зрителям (SPECTATE=True или python -m core.spectate watch):
+# ход рассылается всем зрителям одним кадром-разницей. Буфер отправки зрителя
+# не больше SPECTATE_BUFFER_BYTES: отставший пропускает ходы и затем получает
+# опорный снимок, который обновляется раз в SPECTATE_KEYFRAME_EVERY ходов
+SPECTATE = os.getenv('SPECTATE', 'False').lower() == 'true'
+SPECTATE_HOST = os.getenv('SPECTATE_HOST', '127.0.0.1')
+SPECTATE_PORT = int(os.getenv('SPECTATE_PORT', 7342))
+SPECTATE_BUFFER_BYTES = int(os.getenv('SPECTATE_BUFFER_BYTES', 16384))
+SPECTATE_KEYFRAME_EVERY = int(os.getenv('SPECTATE_KEYFRAME_EVERY', 32))
+SPECTATE_MAX_CLIENTS = int(os.getenv('SPECTATE_MAX_CLIENTS', 10000))
+
+# Генератор задач: размер доски, сколько полуходов до конца партии остается
+# в задаче (перебор на эту глубину точный) и запас лучшего хода над остальными
+PUZZLE_SIZE = int(os.getenv('PUZZLE_SIZE', 5))
+PUZZLE_DEPTH = int(os.getenv('PUZZLE_DEPTH', 4))
+PUZZLE_MARGIN = int(os.getenv('PUZZLE_MARGIN', 2))
+
+# Выбор набора токенов по расставленным операндам: бюджет времени, плейауты на набор,
+# число процессов (0 - по числу ядер), до скольки пустых клеток считать точным перебором
+DRAFT_BUDGET_MS = float(os.getenv('DRAFT_BUDGET_MS', 100))
+DRAFT_PLAYOUTS = int(os.getenv('DRAFT_PLAYOUTS', 200))
+DRAFT_WORKERS = int(os.getenv('DRAFT_WORKERS', 0))
+DRAFT_EXACT_CELLS = int(os.getenv('DRAFT_EXACT_CELLS', 6))
+# Бюджет выбора в оценках при заданном SEED (время - только предохранитель)
+DRAFT_EVALUATIONS = int(os.getenv('DRAFT_EVALUATIONS', 280))
+# Подсказка лучшего набора человеку при выборе токенов
+DRAFT_HINTS = os.getenv('DRAFT_HINTS', 'True').lower() == 'true'
+
+# Передача позиций процессам пула через общую память: позиций в арене
+# и позиций в одном задании процесса
+ARENA_CAPACITY = int(os.getenv('ARENA_CAPACITY', 65536))
+ARENA_CHUNK = int(os.getenv('ARENA_CHUNK', 2048))
+
+# Симуляция на нескольких машинах: адрес координатора, период heartbeat узла
+# и сколько секунд тишины считать узел мертвым
+CLUSTER_HOST = os.getenv('CLUSTER_HOST', '127.0.0.1')
+CLUSTER_PORT = int(os.getenv('CLUSTER_PORT', 7341))
+CLUSTER_HEARTBEAT_INTERVAL = float(os.getenv('CLUSTER_HEARTBEAT_INTERVAL', 1.0))
+CLUSTER_HEARTBEAT_TIMEOUT = float(os.getenv('CLUSTER_HEARTBEAT_TIMEOUT', 10.0))
+# Сколько секунд координатор ждет, если нет ни одного узла (0 - без ограничения)
+CLUSTER_TIMEOUT = float(os.getenv('CLUSTER_TIMEOUT', 60.0))
+
+# Корневой сид генератора случайных чисел. Пусто - случайный сид на каждый запуск
+_seed = os.getenv('SEED', '').strip()
+SEED = int(_seed) if _seed else None
+
+# Записи партий (JSONL, по строке на раунд) для анализатора и книги опыта.
+# Пишутся в отдельный файл независимо от уровня логирования. Пусто - не писать
+RECORDS_PATH = os.getenv('RECORDS_PATH', 'games.jsonl')
+
+# Анализ партий
+ANALYSIS_DEPTH = int(os.getenv('ANALYSIS_DEPTH', 2))
+BLUNDER_THRESHOLD = int(os.getenv('BLUNDER_THRESHOLD', 2))
+ANALYSIS_CACHE_SIZE = int(os.getenv('ANALYSIS_CACHE_SIZE', 100000))
\ No newline at end of file
@@ -0,0 +1,159 @@
+# core/simulate.py
+import argparse
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import logging
+import os
+import random
+import time
+
+from core import settings
+from core.rng import GameRandom
+from core.rules import ThunderTruthRules
+from core.search import SearchEngine, SearchState
+from core.snapshots import CELL_EMPTY, CELL_FALSE, CELL_TRUE, PLAYER_AI, TOKEN_TYPES, PlayerState, Position
+from core.stats import GameStats
+from core.variants import DEFAULT_SPEC, VARIANTS
+
+logger = logging.getLogger(__name__)
+
+POLICY_RANDOM = 'random'
+POLICY_GREEDY = 'greedy'
+
+TOKEN_NAMES = [token_type.__name__ for token_type in TOKEN_TYPES]
+
+
+def random_position(
+        size: int,
+        players: int,
+        tokens: int,
+        rng: random.Random,
+        token_types: list[int] | None = None,
+        ) -> Position:
+    """
+    Начальная позиция как в Game.setup: случайные операнды в шахматном порядке
+    и случайные наборы токенов (token_types - разрешенные индексы типов)
+    """
+    token_types = token_types or list(range(len(TOKEN_TYPES)))
+    cells = [
+        (CELL_TRUE if rng.choice([0, 1]) else CELL_FALSE) if (row + col) % 2 == 0 else CELL_EMPTY
+        for row in range(1, size + 1)
+        for col in range(1, size + 1)
+    ]
+    hands = [[token_types[rng.randrange(len(token_types))] for _ in range(tokens)] for _ in range(players)]
+    return Position(size, 0, cells, [PlayerState(PLAYER_AI, 0, hand) for hand in hands])
+
+
+def _choose(engine: SearchEngine, state: SearchState, policy: str, rng: random.Random) -> tuple[int, int]:
+    if policy == POLICY_RANDOM:
+        return rng.choice(engine.moves(state))
+    return engine.greedy_move(state, rng)
+
+
+def play_game(
+        position: Position,
+        policy: str,
+        rng: random.Random,
+        stats: GameStats,
+        rules: ThunderTruthRules | None = None,
+        ) -> None:
+    """
+    Партия на скомпилированных правилах: ходы по политике, ход и итог - в статистику
+    """
+    engine = SearchEngine(position, rules)
+
+    def record(state: SearchState, move: tuple[int, int]) -> None:
+        type_idx, idx = move
+        steal = type_idx == engine.steal_idx and engine.steal_victim(state, idx) is not None
+        stats.add_move(position.size, TOKEN_NAMES[type_idx], engine.get_points(type_idx, idx), steal)
+
+    state = engine.playout(
+        engine.state_from_position(position), lambda current: _choose(engine, current, policy, rng), record,
+    )
+    stats.add_result(position.size, list(state.points))
+
+
+def simulate_chunk(args: tuple) -> GameStats:
+    """
+    Пачка партий в процессе пула. Генератор каждой партии - дочерний поток
+    корневого сида по ее сквозному номеру, поэтому результат не зависит
+    ни от числа процессов, ни от размера пачек
+    """
+    games, size, players, tokens, policy, seed, first, variant = args
+    rules = ThunderTruthRules(VARIANTS[variant])
+    token_types = [TOKEN_TYPES.index(token_class) for token_class in rules.compiled.token_classes]
+    stats = GameStats()
+    for game_idx in range(first, first + games):
+        rng = GameRandom(seed, ('simulate', game_idx))
+        play_game(random_position(size, players, tokens, rng, token_types), policy, rng, stats, rules)
+    return stats
+
+
+def simulate(
+        games: int,
+        size: int = settings.BOARD_SIZE,
+        players: int = settings.PLAYERS_AMOUNT,
+        tokens: int = settings.INITIAL_TOKENS,
+        policy: str = POLICY_GREEDY,
+        seed: int = 0,
+        workers: int | None = None,
+        chunk: int = 1000,
+        variant: str = DEFAULT_SPEC.name,
+        ) -> GameStats:
+    """
+    Симуляция партий в пуле процессов. В работе одновременно не больше
+    нескольких пачек на процесс, так что память не растет с числом партий
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = (
+        (min(chunk, games - start), size, players, tokens, policy, seed, start, variant)
+        for start in range(0, games, chunk)
+    )
+    total = GameStats()
+
+    if workers == 1:
+        for task in tasks:
+            total.merge(simulate_chunk(task))
+        return total
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for task in tasks:
+            pending.add(executor.submit(simulate_chunk, task))
+            if len(pending) >= workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    total.merge(future.result())
+        for future in pending:
+            total.merge(future.result())
+    return total
+
+
+def main() -> None:
+    """
+    Симуляция партий для вопросов баланса: python -m core.simulate --games 1000000
+    """
+    parser = argparse.ArgumentParser(description='Потоковая статистика по симулированным партиям ThunderTruth')
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--size', type=int, default=settings.BOARD_SIZE, help='размер доски')
+    parser.add_argument('--players', type=int, default=settings.PLAYERS_AMOUNT)
+    parser.add_argument('--tokens', type=int, default=settings.INITIAL_TOKENS)
+    parser.add_argument('--policy', choices=[POLICY_RANDOM, POLICY_GREEDY], default=POLICY_GREEDY)
+    parser.add_argument('--seed', type=int, default=settings.SEED or 0)
+    parser.add_argument('--workers', type=int, default=None, help='число процессов')
+    parser.add_argument('--chunk', type=int, default=1000, help='партий в пачке процесса')
+    parser.add_argument('--variant', choices=list(VARIANTS), default=DEFAULT_SPEC.name, help='вариант правил')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    stats = simulate(
+        args.games, args.size, args.players, args.tokens, args.policy, args.seed, args.workers, args.chunk,
+        args.variant,
+    )
+    elapsed = time.perf_counter() - started
+
+    print(stats.summary())
+    print(f'Время: {elapsed:.1f} с ({stats.games / elapsed:.0f} партий/с)')
+
+
+if __name__ == '__main__':
+    main()
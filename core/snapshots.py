@@ -0,0 +1,174 @@
+# core/snapshots.py
+from dataclasses import dataclass, field
+import struct
+
+from core.exceptions import SnapshotError
+from core.tokens import AND, IMP, OR, XOR
+
+# Формат снимка позиции (версия 1), big-endian:
+#   заголовок: версия (B), размер доски (B), число игроков (B), индекс текущего игрока (B)
+#   на игрока: тип (B: 0 - человек, 1 - ИИ), очки (H), длина набора (B),
+#              типы токенов набора по 2 бита, по порядку
+#   клетки: по 4 бита на клетку, построчно
+# Для доски 5x5 и двух игроков с 4 токенами снимок занимает 27 байт
+SNAPSHOT_VERSION = 1
+
+TOKEN_TYPES = [AND, OR, XOR, IMP]
+
+PLAYER_HUMAN = 0
+PLAYER_AI = 1
+
+CELL_EMPTY = 0
+CELL_FALSE = 1
+CELL_TRUE = 2
+CELL_TOKEN = 3
+MAX_PLAYERS = 3
+
+_HEADER = struct.Struct('>BBBB')
+_PLAYER = struct.Struct('>BHB')
+
+
+def token_code(type_idx: int, owner_idx: int) -> int:
+    """
+    Код клетки с токеном: тип токена и индекс последнего владельца
+    """
+    return CELL_TOKEN + type_idx * MAX_PLAYERS + owner_idx
+
+
+def split_token_code(code: int) -> tuple[int, int]:
+    """
+    Обратное к token_code: (индекс типа токена, индекс владельца)
+    """
+    return divmod(code - CELL_TOKEN, MAX_PLAYERS)
+
+
+@dataclass
+class PlayerState:
+    kind: int
+    points: int
+    hand: list[int] = field(default_factory=list)
+
+
+@dataclass
+class Position:
+    """
+    ОПИСАНИЕ:
+    - Плоское представление позиции между ходами: коды клеток построчно
+    (без буфера), очки и наборы токенов игроков, индекс текущего игрока
+    """
+    size: int
+    current: int
+    cells: list[int]
+    players: list[PlayerState]
+
+    def get(self, row: int, col: int) -> int:
+        """
+        Код клетки в 1-индексации, как у Board.get_cell
+        """
+        return self.cells[(row - 1) * self.size + (col - 1)]
+
+
+def position_key(position: Position) -> bytes:
+    """
+    Канонический ключ позиции: снимок, в котором наборы токенов отсортированы.
+    Позиции, отличающиеся только порядком токенов в наборе, получают один ключ
+    """
+    players = [
+        PlayerState(player.kind, player.points, sorted(player.hand))
+        for player in position.players
+    ]
+    return encode_position(Position(position.size, position.current, position.cells, players))
+
+
+def _pack_codes(codes: list[int], bits: int) -> bytes:
+    per_byte = 8 // bits
+    packed = bytearray((len(codes) + per_byte - 1) // per_byte)
+    for i, code in enumerate(codes):
+        packed[i // per_byte] |= code << (8 - bits * (i % per_byte + 1))
+    return bytes(packed)
+
+
+def _unpack_codes(data: bytes, count: int, bits: int) -> list[int]:
+    per_byte = 8 // bits
+    mask = (1 << bits) - 1
+    return [
+        (data[i // per_byte] >> (8 - bits * (i % per_byte + 1))) & mask
+        for i in range(count)
+    ]
+
+
+def _check_range(name: str, value: int, limit: int) -> None:
+    if not isinstance(value, int) or not 0 <= value <= limit:
+        raise SnapshotError(f'{name} вне формата снимка (0..{limit}): {value!r}')
+
+
+def _validate_fields(position: Position) -> None:
+    """
+    Какое поле позиции не помещается в формат снимка. Вызывается, только
+    если упаковка не удалась: снимки кодируются в горячих циклах
+    """
+    _check_range('Размер доски', position.size, 0xFF)
+    _check_range('Индекс текущего игрока', position.current, 0xFF)
+    for player in position.players:
+        _check_range('Тип игрока', player.kind, 0xFF)
+        _check_range('Очки игрока', player.points, 0xFFFF)
+        _check_range('Длина набора', len(player.hand), 0xFF)
+        for code in player.hand:
+            _check_range('Тип токена в наборе', code, 0b11)
+    for code in position.cells:
+        _check_range('Код клетки', code, 0b1111)
+
+
+def encode_position(position: Position) -> bytes:
+    """
+    Упаковывает позицию в байты фиксированного формата
+    """
+    if len(position.players) > MAX_PLAYERS:
+        raise SnapshotError(f'Снимок поддерживает не более {MAX_PLAYERS} игроков')
+    if len(position.cells) != position.size * position.size:
+        raise SnapshotError('Число клеток не совпадает с размером доски')
+
+    try:
+        chunks = [_HEADER.pack(SNAPSHOT_VERSION, position.size, len(position.players), position.current)]
+        for player in position.players:
+            # Коды за пределами 2 и 4 бит упаковка не ловит - портят соседние
+            if player.hand and not 0 <= min(player.hand) <= max(player.hand) <= 0b11:
+                raise ValueError
+            chunks.append(_PLAYER.pack(player.kind, player.points, len(player.hand)))
+            chunks.append(_pack_codes(player.hand, 2))
+        if position.cells and not 0 <= min(position.cells) <= max(position.cells) <= 0b1111:
+            raise ValueError
+        chunks.append(_pack_codes(position.cells, 4))
+    except (struct.error, ValueError, TypeError):
+        _validate_fields(position)
+        raise
+    return b''.join(chunks)
+
+
+def decode_position(data: bytes) -> Position:
+    """
+    Распаковывает позицию из байтов. Проверяет версию и длину снимка
+    """
+    try:
+        version, size, players_amount, current = _HEADER.unpack_from(data, 0)
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotError(f'Неподдерживаемая версия снимка: {version}')
+
+        offset = _HEADER.size
+        players = []
+        for _ in range(players_amount):
+            kind, points, hand_len = _PLAYER.unpack_from(data, offset)
+            offset += _PLAYER.size
+            hand_bytes = (hand_len + 3) // 4
+            hand = _unpack_codes(data[offset:offset + hand_bytes], hand_len, 2)
+            offset += hand_bytes
+            players.append(PlayerState(kind, points, hand))
+
+        cells_bytes = (size * size + 1) // 2
+        if len(data) != offset + cells_bytes:
+            raise SnapshotError(f'Неверная длина снимка: {len(data)} байт')
+        cells = _unpack_codes(data[offset:], size * size, 4)
+    except (struct.error, IndexError) as error:
+        raise SnapshotError(f'Поврежденный снимок: {error}') from error
+
+    return Position(size, current, cells, players)
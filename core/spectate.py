@@ -0,0 +1,678 @@
+# core/spectate.py
+import asyncio
+import logging
+import socket
+import struct
+import threading
+import time
+
+from core import settings
+from core.events import TokenPlaced, TurnEnded, XorSteal
+from core.exceptions import SpectatorProtocolError
+from core.snapshots import (
+    CELL_FALSE, CELL_TOKEN, CELL_TRUE, TOKEN_TYPES, Position, decode_position, encode_position,
+    split_token_code, token_code,
+)
+
+logger = logging.getLogger(__name__)
+
+# Кадр: заголовок (длина тела, вид кадра, номер хода, время отправки в нс)
+# и тело. DIFF - ход: клетка, код клетки (тип токена и владелец), флаги
+# и изменения очков; SNAPSHOT - снимок encode_position
+FRAME_DIFF = 1
+FRAME_SNAPSHOT = 2
+FLAG_STEAL = 1
+
+_FRAME = struct.Struct('!IBIQ')
+_DIFF = struct.Struct('!BBBBB')
+_DELTA = struct.Struct('!Bh')
+MAX_FRAME_SIZE = 1024 * 1024
+
+
+def encode_diff(seq: int, row: int, col: int, code: int, steal: bool, deltas: list[tuple[int, int]]) -> bytes:
+    """
+    Кадр хода: токен с кодом code в клетке (row, col) и изменения очков
+    [(индекс игрока, изменение)], включая кражу XOR
+    """
+    body = _DIFF.pack(row, col, code, FLAG_STEAL if steal else 0, len(deltas)) + b''.join(
+        _DELTA.pack(player_idx, delta) for player_idx, delta in deltas
+    )
+    return _FRAME.pack(len(body), FRAME_DIFF, seq, time.time_ns()) + body
+
+
+def encode_snapshot(seq: int, position: Position) -> bytes:
+    """
+    Кадр-снимок позиции после хода seq
+    """
+    body = encode_position(position)
+    return _FRAME.pack(len(body), FRAME_SNAPSHOT, seq, time.time_ns()) + body
+
+
+class SpectatorView:
+    """
+    ОПИСАНИЕ:
+    - Позиция на стороне зрителя: собирает кадры из потока байтов и применяет их.
+    Снимок заменяет позицию, ход применяется, только если его номер следует
+    за последним примененным: повторы пропускаются, после пропуска кадров
+    ходы игнорируются до следующего снимка
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - feed: принять байты из сокета, вернуть [(вид кадра, номер, время отправки)]
+    - apply: применить один кадр
+    """
+    def __init__(self) -> None:
+        self.position: Position | None = None
+        self.seq = -1
+        self.snapshots = 0
+        self.gaps = 0
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> list[tuple[int, int, int]]:
+        buffer = self._buffer
+        buffer += data
+        frames = []
+        offset = 0
+        while len(buffer) - offset >= _FRAME.size:
+            size, kind, seq, sent_ns = _FRAME.unpack_from(buffer, offset)
+            if size > MAX_FRAME_SIZE:
+                raise SpectatorProtocolError(f'Слишком длинный кадр: {size} байт')
+            end = offset + _FRAME.size + size
+            if len(buffer) < end:
+                break
+            self.apply(kind, seq, bytes(buffer[offset + _FRAME.size:end]))
+            frames.append((kind, seq, sent_ns))
+            offset = end
+        del buffer[:offset]
+        return frames
+
+    def apply(self, kind: int, seq: int, body: bytes) -> None:
+        if kind == FRAME_SNAPSHOT:
+            self.position = decode_position(body)
+            self.seq = seq
+            self.snapshots += 1
+            return
+        if kind != FRAME_DIFF:
+            raise SpectatorProtocolError(f'Неизвестный вид кадра: {kind}')
+        if self.position is None or seq <= self.seq:
+            return
+        if seq != self.seq + 1:
+            # Кадры пропущены - позиция неверна до следующего снимка
+            self.gaps += 1
+            self.position = None
+            return
+
+        row, col, code, flags, deltas = _DIFF.unpack_from(body, 0)
+        position = self.position
+        type_idx, owner_idx = split_token_code(code)
+        position.cells[(row - 1) * position.size + (col - 1)] = code
+        hand = position.players[owner_idx].hand
+        if type_idx in hand:
+            hand.remove(type_idx)
+        for i in range(deltas):
+            player_idx, delta = _DELTA.unpack_from(body, _DIFF.size + i * _DELTA.size)
+            position.players[player_idx].points += delta
+        position.current = (owner_idx + 1) % len(position.players)
+        self.seq = seq
+
+
+class _Spectator(asyncio.Protocol):
+    """
+    Соединение зрителя на стороне сервера. Зритель только читает
+    """
+    def __init__(self, server: 'SpectatorServer') -> None:
+        self._server = server
+        self.transport: asyncio.Transport | None = None
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self.transport = transport
+        self._server._join(self)
+
+    def connection_lost(self, error: Exception | None) -> None:
+        self._server._leave(self)
+
+    def pause_writing(self) -> None:
+        # Буфер отправки переполнен: зритель отстал и пропускает ходы
+        self._server._lag(self)
+
+    def resume_writing(self) -> None:
+        self._server._resync(self)
+
+    def data_received(self, data: bytes) -> None:
+        pass
+
+
+class SpectatorServer:
+    """
+    ОПИСАНИЕ:
+    - Сервер зрителей: цикл asyncio в фоновом потоке. Кадр хода кодируется
+    один раз и одним и тем же объектом bytes пишется во все соединения.
+    Буферы отправки зрителя (в цикле и в ядре) ограничены buffer_bytes: отставший
+    зритель пропускает ходы, а когда буфер освободится, получает последний
+    опорный снимок и ходы после него. Новый зритель получает то же самое. Склейка
+    снимка с ходами кэшируется до следующего хода и общая для всех догоняющих
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - start: открыть порт и запустить цикл (port=0 - свободный порт)
+    - publish: разослать кадр (потокобезопасно), keyframe - новый опорный снимок
+    - stop: дослать отставшим снимки, закрыть соединения и остановить цикл
+    :::Счетчики:::
+    - clients, lagging: зрителей сейчас и сколько из них отстали
+    - resyncs: сколько раз отставшие получали снимок
+    - rejected: отказов сверх max_clients
+    """
+    def __init__(
+            self,
+            host: str = settings.SPECTATE_HOST,
+            port: int = settings.SPECTATE_PORT,
+            buffer_bytes: int = settings.SPECTATE_BUFFER_BYTES,
+            max_clients: int = settings.SPECTATE_MAX_CLIENTS,
+            ) -> None:
+        """
+        attr:_active - транспорты зрителей, которые успевают читать
+        attr:_keyframe, attr:_tail - опорный снимок и кадры ходов после него
+        """
+        self.host = host
+        self.port = port
+        self.buffer_bytes = buffer_bytes
+        self.max_clients = max_clients
+        self.resyncs = 0
+        self.rejected = 0
+        self._clients: set[_Spectator] = set()
+        self._active: set[asyncio.Transport] = set()
+        self._keyframe = b''
+        self._tail: list[bytes] = []
+        self._catchup: bytes | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._error: OSError | None = None
+
+    @property
+    def clients(self) -> int:
+        return len(self._clients)
+
+    @property
+    def lagging(self) -> int:
+        return len(self._clients) - len(self._active)
+
+    def start(self) -> 'SpectatorServer':
+        if self._thread is not None:
+            return self
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name='spectators', daemon=True)
+        self._thread.start()
+        ready.wait()
+        if self._error is not None:
+            self._thread.join()
+            self._thread = None
+            raise self._error
+        logger.info(f'Сервер зрителей: {self.host}:{self.port}')
+        return self
+
+    def stop(self, timeout: float = 1.0) -> None:
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(timeout), self._loop)
+        self._thread.join()
+        self._thread = None
+        logger.info(f'Сервер зрителей остановлен, снимков отставшим: {self.resyncs}')
+
+    def publish(self, frame: bytes | None, keyframe: bytes | None = None) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._publish, frame, keyframe)
+
+    def _run(self, ready: threading.Event) -> None:
+        loop = asyncio.new_event_loop()
+        try:
+            server = loop.run_until_complete(loop.create_server(
+                lambda: _Spectator(self), self.host, self.port, reuse_address=True, backlog=4096,
+            ))
+        except OSError as error:
+            self._error = error
+            loop.close()
+            ready.set()
+            return
+        self.port = server.sockets[0].getsockname()[1]
+        self._loop = loop
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            server.close()
+            loop.run_until_complete(server.wait_closed())
+            self._loop = None
+            loop.close()
+
+    async def _shutdown(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        # Отставшие сначала получают снимок, затем соединения закрываются
+        # после отправки буфера; кто не дочитал к сроку - обрывается
+        while self.lagging and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        for client in list(self._clients):
+            client.transport.close()
+        while self._clients and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        for client in list(self._clients):
+            client.transport.abort()
+        await asyncio.sleep(0)
+        self._loop.stop()
+
+    def _publish(self, frame: bytes | None, keyframe: bytes | None) -> None:
+        if keyframe is not None:
+            self._keyframe = keyframe
+            self._tail = []
+        elif frame is not None:
+            self._tail.append(frame)
+        self._catchup = None
+        if frame is None:
+            return
+        # Копия множества: запись может вызвать pause_writing и убрать транспорт
+        for transport in tuple(self._active):
+            transport.write(frame)
+
+    def _catchup_frames(self) -> bytes:
+        if self._catchup is None:
+            self._catchup = self._keyframe + b''.join(self._tail)
+        return self._catchup
+
+    def _join(self, client: _Spectator) -> None:
+        if len(self._clients) >= self.max_clients:
+            self.rejected += 1
+            client.transport.abort()
+            return
+        client.transport.set_write_buffer_limits(high=self.buffer_bytes)
+        sock = client.transport.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # Иначе ядро растит буфер отправки до мегабайт и отставание копится там
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.buffer_bytes)
+        self._clients.add(client)
+        self._active.add(client.transport)
+        catchup = self._catchup_frames()
+        if catchup:
+            client.transport.write(catchup)
+
+    def _leave(self, client: _Spectator) -> None:
+        self._clients.discard(client)
+        self._active.discard(client.transport)
+
+    def _lag(self, client: _Spectator) -> None:
+        self._active.discard(client.transport)
+
+    def _resync(self, client: _Spectator) -> None:
+        if client not in self._clients or client.transport.is_closing():
+            return
+        self.resyncs += 1
+        self._active.add(client.transport)
+        client.transport.write(self._catchup_frames())
+
+
+class SpectatorFeed:
+    """
+    ОПИСАНИЕ:
+    - Подписчик шины событий партии, который кодирует ходы для сервера зрителей.
+    Кадр хода собирается к TurnEnded из TokenPlaced и XorSteal, изменения
+    очков - разница снимка очков из TurnEnded со снимком после прошлого хода
+    (с учетом кражи и того, что очки не уходят ниже нуля). Первый ход раунда и каждый keyframe_every-й ход
+    дают опорный снимок; первый ход раунда рассылается снимком целиком
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - attach: подписаться на события партии
+    - detach: отписаться
+    """
+    def __init__(self, game, server: SpectatorServer, keyframe_every: int = settings.SPECTATE_KEYFRAME_EVERY) -> None:
+        self._game = game
+        self._server = server
+        self.keyframe_every = max(1, keyframe_every)
+        self._board = None
+        self._points: list[int] = []
+        self._placed: TokenPlaced | None = None
+        self._steal = False
+        self._seq = 0
+        self._since_keyframe = 0
+
+    def attach(self) -> 'SpectatorFeed':
+        events = self._game.events
+        events.subscribe(TokenPlaced, self._on_placed)
+        events.subscribe(XorSteal, self._on_steal)
+        events.subscribe(TurnEnded, self._on_turn)
+        return self
+
+    def detach(self) -> None:
+        events = self._game.events
+        events.unsubscribe(TokenPlaced, self._on_placed)
+        events.unsubscribe(XorSteal, self._on_steal)
+        events.unsubscribe(TurnEnded, self._on_turn)
+
+    def _on_placed(self, event: TokenPlaced) -> None:
+        self._placed = event
+
+    def _on_steal(self, event: XorSteal) -> None:
+        self._steal = True
+
+    def _position_after(self, owner_idx: int) -> Position:
+        # TurnEnded приходит до передачи хода
+        position = self._game.to_position()
+        position.current = (owner_idx + 1) % len(position.players)
+        return position
+
+    def _on_turn(self, event: TurnEnded) -> None:
+        placed, steal = self._placed, self._steal
+        self._placed, self._steal = None, False
+        self._seq += 1
+        owner_idx = event.players.index(event.player)
+        points = list(event.scores)
+
+        board = self._game.board
+        if board is not self._board or placed is None or len(points) != len(self._points):
+            self._board = board
+            self._points = points
+            self._since_keyframe = 0
+            snapshot = encode_snapshot(self._seq, self._position_after(owner_idx))
+            self._server.publish(snapshot, snapshot)
+            return
+
+        deltas = [
+            (player_idx, now - before)
+            for player_idx, (now, before) in enumerate(zip(points, self._points))
+            if now != before
+        ]
+        self._points = points
+        code = token_code(TOKEN_TYPES.index(type(event.token)), owner_idx)
+        frame = encode_diff(self._seq, placed.row, placed.col, code, steal, deltas)
+
+        keyframe = None
+        self._since_keyframe += 1
+        if self._since_keyframe >= self.keyframe_every:
+            self._since_keyframe = 0
+            keyframe = encode_snapshot(self._seq, self._position_after(owner_idx))
+        self._server.publish(frame, keyframe)
+
+
+def serve_spectators(game) -> SpectatorServer | None:
+    """
+    Трансляция партии зрителям по настройкам SPECTATE_*. None - порт не открылся
+    """
+    try:
+        server = SpectatorServer().start()
+    except OSError as error:
+        logger.error(f'Сервер зрителей не запущен: {error}')
+        return None
+    SpectatorFeed(game, server).attach()
+    return server
+
+
+def render_position(position: Position) -> str:
+    """
+    Позиция текстом: T/F - операнды, буква типа и номер владельца - токены
+    """
+    lines = []
+    for row in range(1, position.size + 1):
+        cells = []
+        for col in range(1, position.size + 1):
+            code = position.get(row, col)
+            if code >= CELL_TOKEN:
+                type_idx, owner_idx = split_token_code(code)
+                cells.append(f'{TOKEN_TYPES[type_idx].__name__[0]}{owner_idx + 1}')
+            else:
+                cells.append({CELL_TRUE: 'T ', CELL_FALSE: 'F '}.get(code, '. '))
+        lines.append(' '.join(cells))
+    points = ', '.join(str(player.points) for player in position.players)
+    lines.append(f'Очки: {points}, ходит игрок {position.current + 1}')
+    return '\n'.join(lines)
+
+
+def watch(host: str, port: int) -> None:
+    """
+    Зритель в консоли: печатает позицию после каждого кадра
+    """
+    view = SpectatorView()
+    with socket.create_connection((host, port)) as sock:
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                return
+            for kind, seq, _ in view.feed(data):
+                if view.position is None:
+                    continue
+                title = 'Снимок' if kind == FRAME_SNAPSHOT else 'Ход'
+                print(f'{title} #{seq}\n{render_position(view.position)}\n')
+
+
+class _BenchClient(asyncio.Protocol):
+    """
+    Зритель нагрузочного теста: задержка доставки каждого хода по часам отправки.
+    Медленный зритель не читает stall секунд после первого кадра
+    """
+    def __init__(self, latencies: list[int] | None, stall: float, done: asyncio.Future) -> None:
+        self.view = SpectatorView()
+        self._latencies = latencies
+        self._stall = stall
+        self._done = done
+        self.transport: asyncio.Transport | None = None
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self.transport = transport
+
+    def data_received(self, data: bytes) -> None:
+        now = time.time_ns()
+        latencies = self._latencies
+        for kind, _, sent_ns in self.view.feed(data):
+            if kind == FRAME_DIFF and latencies is not None:
+                latencies.append((now - sent_ns) // 1000)
+        if self._stall:
+            self.transport.pause_reading()
+            asyncio.get_running_loop().call_later(self._stall, self.transport.resume_reading)
+            self._stall = 0
+
+    def connection_lost(self, error: Exception | None) -> None:
+        if not self._done.done():
+            self._done.set_result(None)
+
+
+async def _bench_connect(host: str, port: int, count: int, slow: int, stall: float, ready) -> list:
+    loop = asyncio.get_running_loop()
+    latencies: list[int] = []
+    clients = []
+    for i in range(count):
+        done = loop.create_future()
+        is_slow = i < slow
+        for attempt in range(50):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            if is_slow:
+                # Маленький буфер приема - очередь копится на сервере, а не в ядре
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+            sock.setblocking(False)
+            try:
+                await loop.sock_connect(sock, (host, port))
+                _, client = await loop.create_connection(
+                    lambda: _BenchClient(None if is_slow else latencies, stall if is_slow else 0, done), sock=sock,
+                )
+                break
+            except OSError:
+                sock.close()
+                await asyncio.sleep(0.05 * (attempt + 1))
+        else:
+            raise ConnectionError(f'Нет соединения с {host}:{port}')
+        clients.append((client, done))
+    ready.put(count)
+    await asyncio.gather(*(done for _, done in clients))
+    return latencies, clients
+
+
+def _bench_worker(host: str, port: int, count: int, slow: int, stall: float, ready, results) -> None:
+    """
+    Процесс с count зрителями (первые slow - медленные): по закрытии сервера
+    отдает задержки доставки в мкс, ключи итоговых позиций зрителей и число снимков
+    """
+    latencies, clients = asyncio.run(_bench_connect(host, port, count, slow, stall, ready))
+    keys: dict[bytes, int] = {}
+    snapshots = gaps = 0
+    for client, _ in clients:
+        view = client.view
+        key = encode_position(view.position) if view.position is not None else b''
+        keys[key] = keys.get(key, 0) + 1
+        snapshots += view.snapshots
+        gaps += view.gaps
+    results.put((latencies, keys, snapshots, gaps))
+
+
+def _percentile(values: list[int], share: float) -> int:
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def bench(
+        clients: int,
+        moves: int,
+        interval_ms: float,
+        processes: int,
+        slow: int,
+        stall: float,
+        size: int,
+        seed: int,
+        buffer_bytes: int = settings.SPECTATE_BUFFER_BYTES,
+        ) -> dict:
+    """
+    Нагрузочный тест: сервер и партия случайных ходов в этом процессе, зрители -
+    в processes процессах на этой же машине. Проверяется, что итоговая позиция
+    у всех зрителей, включая медленных, совпадает с позицией партии
+    """
+    import multiprocessing
+
+    from core.board import Board
+    from core.displays import NullDisplay
+    from core.game import Game
+    from core.rng import GameRandom
+    from core.rules import ThunderTruthRules
+    from core.simulate import random_position
+
+    logging.disable(logging.INFO)
+    server = SpectatorServer('127.0.0.1', 0, buffer_bytes, clients).start()
+    context = multiprocessing.get_context('spawn')
+    ready, results = context.Queue(), context.Queue()
+    workers = []
+    for worker_idx in range(processes):
+        count = clients // processes + (worker_idx < clients % processes)
+        worker_slow = slow // processes + (worker_idx < slow % processes)
+        worker = context.Process(
+            target=_bench_worker, args=('127.0.0.1', server.port, count, worker_slow, stall, ready, results),
+        )
+        worker.start()
+        workers.append(worker)
+    connected = sum(ready.get() for _ in workers)
+    while server.clients < connected:
+        time.sleep(0.01)
+
+    rng = GameRandom(seed, 'spectate')
+    game = Game(Board(size), ThunderTruthRules(), None, NullDisplay(), rng=rng)
+    feed = SpectatorFeed(game, server).attach()
+    published = 0
+    encode_ns = 0
+    started = time.perf_counter()
+    while published < moves:
+        game.load_position(random_position(size, 2, settings.INITIAL_TOKENS, rng))
+        while published < moves:
+            position = game.to_position()
+            empty = [idx for idx, code in enumerate(position.cells) if code == 0]
+            if not empty or not any(player.tokens for player in game.players):
+                break
+            player = game.get_current_player()
+            if not player.tokens:
+                game.switch_player()
+                continue
+            row, col = divmod(rng.choice(empty), size)
+            token = rng.choice(player.tokens)
+            game.move(player, token, row + 1, col + 1)
+            game.impute(player, row + 1, col + 1)
+            encode_started = time.thread_time_ns()
+            game.end_turn(player, token)
+            encode_ns += time.thread_time_ns() - encode_started
+            published += 1
+            time.sleep(interval_ms / 1000)
+    elapsed = time.perf_counter() - started
+    feed.detach()
+    final = encode_position(game.to_position())
+    server.stop(timeout=max(5.0, stall + 5.0))
+
+    latencies: list[int] = []
+    keys: dict[bytes, int] = {}
+    snapshots = gaps = 0
+    for _ in workers:
+        worker_latencies, worker_keys, worker_snapshots, worker_gaps = results.get()
+        latencies.extend(worker_latencies)
+        for key, count in worker_keys.items():
+            keys[key] = keys.get(key, 0) + count
+        snapshots += worker_snapshots
+        gaps += worker_gaps
+    for worker in workers:
+        worker.join()
+    logging.disable(logging.NOTSET)
+
+    latencies.sort()
+    return {
+        'clients': connected,
+        'moves': published,
+        'elapsed': elapsed,
+        'encode_us': encode_ns / max(1, published) / 1000,
+        'p50_ms': _percentile(latencies, 0.5) / 1000,
+        'p99_ms': _percentile(latencies, 0.99) / 1000,
+        'max_ms': (latencies[-1] if latencies else 0) / 1000,
+        'deliveries': len(latencies),
+        'resyncs': server.resyncs,
+        'snapshots': snapshots,
+        'gaps': gaps,
+        'in_sync': keys.get(final, 0),
+    }
+
+
+def main() -> None:
+    """
+    Зритель: python -m core.spectate watch --host 127.0.0.1 --port 7342
+    Нагрузочный тест: python -m core.spectate bench --clients 10000 --processes 4
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Трансляция партий ThunderTruth зрителям')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    watch_parser = commands.add_parser('watch', help='смотреть партию')
+    watch_parser.add_argument('--host', default=settings.SPECTATE_HOST)
+    watch_parser.add_argument('--port', type=int, default=settings.SPECTATE_PORT)
+
+    bench_parser = commands.add_parser('bench', help='задержка доставки ходов множеству зрителей')
+    bench_parser.add_argument('--clients', type=int, default=1000, help='число зрителей')
+    bench_parser.add_argument('--moves', type=int, default=100, help='ходов в тесте')
+    bench_parser.add_argument('--interval', type=float, default=100, help='мс между ходами')
+    bench_parser.add_argument('--processes', type=int, default=4, help='процессов со зрителями')
+    bench_parser.add_argument('--slow', type=int, default=0, help='медленных зрителей')
+    bench_parser.add_argument('--stall', type=float, default=2.0, help='сколько секунд медленный зритель не читает')
+    bench_parser.add_argument('--buffer', type=int, default=settings.SPECTATE_BUFFER_BYTES, help='буфер зрителя в байтах')
+    bench_parser.add_argument('--size', type=int, default=settings.BOARD_SIZE, help='размер доски')
+    bench_parser.add_argument('--seed', type=int, default=settings.SEED or 0)
+    args = parser.parse_args()
+
+    if args.command == 'watch':
+        watch(args.host, args.port)
+        return
+
+    result = bench(
+        args.clients, args.moves, args.interval, args.processes, args.slow, args.stall,
+        args.size, args.seed, args.buffer,
+    )
+    print(
+        f'Зрителей: {result["clients"]}, ходов: {result["moves"]} за {result["elapsed"]:.1f} с, '
+        f'кодирование хода: {result["encode_us"]:.0f} мкс\n'
+        f'Задержка доставки: p50 {result["p50_ms"]:.1f} мс, p99 {result["p99_ms"]:.1f} мс, '
+        f'max {result["max_ms"]:.1f} мс ({result["deliveries"]} доставок)\n'
+        f'Снимков отставшим: {result["resyncs"]}, пропусков у зрителей: {result["gaps"]}, '
+        f'итоговая позиция совпала у {result["in_sync"]} из {result["clients"]}'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+# core/stats.py
+import logging
+import math
+
+from core.events import PointsAwarded, RoundEnded, TokenPlaced, XorSteal
+
+logger = logging.getLogger(__name__)
+
+# z-квантиль нормального распределения для 95% доверительных интервалов
+Z_95 = 1.959964
+
+
+class RunningStats:
+    """
+    Среднее и дисперсия в один проход по сумме и сумме квадратов. Значения -
+    целые (очки, кражи), суммы считаются точно в целых числах Python, поэтому
+    результат не зависит ни от порядка, ни от группировки слияний
+    """
+    __slots__ = ('count', '_total', '_squares', 'min', 'max')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._total = 0
+        self._squares = 0
+        self.min: int | None = None
+        self.max: int | None = None
+
+    def add(self, value: int) -> None:
+        self.count += 1
+        self._total += value
+        self._squares += value * value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: 'RunningStats') -> None:
+        if not other.count:
+            return
+        self.count += other.count
+        self._total += other._total
+        self._squares += other._squares
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def to_list(self) -> list:
+        return [self.count, self._total, self._squares, self.min, self.max]
+
+    @classmethod
+    def from_list(cls, data: list) -> 'RunningStats':
+        stats = cls()
+        stats.count, stats._total, stats._squares, stats.min, stats.max = data
+        return stats
+
+    @property
+    def mean(self) -> float:
+        return self._total / self.count if self.count else 0.0
+
+    @property
+    def variance(self) -> float:
+        if self.count < 2:
+            return 0.0
+        # Числитель в целых: без потери точности на вычитании близких сумм
+        return (self.count * self._squares - self._total * self._total) / (self.count * (self.count - 1))
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def interval(self, z: float = Z_95) -> tuple[float, float]:
+        """
+        Доверительный интервал среднего (нормальное приближение)
+        """
+        half = z * self.stdev / math.sqrt(self.count) if self.count else 0.0
+        return self.mean - half, self.mean + half
+
+
+class Proportion:
+    """
+    Доля успехов с доверительным интервалом Уилсона
+    """
+    __slots__ = ('successes', 'trials')
+
+    def __init__(self) -> None:
+        self.successes = 0
+        self.trials = 0
+
+    def add(self, success: bool) -> None:
+        self.trials += 1
+        self.successes += success
+
+    def merge(self, other: 'Proportion') -> None:
+        self.successes += other.successes
+        self.trials += other.trials
+
+    def to_list(self) -> list:
+        return [self.successes, self.trials]
+
+    @classmethod
+    def from_list(cls, data: list) -> 'Proportion':
+        proportion = cls()
+        proportion.successes, proportion.trials = data
+        return proportion
+
+    @property
+    def rate(self) -> float:
+        return self.successes / self.trials if self.trials else 0.0
+
+    def interval(self, z: float = Z_95) -> tuple[float, float]:
+        if not self.trials:
+            return 0.0, 1.0
+        n, p = self.trials, self.rate
+        center = (p + z * z / (2 * n)) / (1 + z * z / n)
+        half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+        return center - half, center + half
+
+
+class Histogram:
+    """
+    Распределение целых значений (очков). Очки ограничены размером доски,
+    поэтому память ограничена числом различных значений, а квантили точные
+    """
+    __slots__ = ('counts', 'total')
+
+    def __init__(self) -> None:
+        self.counts: dict[int, int] = {}
+        self.total = 0
+
+    def add(self, value: int, count: int = 1) -> None:
+        self.counts[value] = self.counts.get(value, 0) + count
+        self.total += count
+
+    def merge(self, other: 'Histogram') -> None:
+        for value, count in other.counts.items():
+            self.add(value, count)
+
+    def to_list(self) -> list:
+        return sorted(self.counts.items())
+
+    @classmethod
+    def from_list(cls, data: list) -> 'Histogram':
+        histogram = cls()
+        for value, count in data:
+            histogram.add(value, count)
+        return histogram
+
+    def quantile(self, q: float) -> int | None:
+        if not self.total:
+            return None
+        rank = q * (self.total - 1)
+        seen = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            if seen > rank:
+                return value
+        return max(self.counts)
+
+
+class GameStats:
+    """
+    ОПИСАНИЕ:
+    - Потоковая статистика по партиям в ограниченной памяти: партии не хранятся,
+    только счетчики. Частичные агрегаты процессов объединяются через merge
+    в любом порядке и группировке
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - add_move: ход - тип токена, полученные очки, была ли XOR-кража
+    - add_result: итог партии - очки игроков по местам
+    - merge: добавить частичный агрегат
+    - to_dict / from_dict: компактное представление для передачи по сети (JSON)
+    - subscribe: собирать статистику живой партии по событиям Game
+    - summary: текстовый отчет
+    :::Статистика:::
+    - wins / draws: победы по местам и ничьи
+    - scores: распределение очков по местам (квантили) и среднее
+    - token_points: очки за ход по типам токенов
+    - steals: доля XOR-ходов с кражей и число краж за партию по размерам доски
+    - first_move: доля побед первого игрока среди партий с победителем и средний перевес
+    """
+    def __init__(self) -> None:
+        self.games = 0
+        self.draws = 0
+        self.wins: dict[int, int] = {}
+        self.scores: dict[int, Histogram] = {}
+        self.score_stats: dict[int, RunningStats] = {}
+        self.token_points: dict[str, RunningStats] = {}
+        self.xor_steals: dict[int, Proportion] = {}
+        self.steals_per_game: dict[int, RunningStats] = {}
+        self.first_move = Proportion()
+        self.first_move_margin = RunningStats()
+        self._game_steals = 0
+
+    def add_move(self, size: int, token_name: str, points: int, steal: bool) -> None:
+        self.token_points.setdefault(token_name, RunningStats()).add(points)
+        if token_name == 'XOR':
+            self.xor_steals.setdefault(size, Proportion()).add(steal)
+        self._game_steals += steal
+
+    def add_result(self, size: int, points: list[int]) -> None:
+        self.games += 1
+        best = max(points)
+        leaders = [seat for seat, value in enumerate(points) if value == best]
+        if len(leaders) == 1:
+            self.wins[leaders[0]] = self.wins.get(leaders[0], 0) + 1
+            self.first_move.add(leaders[0] == 0)
+        else:
+            self.draws += 1
+
+        for seat, value in enumerate(points):
+            self.scores.setdefault(seat, Histogram()).add(value)
+            self.score_stats.setdefault(seat, RunningStats()).add(value)
+        if len(points) > 1:
+            self.first_move_margin.add(points[0] - max(points[1:]))
+
+        self.steals_per_game.setdefault(size, RunningStats()).add(self._game_steals)
+        self._game_steals = 0
+
+    def merge(self, other: 'GameStats') -> None:
+        self.games += other.games
+        self.draws += other.draws
+        for seat, count in other.wins.items():
+            self.wins[seat] = self.wins.get(seat, 0) + count
+        for mine, theirs, factory in (
+            (self.scores, other.scores, Histogram),
+            (self.score_stats, other.score_stats, RunningStats),
+            (self.token_points, other.token_points, RunningStats),
+            (self.xor_steals, other.xor_steals, Proportion),
+            (self.steals_per_game, other.steals_per_game, RunningStats),
+        ):
+            for key, value in theirs.items():
+                mine.setdefault(key, factory()).merge(value)
+        self.first_move.merge(other.first_move)
+        self.first_move_margin.merge(other.first_move_margin)
+
+    # Поля-словари агрегатов и их классы: ключи сохраняются парами, чтобы
+    # целые ключи (места, размеры досок) пережили JSON
+    _AGGREGATES = (
+        ('scores', Histogram),
+        ('score_stats', RunningStats),
+        ('token_points', RunningStats),
+        ('xor_steals', Proportion),
+        ('steals_per_game', RunningStats),
+    )
+
+    def to_dict(self) -> dict:
+        data = {
+            'games': self.games,
+            'draws': self.draws,
+            'wins': sorted(self.wins.items()),
+            'first_move': self.first_move.to_list(),
+            'first_move_margin': self.first_move_margin.to_list(),
+        }
+        for name, _ in self._AGGREGATES:
+            data[name] = [[key, value.to_list()] for key, value in sorted(getattr(self, name).items())]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'GameStats':
+        stats = cls()
+        stats.games = data['games']
+        stats.draws = data['draws']
+        stats.wins = {seat: count for seat, count in data['wins']}
+        stats.first_move = Proportion.from_list(data['first_move'])
+        stats.first_move_margin = RunningStats.from_list(data['first_move_margin'])
+        for name, factory in cls._AGGREGATES:
+            setattr(stats, name, {key: factory.from_list(value) for key, value in data[name]})
+        return stats
+
+    def subscribe(self, game) -> None:
+        """
+        Сбор статистики живой партии: ход засчитывается по TokenPlaced и PointsAwarded,
+        кража - по XorSteal, итог - по RoundEnded
+        """
+        current = {}
+
+        def on_token_placed(event: TokenPlaced) -> None:
+            current['token'] = type(event.token).__name__
+            current['steal'] = False
+
+        def on_points_awarded(event: PointsAwarded) -> None:
+            current['points'] = event.points
+
+        def on_xor_steal(event: XorSteal) -> None:
+            current['steal'] = True
+
+        def on_round_ended(event: RoundEnded) -> None:
+            self.add_result(event.position.size, list(event.scores))
+
+        # Ход завершается началом следующего или концом раунда - сбрасываем накопленное
+        def flush(event) -> None:
+            if 'token' in current:
+                self.add_move(game.board.get_size(), current['token'], current.get('points', 0), current['steal'])
+                current.clear()
+
+        events = game.events
+        events.subscribe(TokenPlaced, flush)
+        events.subscribe(TokenPlaced, on_token_placed)
+        events.subscribe(PointsAwarded, on_points_awarded)
+        events.subscribe(XorSteal, on_xor_steal)
+        events.subscribe(RoundEnded, flush)
+        events.subscribe(RoundEnded, on_round_ended)
+
+    def summary(self) -> str:
+        lines = [f'Партий: {self.games}, ничьих: {self.draws} ({self.draws / (self.games or 1):.1%})']
+        for seat in sorted(self.score_stats):
+            scores = self.scores[seat]
+            stats = self.score_stats[seat]
+            low, high = stats.interval()
+            lines.append(
+                f'Место {seat + 1}: побед {self.wins.get(seat, 0) / (self.games or 1):.1%}, '
+                f'очки {stats.mean:.2f} [{low:.2f}; {high:.2f}], '
+                f'квантили 10/50/90%: {scores.quantile(0.1)}/{scores.quantile(0.5)}/{scores.quantile(0.9)}'
+            )
+
+        low, high = self.first_move.interval()
+        margin_low, margin_high = self.first_move_margin.interval()
+        lines.append(
+            f'Преимущество первого хода: побед {self.first_move.rate:.1%} [{low:.1%}; {high:.1%}] '
+            f'среди партий с победителем, перевес {self.first_move_margin.mean:.2f} '
+            f'[{margin_low:.2f}; {margin_high:.2f}]'
+        )
+        for name in sorted(self.token_points):
+            stats = self.token_points[name]
+            lines.append(f'{name}: очков за ход {stats.mean:.2f} ± {stats.stdev:.2f} (ходов {stats.count})')
+        for size in sorted(self.xor_steals):
+            steals = self.xor_steals[size]
+            low, high = steals.interval()
+            per_game = self.steals_per_game.get(size, RunningStats())
+            lines.append(
+                f'Доска {size}x{size}: XOR-кража в {steals.rate:.1%} [{low:.1%}; {high:.1%}] XOR-ходов, '
+                f'краж за партию {per_game.mean:.2f}'
+            )
+        return '\n'.join(lines)
@@ -1,7 +1,7 @@
 # core/tokens.py
 from abc import abstractmethod
 import logging
-import secrets
+import random
 import string
 
 from colorama import Fore, Style
@@ -13,6 +13,9 @@ from core.operands import Operand
 
 logger = logging.getLogger(__name__)
 
+# Id без генератора партии - из системного источника, как в secrets
+_system_random = random.SystemRandom()
+
 def colorize_token(func):
     def wrapper(self, *args, **kwargs) -> str:
         text = func(self, *args, **kwargs)
@@ -51,13 +54,15 @@ class Token(Element):
         self._prefix = 'token'
 
     @staticmethod
-    def _generate_id(prefix='', length=10) -> str:
+    def _generate_id(prefix='', length=10, rng=None) -> str:
         """
         Возвращает случайный id с префиксом
-        По умолчанию случайный набор из букв и цифр длиной 10
+        По умолчанию случайный набор из букв и цифр длиной 10.
+        При заданном генераторе партии id воспроизводим
         """
         characters = string.ascii_letters + string.digits
-        suffix = ''.join(secrets.choice(characters) for _ in range(length))
+        choice = rng.choice if rng is not None else _system_random.choice
+        suffix = ''.join(choice(characters) for _ in range(length))
         return '_'.join(['token', prefix, suffix])
 
     def get_id(self):
@@ -84,7 +89,7 @@ class Token(Element):
         self._owner = player
         if self._last_owner is None:
             self._last_owner = player
-        if self not in player.tokens:
+        if not player.has_token(self):
             player.add_token(self)
         logger.debug(f'Для токена {self.get_id()} установлен владелец {player.get_id()}')
 
@@ -93,8 +98,7 @@ class Token(Element):
         Удаляет владельца токена
         """
         self._owner = None
-        if self in self._last_owner.tokens:
-            self._last_owner.tokens.remove(self)
+        self._last_owner.discard_token(self)
         logger.debug(f'Для токена {self.get_id()} удален владелец {self._last_owner.get_id()}')
     
     @abstractmethod
@@ -105,7 +109,8 @@ class Token(Element):
         """Вычисляет по таблице истинности значение булевого выражения"""
         self._validate_operand(bool1, bool2)
         table = self.get_truth_table()
-        logger.info(f"Вычисление выражения {bool1.get_value()} {self.to_string()} {bool2.get_value()}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Вычисление выражения {bool1.get_value()} {self.to_string()} {bool2.get_value()}")
         return table.get((bool1.get_value(), bool2.get_value()))
     
     @abstractmethod
@@ -123,10 +128,10 @@ class Token(Element):
 
 
 class AND(Token):
-    def __init__(self, owner=None) -> None:
+    def __init__(self, owner=None, rng=None) -> None:
         super().__init__(owner)
         self._prefix = 'and'
-        self._id = self._generate_id(self._prefix)
+        self._id = self._generate_id(self._prefix, rng=rng)
 
     def get_truth_table(self) -> dict:
         return {
@@ -142,10 +147,10 @@ class AND(Token):
 
 
 class OR(Token):
-    def __init__(self, owner=None) -> None:
+    def __init__(self, owner=None, rng=None) -> None:
         super().__init__(owner)
         self._prefix = 'or'
-        self._id = self._generate_id(self._prefix)
+        self._id = self._generate_id(self._prefix, rng=rng)
 
     def get_truth_table(self) -> dict:
         return {
@@ -160,10 +165,10 @@ class OR(Token):
         return 'v'
 
 class XOR(Token):
-    def __init__(self, owner=None) -> None:
+    def __init__(self, owner=None, rng=None) -> None:
         super().__init__(owner)
         self._prefix = 'xor'
-        self._id = self._generate_id(self._prefix)
+        self._id = self._generate_id(self._prefix, rng=rng)
 
     def get_truth_table(self) -> dict:
         return {
@@ -179,10 +184,10 @@ class XOR(Token):
 
 
 class IMP(Token):
-    def __init__(self, owner=None) -> None:
+    def __init__(self, owner=None, rng=None) -> None:
         super().__init__(owner)
         self._prefix = 'imp'
-        self._id = self._generate_id(self._prefix)
+        self._id = self._generate_id(self._prefix, rng=rng)
 
     def get_truth_table(self) -> dict:
         return {
@@ -1,7 +1,47 @@
 import os
 import sys
 
+# Прочитанные ресурсы: {путь: текст}. Файлы рядом с игрой не меняются за время работы
+_resources: dict[str, str] = {}
+
 
 def get_path_compiling(filepath: str):
     base_path = getattr(sys, '_MEIPASS', os.path.abspath('.'))
-    return os.path.join(base_path, filepath)
\ No newline at end of file
+    return os.path.join(base_path, filepath)
+
+
+def read_resource(filepath: str) -> str:
+    """
+    Текст файла из каталога игры (или сборки PyInstaller). Читается с диска один раз
+    """
+    if filepath not in _resources:
+        with open(get_path_compiling(filepath), 'r', encoding='utf-8') as f:
+            _resources[filepath] = f.read()
+    return _resources[filepath]
+
+
+def load_env(filepath: str) -> None:
+    """
+    Загрузка переменных из .env в os.environ. Уже заданные переменные окружения
+    не перезаписываются. Поддерживаются комментарии, префикс export и кавычки
+    """
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#') or '=' not in line:
+            continue
+        if line.startswith('export '):
+            line = line[len('export '):]
+
+        key, value = line.split('=', 1)
+        key, value = key.strip(), value.strip()
+        if value[:1] in ('"', "'") and value[-1:] == value[:1] and len(value) > 1:
+            value = value[1:-1]
+        elif ' #' in value:
+            value = value.split(' #', 1)[0].rstrip()
+        os.environ.setdefault(key, value)
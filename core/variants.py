@@ -0,0 +1,189 @@
+# core/variants.py
+import logging
+
+from core.exceptions import RulesSpecError
+from core.operands import Operand
+from core.tokens import AND, IMP, OR, XOR, Token
+
+logger = logging.getLogger(__name__)
+
+TOKEN_CLASSES: dict[str, type[Token]] = {'AND': AND, 'OR': OR, 'XOR': XOR, 'IMP': IMP}
+
+
+class RulesSpec:
+    """
+    ОПИСАНИЕ:
+    - Декларативное описание варианта правил:
+    neighborhood - соседи клетки {имя направления: (dr, dc)}, не дальше буфера доски (1 клетка)
+    scored_pairs - пары направлений, операнды которых дают очко при истинном результате
+    tokens - набор операторов (имена AND, OR, XOR, IMP)
+    chain_length - число операндов в цепочке кражи (op1 t1 op2 ... t op_n)
+    chain_directions - направления цепочек кражи (dr, dc)
+    steal - оператор, замыкающий цепочку кражи
+    """
+    def __init__(
+            self,
+            name: str,
+            neighborhood: dict[str, tuple[int, int]],
+            scored_pairs: list[tuple[str, str]],
+            tokens: list[str],
+            chain_length: int,
+            chain_directions: list[tuple[int, int]],
+            steal: str,
+            ) -> None:
+        self.name = name
+        self.neighborhood = dict(neighborhood)
+        self.scored_pairs = [tuple(pair) for pair in scored_pairs]
+        self.tokens = list(tokens)
+        self.chain_length = chain_length
+        self.chain_directions = [tuple(direction) for direction in chain_directions]
+        self.steal = steal
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'RulesSpec':
+        """
+        Вариант из словаря (например, из JSON): ключи совпадают с аргументами конструктора
+        """
+        try:
+            return cls(
+                name=data['name'],
+                neighborhood={name: tuple(offset) for name, offset in data['neighborhood'].items()},
+                scored_pairs=data['scored_pairs'],
+                tokens=data['tokens'],
+                chain_length=data.get('chain_length', 3),
+                chain_directions=data.get('chain_directions', []),
+                steal=data.get('steal', 'XOR'),
+            )
+        except (KeyError, TypeError, AttributeError) as error:
+            raise RulesSpecError(f'Неверное описание варианта правил: {error}')
+
+
+class CompiledRules:
+    """
+    ОПИСАНИЕ:
+    - Вариант правил, развернутый в таблицы: смещения соседей, пары индексов соседей,
+    таблицы истинности по классам токенов и смещения цепочек кражи.
+    Во время игры нет поиска направлений по именам - только обход кортежей
+    """
+    __slots__ = (
+        'spec', 'directions', 'neighbor_offsets', 'scored_pairs', 'pair_names',
+        'token_classes', 'truth_tables', 'steal_class', 'chain_length', 'chains',
+        'chain_expected',
+    )
+
+    def __init__(self, spec: RulesSpec) -> None:
+        self.spec = spec
+        self.directions: list[str] = list(spec.neighborhood)
+        self.neighbor_offsets: tuple[tuple[int, int], ...] = tuple(spec.neighborhood.values())
+        index = {name: idx for idx, name in enumerate(self.directions)}
+        self.scored_pairs: tuple[tuple[int, int], ...] = tuple(
+            (index[first], index[second]) for first, second in spec.scored_pairs
+        )
+        self.pair_names: tuple[tuple[str, str], ...] = tuple(spec.scored_pairs)
+        self.token_classes: list[type[Token]] = [TOKEN_CLASSES[name] for name in spec.tokens]
+        self.truth_tables: dict[type[Token], dict] = {
+            token_class: token_class().get_truth_table() for token_class in self.token_classes
+        }
+        self.steal_class: type[Token] = TOKEN_CLASSES[spec.steal]
+        self.chain_length = spec.chain_length
+
+        # Цепочка op1 t1 op2 ... t_last op_n: оператор кражи стоит перед последним операндом,
+        # смещения считаются от клетки оператора кражи
+        span = 2 * spec.chain_length - 3
+        self.chains: list[list[tuple[int, int]]] = [
+            [(step * dr, step * dc) for step in range(-span, 2)]
+            for dr, dc in spec.chain_directions
+        ]
+        self.chain_expected: list[type] = [
+            Operand if position % 2 == 0 else Token for position in range(2 * spec.chain_length - 1)
+        ]
+        self.chain_expected[-2] = self.steal_class
+
+
+# Скомпилированные варианты: {id описания: (описание, таблицы)}. Описание хранится
+# рядом, чтобы id не переиспользовался; правила создаются на каждую партию и движок
+_compiled: dict[int, tuple[RulesSpec, CompiledRules]] = {}
+
+
+def compile_rules(spec: RulesSpec) -> CompiledRules:
+    """
+    Проверяет описание варианта и строит таблицы правил. Описания не меняются
+    после создания, поэтому результат кэшируется
+    """
+    cached = _compiled.get(id(spec))
+    if cached is not None and cached[0] is spec:
+        return cached[1]
+
+    unknown = [name for name in spec.tokens + [spec.steal] if name not in TOKEN_CLASSES]
+    if unknown:
+        raise RulesSpecError(f'Неизвестные операторы: {unknown}. Доступны: {list(TOKEN_CLASSES)}')
+    if spec.steal not in spec.tokens:
+        raise RulesSpecError(f'Оператор кражи {spec.steal} не входит в набор операторов')
+
+    for name, (dr, dc) in spec.neighborhood.items():
+        # Соседи читаются без проверок границ, а буфер вокруг поля - одна клетка
+        if (dr, dc) == (0, 0) or max(abs(dr), abs(dc)) > 1:
+            raise RulesSpecError(f'Сосед {name} {(dr, dc)} вне окрестности 3x3 клетки')
+    for pair in spec.scored_pairs:
+        missing = [name for name in pair if name not in spec.neighborhood]
+        if missing or len(pair) != 2:
+            raise RulesSpecError(f'Пара {pair} ссылается на неизвестные направления {missing}')
+
+    if spec.chain_length < 3:
+        # Иначе в цепочке нет токена соперника, у которого отнимается очко
+        raise RulesSpecError('В цепочке кражи должно быть не меньше 3 операндов')
+    for dr, dc in spec.chain_directions:
+        if (dr, dc) == (0, 0) or max(abs(dr), abs(dc)) > 1:
+            raise RulesSpecError(f'Направление цепочки {(dr, dc)} должно быть единичным шагом')
+
+    compiled = CompiledRules(spec)
+    _compiled[id(spec)] = (spec, compiled)
+    logger.debug(
+        f'Правила {spec.name} скомпилированы: соседей {len(compiled.neighbor_offsets)}, '
+        f'пар {len(compiled.scored_pairs)}, цепочек {len(compiled.chains)}'
+    )
+    return compiled
+
+
+DEFAULT_SPEC = RulesSpec(
+    name='thundertruth',
+    # Порядок соседей совпадает с Board.NEIGHBOR_OFFSETS
+    neighborhood={'up': (-1, 0), 'left': (0, -1), 'right': (0, 1), 'down': (1, 0)},
+    scored_pairs=[
+        ('up', 'left'),
+        ('up', 'right'),
+        ('up', 'down'),
+        ('left', 'down'),
+        ('left', 'right'),
+        ('right', 'down'),
+    ],
+    tokens=['AND', 'OR', 'XOR', 'IMP'],
+    chain_length=3,
+    chain_directions=[(0, 1), (1, 0)],
+    steal='XOR',
+)
+
+# Варианты для экспериментов с балансом
+STRAIGHT_SPEC = RulesSpec(
+    name='straight',
+    neighborhood=DEFAULT_SPEC.neighborhood,
+    scored_pairs=[('up', 'down'), ('left', 'right')],
+    tokens=DEFAULT_SPEC.tokens,
+    chain_length=3,
+    chain_directions=DEFAULT_SPEC.chain_directions,
+    steal='XOR',
+)
+
+LONG_CHAIN_SPEC = RulesSpec(
+    name='long_chain',
+    neighborhood=DEFAULT_SPEC.neighborhood,
+    scored_pairs=DEFAULT_SPEC.scored_pairs,
+    tokens=DEFAULT_SPEC.tokens,
+    chain_length=4,
+    chain_directions=DEFAULT_SPEC.chain_directions,
+    steal='XOR',
+)
+
+VARIANTS: dict[str, RulesSpec] = {
+    spec.name: spec for spec in (DEFAULT_SPEC, STRAIGHT_SPEC, LONG_CHAIN_SPEC)
+}
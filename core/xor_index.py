@@ -0,0 +1,155 @@
+# core/xor_index.py
+import logging
+
+from core.board import Board
+from core.operands import Operand
+from core.players import Player
+from core.tokens import Token
+
+logger = logging.getLogger(__name__)
+
+
+class XorStealIndex:
+    """
+    ОПИСАНИЕ:
+    - Инкрементальный индекс XOR-перехватов. Хранит пустые клетки, в которых XOR
+    замкнет цепочку op1 token1 op2 XOR op3 с истинным результатом, и игрока-жертву -
+    последнего владельца token1. Как и ThunderTruthRules.exclude_points_xor,
+    засчитывается первая истинная цепочка в порядке xor_chains, даже если ее token1 -
+    токен самого ходящего: тогда очко ни у кого не отнимается.
+    Операнды не меняются, поэтому ход затрагивает только цепочки, проходящие
+    через занятую клетку: обновление O(число цепочек), запросы O(1)
+
+    ИНТЕРФЕЙС:
+    :::Методы:::
+    - on_token_placed: обновить индекс после размещения токена
+    - is_steal_cell: отнимет ли XOR игрока очко у соперника в данной клетке
+    - steal_cells: клетки, где XOR игрока отнимает очко у соперника
+    - exposed_tokens: клетки токенов игрока, открывающих сопернику перехват
+    - get_victims: жертвы перехвата в клетке в порядке цепочек
+    """
+    def __init__(self, board: Board, chains: list[list[tuple[int, int]]], xor: Token) -> None:
+        """
+        attr:_chains - смещения клеток цепочек op1, token1, op2, XOR, op3 относительно XOR
+        attr:_xor - экземпляр XOR для вычисления результата цепочки
+        attr:_victims - {клетка XOR: {номер истинной цепочки: жертва}}
+        attr:_by_victim - {жертва: {клетка XOR: 1}} по первой истинной цепочке клетки
+        attr:_exposed - {жертва: {клетка токена: число клеток XOR}} по первым истинным цепочкам
+        """
+        self._chains = chains
+        self._xor = xor
+        self._victims: dict[tuple[int, int], dict[int, Player]] = {}
+        self._by_victim: dict[Player, dict[tuple[int, int], int]] = {}
+        self._exposed: dict[Player, dict[tuple[int, int], int]] = {}
+        self._build(board)
+
+    def _build(self, board: Board) -> None:
+        for row in range(1, board.get_size() + 1):
+            for col in range(1, board.get_size() + 1):
+                if isinstance(board.peek_value(row, col), Token):
+                    self._add_chains_from(board, row, col)
+        logger.debug(f'Индекс XOR-перехватов построен: {len(self._victims)} клеток')
+
+    def _add_chains_from(self, board: Board, row: int, col: int) -> None:
+        """
+        Регистрирует цепочки, в которых токен из клетки (row, col) стоит на месте token1
+        """
+        size = board.get_size()
+        for chain_idx, offsets in enumerate(self._chains):
+            token_dr, token_dc = offsets[1]
+            xor_row, xor_col = row - token_dr, col - token_dc
+            cells = [(xor_row + dr, xor_col + dc) for dr, dc in offsets]
+
+            if not all(1 <= _row <= size and 1 <= _col <= size for _row, _col in cells):
+                continue
+            if not board.peek(xor_row, xor_col).is_empty:
+                continue
+
+            op1, token1, op2, _, op3 = [board.peek_value(_row, _col) for _row, _col in cells]
+            if not all(isinstance(op, Operand) for op in (op1, op2, op3)):
+                continue
+
+            table = token1.get_truth_table()
+            op1_op2 = table[(op1.get_value(), op2.get_value())]
+            if not self._xor.get_truth_table()[(bool(op1_op2), op3.get_value())]:
+                continue
+
+            xor_cell = (xor_row, xor_col)
+            victims = self._victims.setdefault(xor_cell, {})
+            first = min(victims) if victims else None
+            victims[chain_idx] = token1.get_last_owner()
+            # Засчитывается только первая истинная цепочка клетки
+            if first is None or chain_idx < first:
+                if first is not None:
+                    self._unindex(xor_cell, first, victims[first])
+                self._index(xor_cell, chain_idx, victims[chain_idx])
+
+    def _token_cell(self, xor_cell: tuple[int, int], chain_idx: int) -> tuple[int, int]:
+        token_dr, token_dc = self._chains[chain_idx][1]
+        return xor_cell[0] + token_dr, xor_cell[1] + token_dc
+
+    def _index(self, xor_cell: tuple[int, int], chain_idx: int, victim: Player) -> None:
+        self._increment(self._by_victim, victim, xor_cell)
+        self._increment(self._exposed, victim, self._token_cell(xor_cell, chain_idx))
+
+    def _unindex(self, xor_cell: tuple[int, int], chain_idx: int, victim: Player) -> None:
+        self._decrement(self._by_victim, victim, xor_cell)
+        self._decrement(self._exposed, victim, self._token_cell(xor_cell, chain_idx))
+
+    @staticmethod
+    def _increment(index: dict, player: Player, cell: tuple[int, int]) -> None:
+        cells = index.setdefault(player, {})
+        cells[cell] = cells.get(cell, 0) + 1
+
+    @staticmethod
+    def _decrement(index: dict, player: Player, cell: tuple[int, int]) -> None:
+        cells = index[player]
+        cells[cell] -= 1
+        if not cells[cell]:
+            del cells[cell]
+
+    def on_token_placed(self, board: Board, row: int, col: int) -> None:
+        """
+        Обновляет индекс после размещения токена в клетку (row, col)
+        """
+        # Клетка занята - XOR в нее больше не поставить
+        victims = self._victims.pop((row, col), None)
+        if victims:
+            first = min(victims)
+            self._unindex((row, col), first, victims[first])
+
+        # Новый токен может стать token1 для пустых клеток впереди по цепочкам
+        self._add_chains_from(board, row, col)
+
+    def is_steal_cell(self, player: Player, row: int, col: int) -> bool:
+        """
+        Отнимет ли XOR игрока player, поставленный в клетку, очко у соперника
+        """
+        victims = self._victims.get((row, col))
+        if not victims:
+            return False
+        return victims[min(victims)] is not player
+
+    def steal_cells(self, player: Player) -> set[tuple[int, int]]:
+        """
+        Клетки, в которых XOR игрока player отнимает очко у соперника
+        """
+        cells = set()
+        for victim, victim_cells in self._by_victim.items():
+            if victim is not player:
+                cells.update(victim_cells)
+        return cells
+
+    def exposed_tokens(self, player: Player) -> set[tuple[int, int]]:
+        """
+        Клетки токенов игрока player, которые соперник может перехватить XOR
+        """
+        return set(self._exposed.get(player, ()))
+
+    def get_victims(self, row: int, col: int) -> list[Player]:
+        """
+        Жертвы перехвата в клетке по всем истинным цепочкам в порядке xor_chains.
+        Засчитывается первая
+        """
+        victims = self._victims.get((row, col), {})
+        return [victims[chain_idx] for chain_idx in sorted(victims)]
@@ -0,0 +1,21 @@
+# tests/test_fuzz.py
+import unittest
+
+from core.fuzz import CANDIDATES, fuzz
+
+
+class FuzzTest(unittest.TestCase):
+    """
+    Быстрые движки и инкрементальные индексы совпадают с эталонными правилами
+    """
+    def test_candidates_match_reference(self):
+        for name in CANDIDATES:
+            with self.subTest(candidate=name):
+                played, plies, reports = fuzz(200, seed=1, workers=1, candidate_name=name)
+                self.assertEqual(played, 200)
+                self.assertGreater(plies, 0)
+                self.assertEqual(reports, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
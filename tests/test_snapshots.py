@@ -0,0 +1,41 @@
+# tests/test_snapshots.py
+import unittest
+
+from core.board import Board
+from core.displays import NullDisplay
+from core.exceptions import SnapshotError
+from core.fuzz import random_start
+from core.game import Game
+from core.rng import GameRandom
+from core.rules import ThunderTruthRules
+from core.snapshots import PlayerState, Position, decode_position, encode_position
+
+
+class SnapshotTest(unittest.TestCase):
+    """
+    Снимок позиции восстанавливается без потерь - и сам по себе, и через Game
+    """
+    def test_position_round_trip(self):
+        rng = GameRandom(1)
+        for _ in range(200):
+            position = random_start(rng)
+            self.assertEqual(decode_position(encode_position(position)), position)
+
+    def test_game_round_trip(self):
+        rng = GameRandom(2)
+        for _ in range(50):
+            position = random_start(rng)
+            game = Game(Board(), ThunderTruthRules(), None, NullDisplay(), rng=GameRandom(0))
+            game.load_position(position)
+            restored = Game(Board(), ThunderTruthRules(), None, NullDisplay(), rng=GameRandom(0))
+            restored.restore(game.snapshot())
+            self.assertEqual(restored.to_position(), game.to_position())
+
+    def test_out_of_range_field(self):
+        position = Position(3, 0, [0] * 9, [PlayerState(0, 70000, []), PlayerState(0, 0, [])])
+        with self.assertRaises(SnapshotError):
+            encode_position(position)
+
+
+if __name__ == '__main__':
+    unittest.main()
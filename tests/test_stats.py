@@ -0,0 +1,26 @@
+# tests/test_stats.py
+import json
+import unittest
+
+from core.simulate import simulate
+from core.stats import GameStats
+
+
+class GameStatsTest(unittest.TestCase):
+    """
+    Статистика симуляции не зависит от размера пачек и переживает передачу по сети
+    """
+    def test_chunks_give_identical_stats(self):
+        expected = simulate(300, workers=1, chunk=1000).to_dict()
+        for chunk in (100, 7):
+            with self.subTest(chunk=chunk):
+                self.assertEqual(simulate(300, workers=1, chunk=chunk).to_dict(), expected)
+
+    def test_dict_round_trip(self):
+        data = simulate(300, workers=1, chunk=7).to_dict()
+        self.assertEqual(GameStats.from_dict(data).to_dict(), data)
+        self.assertEqual(GameStats.from_dict(json.loads(json.dumps(data))).to_dict(), data)
+
+
+if __name__ == '__main__':
+    unittest.main()